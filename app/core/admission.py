@@ -0,0 +1,272 @@
+"""
+Admission control for tool calls.
+
+Every tool belongs to a priority class: cheap Mastodon lookups are
+"interactive", LLM-backed analysis is "llm" and large fan-out work is "bulk".
+Each class (and optionally each tool) has its own concurrency limit, so a burst
+of slow LLM calls cannot hold the slots that profile lookups need, and all
+classes share a global in-flight limit. Calls that find no free slot wait in
+one bounded queue served in priority order. When the queue is full, a new call
+displaces the lowest-priority waiter if it outranks it and is rejected
+otherwise; waiters that are not served within ADMISSION_QUEUE_TIMEOUT are
+rejected too. Rejections carry a retry-after estimate derived from recent call
+durations, so clients back off instead of timing out.
+
+Triage and activity analysis only count as "llm" while USE_LLM_TRIAGE or
+USE_LLM_ACTIVITY is on; without the LLM they are interactive. Tools with a
+heuristic fallback are admitted in degraded mode when the LLM class is
+saturated: they run as interactive work with `llm_allowed()`
+returning False.
+"""
+
+import asyncio
+import contextvars
+import math
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.config_reload import register_settings_listener
+from app.core.metrics import Counter, Gauge, Histogram
+
+PRIORITIES = {"interactive": 0, "llm": 1, "bulk": 2}
+
+TOOL_CLASSES = {
+    "evaluate_user_profile": "llm",
+    "evaluate_user_auto": "llm",
+    "analyze_user_activity": "llm",
+    "analyze_user_activity_auto": "llm",
+    "triage_user_report": "llm",
+    "analyze_signup_cohort": "bulk",
+    "interaction_ingest": "bulk",
+    "resolve_accounts": "bulk",
+    "export_archive": "bulk",
+}
+
+# Tools that can answer without the LLM (heuristic triage, unclassified activity)
+DEGRADABLE_TOOLS = {"triage_user_report", "analyze_user_activity", "analyze_user_activity_auto"}
+
+# Tools that only call the LLM when their setting is on; otherwise they are heuristics
+LLM_SWITCHES = {
+    "triage_user_report": "USE_LLM_TRIAGE",
+    "analyze_user_activity": "USE_LLM_ACTIVITY",
+    "analyze_user_activity_auto": "USE_LLM_ACTIVITY",
+}
+
+ADMISSIONS = Counter(
+    "nagatha_admission_total",
+    "Tool call admission decisions (admitted, queued, degraded, rejected, shed, timeout)",
+    ["tool", "outcome"],
+)
+ADMISSION_WAIT = Histogram("nagatha_admission_wait_seconds", "Time tool calls spent in the admission queue", ["class"])
+
+_llm_allowed = contextvars.ContextVar("llm_allowed", default=True)
+
+
+def llm_allowed() -> bool:
+    """
+    False while serving a call admitted in degraded mode.
+    """
+    return _llm_allowed.get()
+
+
+def tool_class(tool: str) -> str:
+    """
+    Class of `tool` under the current settings, so a reload that switches
+    USE_LLM_TRIAGE or USE_LLM_ACTIVITY moves the next calls.
+    """
+    switch = LLM_SWITCHES.get(tool)
+    if switch is not None and not getattr(settings, switch):
+        return "interactive"
+    return TOOL_CLASSES.get(tool, "interactive")
+
+
+class Overloaded(RuntimeError):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("tool", "cls", "priority", "seq", "future")
+
+    def __init__(self, tool: str, cls: str, seq: int, future: asyncio.Future):
+        self.tool = tool
+        self.cls = cls
+        self.priority = PRIORITIES[cls]
+        self.seq = seq
+        self.future = future
+
+
+class AdmissionController:
+    def __init__(self, limits: Dict[str, int], max_concurrent: int, queue_size: int, queue_timeout: float):
+        self.limits = limits
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight: Dict[str, int] = {}
+        self.total_in_flight = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        # Smoothed call duration per class, for retry-after estimates
+        self._durations: Dict[str, float] = {}
+
+    def _limit(self, key: str) -> int:
+        return self.limits.get(key, 0) or self.max_concurrent
+
+    def _has_room(self, tool: str, cls: str) -> bool:
+        return (
+            self.total_in_flight < self.max_concurrent
+            and self.in_flight.get(cls, 0) < self._limit(cls)
+            and self.in_flight.get(tool, 0) < self._limit(tool)
+        )
+
+    def _acquire(self, tool: str, cls: str):
+        self.total_in_flight += 1
+        self.in_flight[cls] = self.in_flight.get(cls, 0) + 1
+        self.in_flight[tool] = self.in_flight.get(tool, 0) + 1
+
+    def _release(self, tool: str, cls: str, elapsed: Optional[float]):
+        self.total_in_flight -= 1
+        self.in_flight[cls] -= 1
+        self.in_flight[tool] -= 1
+        if elapsed is not None:
+            previous = self._durations.get(cls)
+            self._durations[cls] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+        self._dispatch()
+
+    def _dispatch(self):
+        """
+        Hand free slots to waiters, highest priority (then oldest) first.
+        """
+        self._waiters.sort(key=lambda w: (w.priority, w.seq))
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+            elif self._has_room(waiter.tool, waiter.cls):
+                self._waiters.remove(waiter)
+                self._acquire(waiter.tool, waiter.cls)
+                waiter.future.set_result(None)
+
+    def retry_after(self, cls: str) -> int:
+        queued = sum(1 for w in self._waiters if w.cls == cls)
+        per_call = self._durations.get(cls, 1.0)
+        return max(1, math.ceil(per_call * (queued + 1) / self._limit(cls)))
+
+    def _overloaded(self, cls: str, reason: str) -> Overloaded:
+        return Overloaded(f"Server busy: {reason} ({cls} calls)", self.retry_after(cls))
+
+    def saturated(self, cls: str) -> bool:
+        return self.in_flight.get(cls, 0) >= self._limit(cls) or any(w.cls == cls for w in self._waiters)
+
+    def queued(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for waiter in self._waiters:
+            counts[waiter.cls] = counts.get(waiter.cls, 0) + 1
+        return counts
+
+    def _enqueue(self, tool: str, cls: str) -> _Waiter:
+        if len(self._waiters) >= self.queue_size:
+            victim = max(self._waiters, key=lambda w: (w.priority, w.seq), default=None)
+            if victim is None or victim.priority <= PRIORITIES[cls]:
+                ADMISSIONS.inc(tool, "rejected")
+                raise self._overloaded(cls, "admission queue full")
+            self._waiters.remove(victim)
+            ADMISSIONS.inc(victim.tool, "shed")
+            victim.future.set_exception(self._overloaded(victim.cls, "displaced by higher-priority calls"))
+        self._seq += 1
+        waiter = _Waiter(tool, cls, self._seq, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        return waiter
+
+    async def _wait(self, waiter: _Waiter):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._waiters.remove(waiter)
+                waiter.future.cancel()
+                ADMISSIONS.inc(waiter.tool, "timeout")
+                raise self._overloaded(waiter.cls, "timed out waiting for a slot")
+        except asyncio.CancelledError:
+            # The caller went away; give back a slot that was granted meanwhile.
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self._release(waiter.tool, waiter.cls, None)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                waiter.future.cancel()
+            raise
+        # A slot granted just as the timeout fired is still ours.
+        waiter.future.result()
+        ADMISSION_WAIT.observe(time.perf_counter() - started, waiter.cls)
+
+    @asynccontextmanager
+    async def admit(self, tool: str):
+        """
+        Hold a slot for `tool` for the duration of the block, yielding whether
+        the call was degraded. Raises Overloaded when the call is rejected.
+        """
+        cls = tool_class(tool)
+        degraded = False
+        if cls == "llm" and tool in DEGRADABLE_TOOLS and self.saturated(cls):
+            cls, degraded = "interactive", True
+            ADMISSIONS.inc(tool, "degraded")
+        # Released slots go to waiters first, so anyone still waiting is blocked on a limit this call may not share.
+        if self._has_room(tool, cls):
+            self._acquire(tool, cls)
+            ADMISSIONS.inc(tool, "admitted")
+        else:
+            waiter = self._enqueue(tool, cls)
+            ADMISSIONS.inc(tool, "queued")
+            await self._wait(waiter)
+        token = _llm_allowed.set(not degraded)
+        started = time.perf_counter()
+        try:
+            yield degraded
+        finally:
+            _llm_allowed.reset(token)
+            self._release(tool, cls, time.perf_counter() - started)
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        settings.ADMISSION_LIMITS,
+        settings.ADMISSION_MAX_CONCURRENT,
+        settings.ADMISSION_QUEUE_SIZE,
+        settings.ADMISSION_QUEUE_TIMEOUT,
+    )
+
+
+def _limits_changed(old, new):
+    # Calls already admitted release their slots on the controller that admitted them
+    get_admission_controller.cache_clear()
+
+
+register_settings_listener(
+    ["ADMISSION_LIMITS", "ADMISSION_MAX_CONCURRENT", "ADMISSION_QUEUE_SIZE", "ADMISSION_QUEUE_TIMEOUT"], _limits_changed
+)
+
+
+def _class_values(fn) -> dict:
+    if not get_admission_controller.cache_info().currsize:
+        return {}
+    controller = get_admission_controller()
+    return {(cls,): fn(controller, cls) for cls in PRIORITIES}
+
+
+Gauge(
+    "nagatha_admission_in_flight",
+    "Tool calls holding an admission slot",
+    ["class"],
+    fn=lambda: _class_values(lambda c, cls: c.in_flight.get(cls, 0)),
+)
+Gauge(
+    "nagatha_admission_queued",
+    "Tool calls waiting for an admission slot",
+    ["class"],
+    fn=lambda: _class_values(lambda c, cls: c.queued().get(cls, 0)),
+)
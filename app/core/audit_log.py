@@ -0,0 +1,289 @@
+"""
+Append-only audit log of moderation decisions.
+
+Decisions (evaluations, activity analyses, triage results) are queued in
+memory and appended by a background flusher in batches, so a tool call only
+pays for a list append. The queue is bounded by AUDIT_MAX_PENDING decisions
+(including a batch being written); past that new decisions are dropped and
+counted rather than growing memory while the disk keeps failing.
+
+The log is a directory of JSONL segments, each with a binary index of
+fixed-size entries (account hash, timestamp, byte offset). A segment is never
+modified once written; the writer starts a new one past AUDIT_SEGMENT_BYTES.
+Every process writes only its own segments (their names carry the pid), so
+several workers can share one directory.
+
+History lookups skip segments outside the requested time range using the
+first and last index entries, filter the index of the rest by account hash
+with numpy, and read only the matching lines.
+
+AUDIT_FSYNC controls durability: "always" syncs every batch, "interval" at
+most every AUDIT_FSYNC_SECONDS, "never" leaves it to the operating system.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import struct
+import time
+from functools import lru_cache
+from hashlib import blake2b
+from typing import List, Optional
+
+from app.core.background import register_background_service
+from app.core.config import settings
+from app.core.executors import make_executor, run_blocking
+from app.core.metrics import Counter, Gauge
+from app.utils.mastodon import canonical_acct
+from app.utils.serialization import dumps
+
+AUDIT_RECORDS = Counter("nagatha_audit_records_total", "Decisions appended to the audit log", ["kind"])
+AUDIT_DROPPED = Counter(
+    "nagatha_audit_dropped_total", "Decisions dropped because the audit log queue was full", ["kind"]
+)
+AUDIT_FSYNCS = Counter("nagatha_audit_fsyncs_total", "fsync calls on audit log segments")
+
+# account hash, unix time, byte offset of the line in the segment
+_INDEX_ENTRY = struct.Struct("<Qdq")
+
+
+def account_key(username: str) -> int:
+    return int.from_bytes(blake2b(canonical_acct(username).encode(), digest_size=8).digest(), "little")
+
+
+def _write_all(f, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+
+class AuditLog:
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync: str = "interval",
+                 fsync_seconds: float = 1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_seconds = fsync_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._segment = None
+        self._index = None
+        self._segment_size = 0
+        self._index_size = 0
+        self._last_fsync = 0.0
+        self._unsynced = False
+        self._sequence = 0
+
+    def _open_segment(self):
+        self.close()
+        # Start time first keeps names in time order; pid and sequence keep them unique across workers
+        self._sequence += 1
+        name = os.path.join(self.directory, f"audit-{int(time.time() * 1000):013d}-{os.getpid()}-{self._sequence}")
+        # Unbuffered: after a failed write nothing is left in a buffer to reach the file later
+        self._segment = open(f"{name}.jsonl", "ab", buffering=0)
+        self._index = open(f"{name}.idx", "ab", buffering=0)
+        self._segment_size = self._segment.tell()
+        self._index_size = self._index.tell()
+
+    def _abandon_segment(self):
+        # Cut both files back to the last complete batch, then leave the segment for good:
+        # if the cut failed its sizes are unknown, so nothing more may be appended to it
+        for f, size in ((self._segment, self._segment_size), (self._index, self._index_size)):
+            try:
+                os.ftruncate(f.fileno(), size)
+            except OSError:
+                pass
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._segment = self._index = None
+        self._unsynced = False
+
+    def append(self, records: List[dict]):
+        """
+        Append records ({"recorded_at", "kind", "account", "data"}). Blocking.
+        All or nothing: when a write or sync fails the batch is cut off again
+        and the error raised, so the caller can retry the whole batch.
+        """
+        if self._segment is None or self._segment_size >= self.segment_bytes:
+            self._open_segment()
+        lines, entries = [], []
+        offset = self._segment_size
+        for record in records:
+            line = (dumps(record) + "\n").encode()
+            entries.append(_INDEX_ENTRY.pack(account_key(record["account"]), record["recorded_at"], offset))
+            lines.append(line)
+            offset += len(line)
+        index = b"".join(entries)
+        try:
+            # Data before index: an index entry never points past the data that is on disk
+            _write_all(self._segment, b"".join(lines))
+            _write_all(self._index, index)
+            self._unsynced = True
+            now = time.monotonic()
+            if self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_seconds):
+                self.sync()
+        except OSError:
+            self._abandon_segment()
+            raise
+        # Only now: offsets of the next batch start after this one
+        self._segment_size = offset
+        self._index_size += len(index)
+
+    def sync(self):
+        if self._segment is not None and self._unsynced:
+            os.fsync(self._segment.fileno())
+            os.fsync(self._index.fileno())
+            AUDIT_FSYNCS.inc()
+            self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+    def close(self):
+        if self._segment is not None:
+            if self.fsync != "never":
+                self.sync()
+            self._segment.close()
+            self._index.close()
+            self._segment = self._index = None
+
+    def segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "audit-*.idx")), key=os.path.basename)
+
+    def history(self, username: str, since: Optional[float] = None, until: Optional[float] = None,
+                kinds: Optional[List[str]] = None, limit: int = 100) -> List[dict]:
+        """
+        Decisions about `username` in [since, until), newest first. Blocking.
+        """
+        import numpy as np
+
+        key = np.uint64(account_key(username))
+        since = since if since is not None else float("-inf")
+        until = until if until is not None else float("inf")
+        dtype = np.dtype([("account", "<u8"), ("recorded_at", "<f8"), ("offset", "<i8")])
+        results = []
+        for index_path in reversed(self.segments()):
+            with open(index_path, "rb") as f:
+                data = f.read()
+            # A concurrent writer may have a partial entry at the end
+            entries = np.frombuffer(data, dtype=dtype, count=len(data) // dtype.itemsize)
+            if not len(entries) or entries["recorded_at"][0] >= until or entries["recorded_at"][-1] < since:
+                continue
+            found = entries[
+                (entries["account"] == key) & (entries["recorded_at"] >= since) & (entries["recorded_at"] < until)
+            ]
+            if not len(found):
+                continue
+            with open(index_path[:-len(".idx")] + ".jsonl", "rb") as segment:
+                for offset in found["offset"][::-1]:
+                    segment.seek(int(offset))
+                    record = json.loads(segment.readline())
+                    # The hash only narrows the search; compare the account itself
+                    if canonical_acct(record["account"]) != canonical_acct(username):
+                        continue
+                    if kinds and record["kind"] not in kinds:
+                        continue
+                    record["id"] = f"{os.path.basename(index_path)[:-len('.idx')]}:{int(offset)}"
+                    results.append(record)
+        results.sort(key=lambda r: r["recorded_at"], reverse=True)
+        return results[:limit]
+
+
+@lru_cache()
+def get_audit_log() -> AuditLog:
+    return AuditLog(
+        settings.AUDIT_DIR or os.path.join(settings.DATA_DIR, "audit"),
+        settings.AUDIT_SEGMENT_BYTES,
+        settings.AUDIT_FSYNC,
+        settings.AUDIT_FSYNC_SECONDS,
+    )
+
+
+_pending: List[dict] = []
+# Decisions taken from _pending by a write that has not finished yet
+_in_flight = 0
+_wakeup: Optional[asyncio.Event] = None
+# One thread appends and reads, so lookups never see a half-written batch
+_executor = make_executor("audit", 1)
+
+
+def record_decision(kind: str, username: str, data: dict):
+    """
+    Queue a decision for the audit log; returns at once.
+    """
+    if not settings.AUDIT_ENABLED:
+        return
+    if len(_pending) + _in_flight >= settings.AUDIT_MAX_PENDING:
+        AUDIT_DROPPED.inc(kind)
+        return
+    _pending.append({"recorded_at": time.time(), "kind": kind, "account": canonical_acct(username), "data": data})
+    if _wakeup is not None and len(_pending) >= settings.AUDIT_BATCH_SIZE:
+        _wakeup.set()
+
+
+async def flush_pending():
+    global _pending, _in_flight
+    if _pending:
+        batch, _pending = _pending, []
+        _in_flight += len(batch)
+        try:
+            await run_blocking(_executor, "audit", "append", get_audit_log().append, batch)
+        except Exception:
+            # Not written: back at the front, ahead of what was queued meanwhile.
+            # (On cancellation the worker thread still finishes the write.)
+            _pending[:0] = batch
+            raise
+        finally:
+            _in_flight -= len(batch)
+        for record in batch:
+            AUDIT_RECORDS.inc(record["kind"])
+
+
+async def history(username: str, since: Optional[float] = None, until: Optional[float] = None,
+                  kinds: Optional[List[str]] = None, limit: int = 100) -> List[dict]:
+    await flush_pending()
+    return await run_blocking(_executor, "audit", "history", get_audit_log().history, username, since, until, kinds, limit)
+
+
+_flusher_task = None
+
+
+async def _flush_loop():
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.AUDIT_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            await flush_pending()
+        except Exception as e:
+            logging.error(f"Audit log flush failed, {len(_pending)} decisions kept for a retry: {e}")
+            # Don't retry at once on every wakeup while the disk is failing
+            await asyncio.sleep(settings.AUDIT_FLUSH_SECONDS)
+
+
+async def start_flusher():
+    global _flusher_task, _wakeup
+    if settings.AUDIT_ENABLED and _flusher_task is None:
+        _wakeup = asyncio.Event()
+        _flusher_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_flusher():
+    global _flusher_task, _wakeup
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = _wakeup = None
+        await flush_pending()
+        await run_blocking(_executor, "audit", "close", get_audit_log().close)
+
+
+register_background_service("audit log", start_flusher, stop_flusher)
+
+Gauge("nagatha_audit_pending_records", "Decisions waiting to be appended to the audit log", fn=lambda: {(): len(_pending)})
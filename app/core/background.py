@@ -0,0 +1,42 @@
+"""
+Registry for long-running background services (schedulers, workers, flushers).
+
+Services register a start and a stop coroutine function at import time; the
+stdio runner and the HTTP lifespan both wrap the server in
+background_services() so the same services run under either transport.
+"""
+
+import logging
+from contextlib import asynccontextmanager
+
+_services = []
+
+
+def register_background_service(name: str, start, stop):
+    _services.append((name, start, stop))
+
+
+async def start_background_services():
+    for name, start, _ in _services:
+        try:
+            await start()
+            logging.info(f"Started background service: {name}")
+        except Exception as e:
+            logging.error(f"Failed to start background service {name}: {e}")
+
+
+async def stop_background_services():
+    for name, _, stop in reversed(_services):
+        try:
+            await stop()
+        except Exception as e:
+            logging.error(f"Failed to stop background service {name}: {e}")
+
+
+@asynccontextmanager
+async def background_services():
+    await start_background_services()
+    try:
+        yield
+    finally:
+        await stop_background_services()
@@ -0,0 +1,136 @@
+"""
+Record and replay Mastodon API traffic.
+
+`CassetteSession` is a requests.Session handed to Mastodon.py. In record mode
+it forwards every request and appends the request/response pair with its
+wall-clock latency to a gzip-compressed JSON lines cassette. In replay mode it
+serves responses from the cassette without touching the network, optionally
+sleeping for the recorded latency (scaled by a factor) so load tests see
+production-shaped timings.
+
+Requests are keyed by method, path and sorted query/body parameters; the host
+is dropped so a cassette recorded against one instance replays under any
+MASTODON_API_BASE. Repeated requests for the same key are served in recorded
+order and then cycle. A request whose exact key was never recorded falls back
+to the recordings for the same method and path template, with numeric ids
+masked (different accounts, time-window parameters).
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+# Response headers worth keeping: pagination and rate limits drive client behaviour.
+KEPT_HEADERS = ("content-type", "link", "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset")
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+def _params_key(params) -> str:
+    if not params:
+        return ""
+    if isinstance(params, dict):
+        params = params.items()
+    return urlencode(sorted((str(k), str(v)) for k, v in params))
+
+
+def request_key(method: str, url: str, params=None, data=None, json_body=None) -> tuple:
+    parts = urlsplit(url)
+    query = sorted(parse_qsl(parts.query)) + sorted((str(k), str(v)) for k, v in (params or {}).items())
+    body = ""
+    if data or json_body:
+        payload = json.dumps(json_body, sort_keys=True) if json_body is not None else _params_key(data)
+        body = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    return method.upper(), parts.path, urlencode(sorted(query)), body
+
+
+class CassetteSession(requests.Session):
+    def __init__(self, mode: str, path: str, latency_factor: float = 0.0):
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.latency_factor = latency_factor
+        self._lock = threading.Lock()
+        self._exact = defaultdict(list)
+        self._by_path = defaultdict(list)
+        self._cursor = defaultdict(int)
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                key = tuple(entry["key"])
+                self._exact[key].append(entry)
+                self._by_path[self._template(key)].append(entry)
+        logging.info(f"Loaded {sum(map(len, self._exact.values()))} recorded Mastodon responses from {self.path}")
+
+    def request(self, method, url, params=None, data=None, json=None, **kwargs):
+        key = request_key(method, url, params, data, json)
+        if self.mode == "replay":
+            return self._replay(key, url)
+        started = time.perf_counter()
+        response = super().request(method, url, params=params, data=data, json=json, **kwargs)
+        self._record(key, response, time.perf_counter() - started)
+        return response
+
+    def _record(self, key: tuple, response: requests.Response, elapsed: float):
+        entry = {
+            "key": key,
+            "status": response.status_code,
+            "headers": {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers},
+            "body": response.text,
+            "elapsed": round(elapsed, 4),
+        }
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            # Each append is its own gzip member; readers see one continuous stream.
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    @staticmethod
+    def _template(key: tuple) -> tuple:
+        return key[0], _ID_SEGMENT.sub("/:id", key[1])
+
+    def _next(self, recordings: dict, key) -> Optional[dict]:
+        entries = recordings.get(key)
+        if not entries:
+            return None
+        with self._lock:
+            index = self._cursor[(id(recordings), key)]
+            self._cursor[(id(recordings), key)] = index + 1
+        return entries[index % len(entries)]
+
+    def _replay(self, key: tuple, url: str) -> requests.Response:
+        entry = self._next(self._exact, key) or self._next(self._by_path, self._template(key))
+        if entry is None:
+            raise CassetteMiss(f"No recorded response for {key[0]} {key[1]}?{key[2]}")
+        if self.latency_factor > 0:
+            time.sleep(entry["elapsed"] * self.latency_factor)
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers.update(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        return response
@@ -1,22 +1,166 @@
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Dict, List, Literal
 from uuid import uuid4
 
+class MastodonInstanceConfig(BaseModel):
+    api_base: str
+    access_token: str = ""
+    workers: int = 4
+
 class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     INSTANCE_ID: str = Field(default_factory=lambda: str(uuid4()))
     START_TIME: datetime = Field(default_factory=datetime.utcnow)
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-3.5-turbo"
+    OPENAI_BASE_URL: str = ""
+    OPENAI_MODEL_ROUTES: Dict[str, List[str]] = {}
+    OPENAI_LARGE_INPUT_CHARS: int = 6000
+    OPENAI_ESCALATION_CONFIDENCE: float = 0.6
+    OPENAI_MODEL_PRICES: Dict[str, List[float]] = {}
+    OPENAI_RESPONSE_FORMAT: Literal["json_schema", "json_object", "none"] = "json_object"
+    OPENAI_REASK_ATTEMPTS: int = 1
     USE_LLM_ACTIVITY: bool = False
     USE_LLM_TRIAGE: bool = False
     MASTODON_ACCESS_TOKEN: str = ""
     MASTODON_API_BASE: str = ""
+    MASTODON_WORKERS: int = 4
+    MASTODON_INSTANCES: Dict[str, MastodonInstanceConfig] = {}
+    MASTODON_CASSETTE_MODE: Literal["off", "record", "replay"] = "off"
+    MASTODON_CASSETTE_PATH: str = ""
+    MASTODON_CASSETTE_REPLAY_LATENCY: float = 0.0
+    ANALYSIS_EXECUTOR: Literal["inline", "process"] = "inline"
+    ANALYSIS_PROCESS_WORKERS: int = 0
+    ANALYSIS_PROCESS_MIN_ITEMS: int = 500
+    ACTIVITY_MAX_POSTS: int = 2000
+    ACTIVITY_LLM_POSTS: int = 40
+    ACTIVITY_BOT_THRESHOLD: float = 0.7
+    DATA_DIR: str = "data"
+    MCP_HTTP_STATELESS: bool = False
+    MCP_SESSION_BACKEND: Literal["memory", "sqlite"] = "memory"
+    MCP_SESSION_DB_PATH: str = ""
+    MCP_SESSION_TTL: int = 1800
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: Literal["console", "file"] = "console"
+    TRACING_FILE: str = ""
+    WATCHLIST_ENABLED: bool = True
+    WATCHLIST_DB_PATH: str = ""
+    WATCHLIST_DEFAULT_INTERVAL: int = 3600
+    WATCHLIST_POLL_SECONDS: float = 30.0
+    WATCHLIST_JITTER: float = 0.1
+    WATCHLIST_POST_LIMIT: int = 20
+    WATCHLIST_RATELIMIT_RESERVE: int = 50
+    WATCHLIST_COUNT_CHANGE_THRESHOLD: float = 0.2
+    WATCHLIST_ENGAGEMENT_CHANGE_THRESHOLD: float = 0.5
+    COHORT_PAGE_SIZE: int = 200
+    COHORT_MAX_ACCOUNTS: int = 5000
+    COHORT_CACHE_TTL: int = 600
+    COHORT_BURST_FACTOR: float = 3.0
+    COHORT_BIO_DISTANCE: int = 3
+    INTERACTION_BUCKET_SECONDS: int = 3600
+    INTERACTION_RETENTION_HOURS: int = 168
+    INTERACTION_MAX_EDGES: int = 500000
+    INTERACTION_MAX_TARGET_FANIN: int = 50
+    INTERACTION_PILE_ON_ACCOUNTS: int = 5
+    JOB_DB_PATH: str = ""
+    JOB_WORKERS: int = 2
+    JOB_BATCH_SIZE: int = 4
+    JOB_LEASE_SECONDS: float = 120.0
+    JOB_POLL_SECONDS: float = 5.0
+    RESOLVE_CACHE_TTL: int = 300
+    RESOLVE_NEGATIVE_TTL: int = 300
+    RESOLVE_CACHE_SIZE: int = 10000
+    RESOLVE_DOMAIN_CONCURRENCY: int = 4
+    RESOLVE_WEBFINGER_TIMEOUT: float = 5.0
+    RESOLVE_BACKOFF_SECONDS: float = 60.0
+    RESOLVE_BACKOFF_MAX: float = 3600.0
+    LINK_BLOCKLIST_PATHS: List[str] = []
+    LINK_INDEX_PATH: str = ""
+    LINK_BLOOM_BITS_PER_DOMAIN: int = 10
+    LINK_TRACKED_DOMAINS: int = 100000
+    LINK_SPREAD_ACCOUNTS: int = 5
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_DB_PATH: str = ""
+    ARCHIVE_FLUSH_SECONDS: float = 2.0
+    ARCHIVE_MAX_PENDING: int = 50000
+    ARCHIVE_RETENTION_DAYS: int = 30
+    EXPORT_DIR: str = ""
+    EXPORT_BATCH_ROWS: int = 10000
+    AUDIT_ENABLED: bool = True
+    AUDIT_DIR: str = ""
+    AUDIT_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    AUDIT_FSYNC: Literal["always", "interval", "never"] = "interval"
+    AUDIT_FSYNC_SECONDS: float = 1.0
+    AUDIT_FLUSH_SECONDS: float = 0.5
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_MAX_PENDING: int = 50000
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENT: int = 64
+    ADMISSION_LIMITS: Dict[str, int] = {"interactive": 32, "llm": 8, "bulk": 2}
+    ADMISSION_QUEUE_SIZE: int = 128
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0
+    TREND_BUCKET_SECONDS: int = 600
+    TREND_WINDOW_HOURS: int = 24
+    TREND_RECENT_MINUTES: int = 30
+    TREND_SKETCH_WIDTH: int = 2048
+    TREND_SKETCH_DEPTH: int = 4
+    TREND_TOP_TERMS: int = 200
+    TREND_SEEN_STATUSES: int = 50000
+    TREND_MIN_COUNT: int = 5
+    TREND_MIN_RATIO: float = 3.0
+    DIAGNOSTICS_ENABLED: bool = False
+    DIAGNOSTICS_TRACEMALLOC: bool = False
+    DIAGNOSTICS_TRACEMALLOC_FRAMES: int = 1
+    DIAGNOSTICS_LAG_INTERVAL: float = 0.5
+    DIAGNOSTICS_PROFILE_MAX_SECONDS: float = 30.0
+    CONFIG_FILE: str = ""
+    CONFIG_RELOAD_ENABLED: bool = True
+    CONFIG_RELOAD_SECONDS: float = 2.0
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = False
 
-settings = Settings()
\ No newline at end of file
+def env_files(config_file: str = "") -> tuple:
+    """
+    Files settings are read from: .env, then CONFIG_FILE (same format) over it.
+    Environment variables take precedence over both.
+    """
+    return (".env", config_file) if config_file else (".env",)
+
+
+def load_settings() -> Settings:
+    base = Settings()
+    return Settings(_env_file=env_files(base.CONFIG_FILE)) if base.CONFIG_FILE else base
+
+
+class SettingsProxy:
+    """
+    The `settings` every module imports. Attribute access goes to the current
+    Settings object, which app.core.config_reload replaces in one assignment
+    when the configuration changes, so a reload never shows a half-applied
+    mix of old and new values.
+    """
+
+    def __init__(self, current: Settings):
+        object.__setattr__(self, "_current", current)
+
+    def __getattr__(self, name):
+        return getattr(self._current, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._current, name, value)
+
+    def current(self) -> Settings:
+        return self._current
+
+    def swap(self, new: Settings) -> Settings:
+        old = self._current
+        object.__setattr__(self, "_current", new)
+        return old
+
+
+settings = SettingsProxy(load_settings())
@@ -0,0 +1,135 @@
+"""
+Configuration reload without a restart.
+
+A background watcher polls .env (and CONFIG_FILE) every CONFIG_RELOAD_SECONDS.
+When one changes, the settings are read and validated as a whole; an invalid
+file is logged and the running settings stay in place. A valid one replaces
+the current Settings object in one step, then the listeners for the fields
+that changed run, so only the clients and pools that depend on them are
+rebuilt (e.g. a new OpenAI client for a new key, or a new client for one
+Mastodon instance whose token changed). Everything else, including warm HTTP
+sessions and caches, is kept.
+
+Fields in RESTART_FIELDS (storage paths, worker counts, transports and
+switches for background services) only take effect on restart; changes to
+them are logged and ignored.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core.background import register_background_service
+from app.core.config import Settings, env_files, load_settings, settings
+from app.core.metrics import Counter
+
+CONFIG_RELOADS = Counter(
+    "nagatha_config_reloads_total", "Configuration reloads by outcome (applied, unchanged, invalid)", ["outcome"]
+)
+
+# Identity of this process and settings its long-lived resources were built from
+RESTART_FIELDS = {
+    "INSTANCE_ID", "START_TIME", "DATA_DIR",
+    "MCP_HTTP_STATELESS", "MCP_SESSION_BACKEND", "MCP_SESSION_DB_PATH",
+    "ANALYSIS_EXECUTOR", "ANALYSIS_PROCESS_WORKERS",
+    "WATCHLIST_ENABLED", "WATCHLIST_DB_PATH", "JOB_DB_PATH", "JOB_WORKERS",
+    "ARCHIVE_ENABLED", "ARCHIVE_DB_PATH", "AUDIT_ENABLED", "AUDIT_DIR", "DIAGNOSTICS_ENABLED",
+    "TREND_BUCKET_SECONDS", "TREND_WINDOW_HOURS", "TREND_SKETCH_WIDTH", "TREND_SKETCH_DEPTH", "TREND_TOP_TERMS",
+    "TREND_SEEN_STATUSES",
+    "CONFIG_RELOAD_ENABLED",
+}
+
+_listeners: List[Tuple[frozenset, object]] = []
+
+
+def register_settings_listener(fields: Iterable[str], listener):
+    """
+    Call `listener(old, new)` with the previous and the new Settings after a
+    reload that changed any of `fields`.
+    """
+    _listeners.append((frozenset(fields), listener))
+
+
+def reload_settings(new: Optional[Settings] = None) -> dict:
+    """
+    Read the settings again (or apply `new`) and switch to them. Returns the
+    fields that changed and those that need a restart.
+    """
+    if new is None:
+        try:
+            new = load_settings()
+        except ValidationError as e:
+            CONFIG_RELOADS.inc("invalid")
+            logging.error(f"Configuration not reloaded, invalid settings: {e}")
+            raise RuntimeError(f"Invalid configuration: {e}")
+    old = settings.current()
+    changed = {name for name in Settings.model_fields if getattr(old, name) != getattr(new, name)}
+    restart = sorted(changed & RESTART_FIELDS - {"INSTANCE_ID", "START_TIME"})
+    if restart:
+        logging.warning(f"Configuration changes that need a restart were not applied: {', '.join(restart)}")
+    changed -= RESTART_FIELDS
+    if not changed:
+        CONFIG_RELOADS.inc("unchanged")
+        return {"changed": [], "restart_required": restart}
+    settings.swap(new.model_copy(update={name: getattr(old, name) for name in RESTART_FIELDS}))
+    CONFIG_RELOADS.inc("applied")
+    logging.info(f"Configuration reloaded: {', '.join(sorted(changed))}")
+    current = settings.current()
+    for fields, listener in _listeners:
+        if fields & changed:
+            try:
+                listener(old, current)
+            except Exception as e:
+                logging.error(f"Failed to apply configuration change to {getattr(listener, '__qualname__', listener)}: {e}")
+    return {"changed": sorted(changed), "restart_required": restart}
+
+
+def _fingerprint() -> tuple:
+    stamps = []
+    for path in env_files(settings.CONFIG_FILE):
+        try:
+            stat = os.stat(path)
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append((path, None, None))
+    return tuple(stamps)
+
+
+_watch_task = None
+
+
+async def _watch_loop():
+    seen = _fingerprint()
+    while True:
+        await asyncio.sleep(settings.CONFIG_RELOAD_SECONDS)
+        current = _fingerprint()
+        if current == seen:
+            continue
+        seen = current
+        try:
+            reload_settings()
+        except Exception as e:
+            logging.error(f"Configuration reload failed: {e}")
+
+
+async def start_watcher():
+    global _watch_task
+    if settings.CONFIG_RELOAD_ENABLED and _watch_task is None:
+        _watch_task = asyncio.create_task(_watch_loop())
+
+
+async def stop_watcher():
+    global _watch_task
+    if _watch_task is not None:
+        _watch_task.cancel()
+        try:
+            await _watch_task
+        except asyncio.CancelledError:
+            pass
+        _watch_task = None
+
+
+register_background_service("config watcher", start_watcher, stop_watcher)
@@ -0,0 +1,298 @@
+"""
+Runtime diagnostics for finding what grows memory or blocks the event loop.
+
+The file://diagnostics resource reports, when DIAGNOSTICS_ENABLED is set:
+- process memory (RSS, peak, and the cgroup limit when running in a container)
+- the top allocation sites from tracemalloc, and the sites that grew most since
+  tracing started, when DIAGNOSTICS_TRACEMALLOC is on (it costs CPU and memory
+  while on, so it is separate and can be switched with a config reload)
+- entries held by each in-memory cache (app.core.metrics.register_cache_size)
+- open sessions, executor queue depths and admission slots in use
+- event-loop lag: how late a timer wakes up, sampled every DIAGNOSTICS_LAG_INTERVAL
+
+Reading file://diagnostics?profile_seconds=N also samples the stacks of all
+threads for the next N seconds (at most DIAGNOSTICS_PROFILE_MAX_SECONDS) and
+reports the functions and call paths seen most often. Nothing is sampled
+until a profile is asked for.
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as TallyCounter
+from typing import Dict, Optional
+
+from app.core.background import register_background_service
+from app.core.config import settings
+from app.core.config_reload import register_settings_listener
+from app.core.executors import get_executors
+from app.core.metrics import Gauge, Histogram, cache_sizes
+
+LOOP_LAG = Histogram(
+    "nagatha_event_loop_lag_seconds", "How late event-loop timers fire",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+_lag = {"last": 0.0, "max": 0.0, "samples": 0, "total": 0.0}
+_session_sources: Dict[str, object] = {}
+_baseline: Optional[tracemalloc.Snapshot] = None
+_profile_lock = threading.Lock()
+# A thread whose innermost Python frame is in one of these is blocked waiting, not working
+_IDLE_FILES = {"threading.py", "queue.py", "selectors.py", "thread.py"}
+
+
+def register_session_source(name: str, count_fn):
+    """
+    Report `count_fn()` as the number of open sessions of kind `name`.
+    """
+    _session_sources[name] = count_fn
+
+
+def _read_proc_status() -> dict:
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(rest.split()[0]) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def _cgroup_limit() -> Optional[int]:
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # "max", or a huge number, when no limit is set
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    return None
+
+
+def memory_usage() -> dict:
+    status = _read_proc_status()
+    return {
+        "rss_bytes": status.get("VmRSS"),
+        "peak_rss_bytes": status.get("VmHWM"),
+        "limit_bytes": _cgroup_limit(),
+        "gc_counts": list(gc.get_count()),
+    }
+
+
+def start_tracemalloc():
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.DIAGNOSTICS_TRACEMALLOC_FRAMES)
+        _baseline = tracemalloc.take_snapshot()
+
+
+def stop_tracemalloc():
+    global _baseline
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _baseline = None
+
+
+def _site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def allocations(top: int = 15) -> dict:
+    """
+    Largest allocation sites now and the ones that grew most since tracing
+    started. Blocking: taking a snapshot walks every traced block.
+    """
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+    result = {
+        "tracing": True,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "top": [
+            {"site": _site(stat), "bytes": stat.size, "blocks": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ],
+    }
+    if _baseline is not None:
+        result["growth"] = [
+            {"site": _site(stat), "bytes": stat.size_diff, "blocks": stat.count_diff}
+            for stat in snapshot.compare_to(_baseline, "lineno")[:top]
+            if stat.size_diff > 0
+        ]
+    return result
+
+
+def session_counts() -> dict:
+    counts = {}
+    for name, count_fn in _session_sources.items():
+        try:
+            counts[name] = count_fn()
+        except Exception as e:
+            counts[name] = f"error: {e}"
+    return counts
+
+
+def executor_queues() -> dict:
+    return {
+        name: {"queued": executor.queue_depth(), "workers": executor._max_workers}
+        for name, executor in sorted(get_executors().items())
+    }
+
+
+def loop_lag() -> dict:
+    return {
+        "last_seconds": round(_lag["last"], 6),
+        "max_seconds": round(_lag["max"], 6),
+        "mean_seconds": round(_lag["total"] / _lag["samples"], 6) if _lag["samples"] else 0.0,
+        "samples": _lag["samples"],
+    }
+
+
+def _function_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_profile(seconds: float, interval: float = 0.005, top: int = 20) -> dict:
+    """
+    Sample the stacks of all other threads every `interval` for `seconds`.
+    Blocking; run it in a worker thread so the event loop is sampled too.
+    Reports how often each function was on a stack ("inclusive") or running
+    ("self"), and the most frequent full call paths. Samples of threads
+    blocked waiting (idle pool workers, the event loop in select) are only
+    counted, so shares are of time spent working.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already being taken")
+    try:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        inclusive, leaf, paths = TallyCounter(), TallyCounter(), TallyCounter()
+        samples = idle = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    idle += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_function_name(frame))
+                    frame = frame.f_back
+                samples += 1
+                leaf[stack[0]] += 1
+                inclusive.update(set(stack))
+                paths[(names.get(ident, str(ident)),) + tuple(reversed(stack[:12]))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+
+    def share(count):
+        return round(count / samples, 4) if samples else 0.0
+
+    return {
+        "seconds": seconds,
+        "interval_seconds": interval,
+        "stack_samples": samples,
+        "idle_samples": idle,
+        "self": [{"function": name, "share": share(count)} for name, count in leaf.most_common(top)],
+        "inclusive": [{"function": name, "share": share(count)} for name, count in inclusive.most_common(top)],
+        "paths": [
+            {"thread": path[0], "stack": list(path[1:]), "share": share(count)}
+            for path, count in paths.most_common(top)
+        ],
+    }
+
+
+async def collect(profile_seconds: float = 0.0, top: int = 15) -> dict:
+    from app.core.admission import get_admission_controller
+
+    report = {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - settings.START_TIME.timestamp(), 1),
+        "threads": threading.active_count(),
+        "tasks": len(asyncio.all_tasks()),
+        "memory": memory_usage(),
+        "allocations": await asyncio.to_thread(allocations, top),
+        "caches": cache_sizes(),
+        "sessions": session_counts(),
+        "executors": executor_queues(),
+        "admission_in_flight": dict(get_admission_controller().in_flight),
+        "event_loop_lag": loop_lag(),
+    }
+    if profile_seconds > 0:
+        seconds = min(profile_seconds, settings.DIAGNOSTICS_PROFILE_MAX_SECONDS)
+        report["profile"] = await asyncio.to_thread(sample_profile, seconds, top=top)
+    return report
+
+
+_lag_task = None
+
+
+async def _lag_loop():
+    interval = settings.DIAGNOSTICS_LAG_INTERVAL
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+        _lag["last"] = lag
+        _lag["max"] = max(_lag["max"], lag)
+        _lag["samples"] += 1
+        _lag["total"] += lag
+        LOOP_LAG.observe(lag)
+
+
+async def start_monitor():
+    global _lag_task
+    if not settings.DIAGNOSTICS_ENABLED or _lag_task is not None:
+        return
+    if settings.DIAGNOSTICS_TRACEMALLOC:
+        start_tracemalloc()
+    _lag_task = asyncio.create_task(_lag_loop())
+
+
+async def stop_monitor():
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        try:
+            await _lag_task
+        except asyncio.CancelledError:
+            pass
+        _lag_task = None
+
+
+def _tracemalloc_changed(old, new):
+    # Restarted rather than adjusted so a new frame depth applies; growth is measured from here
+    stop_tracemalloc()
+    if new.DIAGNOSTICS_ENABLED and new.DIAGNOSTICS_TRACEMALLOC:
+        start_tracemalloc()
+    logging.info(f"tracemalloc {'started' if tracemalloc.is_tracing() else 'stopped'}")
+
+
+register_settings_listener(["DIAGNOSTICS_TRACEMALLOC", "DIAGNOSTICS_TRACEMALLOC_FRAMES"], _tracemalloc_changed)
+register_background_service("diagnostics", start_monitor, stop_monitor)
+
+Gauge("nagatha_event_loop_lag_max_seconds", "Largest event-loop lag seen", fn=lambda: {(): _lag["max"]})
+Gauge(
+    "nagatha_sessions", "Open sessions", ["kind"],
+    fn=lambda: {(name,): count for name, count in session_counts().items() if isinstance(count, int)},
+)
@@ -0,0 +1,68 @@
+"""
+Thread pools for blocking upstream clients (Mastodon.py is synchronous).
+
+Every pool is registered by name so its queue depth can be exported, and
+run_blocking() records how long work waited for a thread and how long the
+upstream call itself took, as metrics and as trace spans.
+"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.metrics import EXECUTOR_WAIT, Gauge, track_upstream
+from app.core.tracing import span
+
+_executors: dict[str, "NamedExecutor"] = {}
+
+
+class NamedExecutor(ThreadPoolExecutor):
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+
+    def queue_depth(self) -> int:
+        return self._work_queue.qsize()
+
+
+def make_executor(name: str, max_workers: int) -> NamedExecutor:
+    executor = NamedExecutor(name, max_workers)
+    _executors[name] = executor
+    return executor
+
+
+def get_executors() -> dict:
+    return dict(_executors)
+
+
+async def run_blocking(executor: NamedExecutor, service: str, operation: str, func, /, *args, **kwargs):
+    """
+    Run a blocking upstream call on `executor` without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+    with span(f"executor {executor.name}", **{"executor.name": executor.name}) as hop:
+
+        def call():
+            wait = time.perf_counter() - submitted
+            EXECUTOR_WAIT.observe(wait, executor.name)
+            hop.set_attribute("executor.wait_ms", round(wait * 1000, 3))
+            with track_upstream(service, operation), span(
+                f"{service} {operation}", **{"upstream.service": service, "upstream.operation": operation}
+            ) as upstream:
+                result = func(*args, **kwargs)
+                if isinstance(result, list):
+                    upstream.set_attribute("result.count", len(result))
+                return result
+
+        # Copy the context so spans opened in the worker thread nest under the hop.
+        return await loop.run_in_executor(executor, contextvars.copy_context().run, call)
+
+
+Gauge(
+    "nagatha_executor_queue_depth",
+    "Work items waiting for an executor thread",
+    ["executor"],
+    fn=lambda: {(name,): executor.queue_depth() for name, executor in _executors.items()},
+)
@@ -0,0 +1,301 @@
+"""
+Durable job queue for long-running work.
+
+Jobs are stored in SQLite with their work items and per-item results. A job
+type registers two coroutines: `expand(params)` turns the job parameters into
+a list of JSON-serializable items once, and `process(item, params)` handles
+one item. Workers claim jobs under a lease, process items in small concurrent
+batches and commit each batch's results before moving on, so a restart or a
+crashed worker only repeats the batch that was in flight. Jobs whose lease
+expired are picked up again by any worker sharing the database.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from functools import lru_cache
+from typing import List, Optional
+
+from app.core.background import register_background_service
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.core.session_store import worker_id
+from app.core.tracing import span
+
+JOB_ITEMS = Counter("nagatha_job_items_total", "Job items processed by outcome", ["kind", "status"])
+
+_job_types = {}
+
+
+def register_job_type(kind: str, expand, process):
+    _job_types[kind] = (expand, process)
+
+
+def job_types() -> List[str]:
+    return sorted(_job_types)
+
+
+class JobQueue:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, total INTEGER, "
+            "done INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "lease_owner TEXT, lease_expires REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_items (job_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "item TEXT NOT NULL, PRIMARY KEY (job_id, idx))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results (job_id TEXT NOT NULL, idx INTEGER NOT NULL, ok INTEGER NOT NULL, "
+            "result TEXT NOT NULL, finished_at REAL NOT NULL, PRIMARY KEY (job_id, idx))"
+        )
+
+    def submit(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        self.conn.execute(
+            "INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(params), time.time()),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT id, kind, params, status, created_at, started_at, finished_at, total, done, failed, error "
+            "FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        return self._job(row) if row else None
+
+    def recent(self, limit: int = 20) -> List[dict]:
+        rows = self.conn.execute(
+            "SELECT id, kind, params, status, created_at, started_at, finished_at, total, done, failed, error "
+            "FROM jobs ORDER BY created_at DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [self._job(row) for row in rows]
+
+    @staticmethod
+    def _job(row) -> dict:
+        keys = ("id", "kind", "params", "status", "created_at", "started_at", "finished_at", "total", "done", "failed", "error")
+        job = dict(zip(keys, row))
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[dict]:
+        """
+        Take the oldest queued job, or a running job whose lease expired.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?), "
+                "lease_owner = ?, lease_expires = ? WHERE id = ?",
+                (now, owner, now + lease_seconds, row[0]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0])
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Extend the lease; False if the job was cancelled or taken over.
+        """
+        return self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (time.time() + lease_seconds, job_id, owner),
+        ).rowcount > 0
+
+    def set_items(self, job_id: str, items: list):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO job_items (job_id, idx, item) VALUES (?, ?, ?)",
+                [(job_id, i, json.dumps(item)) for i, item in enumerate(items)],
+            )
+            self.conn.execute("UPDATE jobs SET total = ? WHERE id = ?", (len(items), job_id))
+
+    def pending_items(self, job_id: str) -> List[tuple]:
+        rows = self.conn.execute(
+            "SELECT i.idx, i.item FROM job_items i LEFT JOIN job_results r ON r.job_id = i.job_id AND r.idx = i.idx "
+            "WHERE i.job_id = ? AND r.idx IS NULL ORDER BY i.idx",
+            (job_id,),
+        ).fetchall()
+        return [(idx, json.loads(item)) for idx, item in rows]
+
+    def checkpoint(self, job_id: str, results: List[tuple]):
+        """
+        Commit a batch of (index, ok, result) tuples and the job counters together.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, idx, ok, result, finished_at) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, idx, int(ok), json.dumps(result, default=str), now) for idx, ok, result in results],
+            )
+            self.conn.execute(
+                "UPDATE jobs SET done = (SELECT COUNT(*) FROM job_results WHERE job_id = ?), "
+                "failed = (SELECT COUNT(*) FROM job_results WHERE job_id = ? AND ok = 0) WHERE id = ?",
+                (job_id, job_id, job_id),
+            )
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (status, error, time.time(), job_id),
+        )
+
+    def cancel(self, job_id: str) -> bool:
+        return self.conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id),
+        ).rowcount > 0
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 50) -> List[dict]:
+        rows = self.conn.execute(
+            "SELECT r.idx, r.ok, i.item, r.result FROM job_results r JOIN job_items i ON i.job_id = r.job_id AND i.idx = r.idx "
+            "WHERE r.job_id = ? ORDER BY r.idx LIMIT ? OFFSET ?",
+            (job_id, limit, offset),
+        ).fetchall()
+        return [
+            {"index": idx, "ok": bool(ok), "item": json.loads(item), "result": json.loads(result)}
+            for idx, ok, item, result in rows
+        ]
+
+    def release(self, owner: str):
+        """
+        Expire the leases held by `owner` so another worker resumes its jobs right away.
+        """
+        self.conn.execute(
+            "UPDATE jobs SET lease_expires = 0 WHERE lease_owner = ? AND status = 'running'", (owner,)
+        )
+
+    def count(self, status: str) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    return JobQueue(settings.JOB_DB_PATH or os.path.join(settings.DATA_DIR, "jobs.sqlite3"))
+
+
+Gauge(
+    "nagatha_jobs_queued",
+    "Jobs waiting for a worker",
+    fn=lambda: {(): get_job_queue().count("queued")} if get_job_queue.cache_info().currsize else {},
+)
+
+_wakeup: Optional[asyncio.Event] = None
+_workers: List[tuple] = []
+
+
+def submit_job(kind: str, params: dict) -> str:
+    if kind not in _job_types:
+        raise ValueError(f"Unknown job type: {kind}. Available: {', '.join(job_types())}")
+    job_id = get_job_queue().submit(kind, params)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id
+
+
+async def _process_item(process, kind: str, idx: int, item, params: dict) -> tuple:
+    try:
+        result = await process(item, params)
+        JOB_ITEMS.inc(kind, "ok")
+        return idx, True, result
+    except Exception as e:
+        logging.error(f"Job item {kind}[{idx}] failed: {e}")
+        JOB_ITEMS.inc(kind, "error")
+        return idx, False, {"error": str(e)}
+
+
+async def run_job(job: dict, owner: str, queue: Optional[JobQueue] = None):
+    queue = queue or get_job_queue()
+    expand, process = _job_types[job["kind"]]
+    params = job["params"]
+    with span(f"job {job['kind']}", **{"job.id": job["id"], "job.kind": job["kind"]}):
+        if job["total"] is None:
+            queue.set_items(job["id"], await expand(params))
+        pending = queue.pending_items(job["id"])
+        batch_size = max(1, settings.JOB_BATCH_SIZE)
+        for start in range(0, len(pending), batch_size):
+            # Stop between batches if the job was cancelled or another worker took it over.
+            if not queue.renew(job["id"], owner, settings.JOB_LEASE_SECONDS):
+                logging.info(f"Job {job['id']} stopped: cancelled or lease lost")
+                return
+            batch = pending[start:start + batch_size]
+            results = await asyncio.gather(
+                *(_process_item(process, job["kind"], idx, item, params) for idx, item in batch)
+            )
+            queue.checkpoint(job["id"], results)
+        queue.finish(job["id"], "completed")
+
+
+async def _worker_loop(owner: str):
+    queue = get_job_queue()
+    while True:
+        try:
+            job = queue.claim(owner, settings.JOB_LEASE_SECONDS)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Job claim failed: {e}")
+            job = None
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await run_job(job, owner)
+        except asyncio.CancelledError:
+            # Shutting down: the lease expires and the job resumes from its last checkpoint.
+            raise
+        except Exception as e:
+            logging.error(f"Job {job['id']} failed: {e}")
+            queue.finish(job["id"], "failed", str(e))
+
+
+async def start_workers():
+    global _wakeup
+    if settings.JOB_WORKERS <= 0 or _workers:
+        return
+    _wakeup = asyncio.Event()
+    for n in range(settings.JOB_WORKERS):
+        owner = f"{worker_id()}:{n}"
+        _workers.append((owner, asyncio.create_task(_worker_loop(owner))))
+
+
+async def stop_workers():
+    for _, task in _workers:
+        task.cancel()
+    await asyncio.gather(*(task for _, task in _workers), return_exceptions=True)
+    for owner, _ in _workers:
+        get_job_queue().release(owner)
+    _workers.clear()
+
+
+register_background_service("job workers", start_workers, stop_workers)
@@ -1,15 +1,228 @@
-from mastodon import Mastodon
+"""
+Mastodon API clients, one pool per instance.
+
+The instance in MASTODON_API_BASE / MASTODON_ACCESS_TOKEN is "default"; more
+can be configured in MASTODON_INSTANCES. Each instance owns its Mastodon.py
+client (and with it the rate-limit state the API reports), an HTTP connection
+pool and thread pools sized to it, so a slow or rate-limited instance only
+backs up its own calls. Instances are created on first use and kept so their
+connections stay warm. When the configuration is reloaded, an instance whose
+token or address changed gets a new client, one whose worker count changed
+new thread pools, and one that was removed is dropped; the others are untouched.
+"""
+
+import os
+import threading
 from functools import lru_cache
-from app.core.config import settings
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.core.config import MastodonInstanceConfig, Settings, settings
+from app.core.config_reload import register_settings_listener
+from app.core.executors import NamedExecutor, make_executor
+from app.utils.mastodon import server_domain
+
+if TYPE_CHECKING:
+    from mastodon import Mastodon
+
+DEFAULT_INSTANCE = "default"
+DEFAULT_API_BASE = "https://stranger.social"
+
+
+class MastodonInstance:
+    def __init__(self, name: str, config: MastodonInstanceConfig):
+        self.name = name
+        self.api_base = config.api_base.rstrip("/")
+        self.domain = server_domain(self.api_base)
+        self.access_token = config.access_token
+        self.workers = config.workers
+        self._make_executors()
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _make_executors(self):
+        # The default instance keeps the executor names used before there were several.
+        suffix = "" if self.name == DEFAULT_INSTANCE else f":{self.name}"
+        self.executor: NamedExecutor = make_executor(f"mastodon{suffix}", self.workers)
+        self.admin_executor: NamedExecutor = make_executor(f"mastodon_admin{suffix}", self.workers)
+
+    def reconfigure(self, config: MastodonInstanceConfig):
+        """
+        Apply a changed configuration, rebuilding only what it affects. Calls
+        already running finish on the old client and thread pools.
+        """
+        if config.workers != self.workers:
+            old = (self.executor, self.admin_executor)
+            self.workers = config.workers
+            self._make_executors()
+            for executor in old:
+                executor.shutdown(wait=False)
+        if config.api_base.rstrip("/") != self.api_base or config.access_token != self.access_token:
+            with self._lock:
+                self.api_base = config.api_base.rstrip("/")
+                self.domain = server_domain(self.api_base)
+                self.access_token = config.access_token
+                self._client = None
+
+    def reset_client(self):
+        with self._lock:
+            self._client = None
+
+    @property
+    def client(self) -> "Mastodon":
+        with self._lock:
+            if self._client is None:
+                self._client = self._create_client()
+            return self._client
+
+    def _create_client(self) -> "Mastodon":
+        replaying = settings.MASTODON_CASSETTE_MODE == "replay"
+        if not self.access_token and not replaying:
+            if self.name == DEFAULT_INSTANCE:
+                raise RuntimeError("MASTODON_ACCESS_TOKEN not set in environment.")
+            raise RuntimeError(f"No access_token configured for Mastodon instance {self.name}.")
+        # Imported on first use: Mastodon.py is slow to import and stdio clients
+        # list tools before they ever call one.
+        import requests
+        from mastodon import Mastodon
+
+        session = get_cassette_session()
+        if session is None:
+            session = requests.Session()
+            # Both thread pools share the session; size its pool so no request waits for a connection.
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2 * self.workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        return Mastodon(
+            access_token=self.access_token or "replay",
+            api_base_url=self.api_base,
+            ratelimit_method='throw',
+            session=session,
+        )
+
+    def api(self, method: str, endpoint: str, params: Optional[dict] = None):
+        """
+        Raw API request returning plain JSON (dicts and lists, timestamps as
+        strings). Mastodon.py's typed endpoint wrappers cast every nested
+        entity, which costs tens of milliseconds per status; callers here only
+        read a few fields, so hot paths skip that.
+        """
+        return self.client._Mastodon__api_request(method, endpoint, params=params or {})
+
+    @property
+    def ratelimit_remaining(self) -> Optional[int]:
+        return getattr(self._client, "ratelimit_remaining", None) if self._client else None
+
+    @property
+    def ratelimit_reset(self) -> Optional[float]:
+        return getattr(self._client, "ratelimit_reset", None) if self._client else None
+
+
+_instances: Dict[str, MastodonInstance] = {}
+_instances_lock = threading.Lock()
+
+
+def instance_configs(config: Optional[Settings] = None) -> Dict[str, MastodonInstanceConfig]:
+    config = config or settings
+    configs = {
+        DEFAULT_INSTANCE: MastodonInstanceConfig(
+            api_base=config.MASTODON_API_BASE or DEFAULT_API_BASE,
+            access_token=config.MASTODON_ACCESS_TOKEN,
+            workers=config.MASTODON_WORKERS,
+        )
+    }
+    configs.update(config.MASTODON_INSTANCES)
+    return configs
+
+
+def instance_names() -> List[str]:
+    return list(instance_configs())
+
 
 @lru_cache()
-def get_mastodon_client() -> Mastodon:
-    access_token = settings.MASTODON_ACCESS_TOKEN
-    api_base_url = settings.MASTODON_API_BASE or "https://stranger.social"
-    if not access_token:
-        raise RuntimeError("MASTODON_ACCESS_TOKEN not set in environment.")
-    return Mastodon(
-        access_token=access_token,
-        api_base_url=api_base_url,
-        ratelimit_method='throw',
-    ) 
\ No newline at end of file
+def _domain_index(api_bases: tuple) -> Dict[str, str]:
+    return {server_domain(api_base): name for name, api_base in api_bases}
+
+
+def find_instance_name(name_or_domain: str) -> Optional[str]:
+    configs = instance_configs()
+    if name_or_domain in configs:
+        return name_or_domain
+    return _domain_index(tuple((name, c.api_base) for name, c in configs.items())).get(name_or_domain.lower())
+
+
+def get_instance(name: Optional[str] = None) -> MastodonInstance:
+    """
+    The instance with this name or domain; the default instance when None.
+    """
+    key = find_instance_name(name) if name else DEFAULT_INSTANCE
+    if key is None:
+        raise ValueError(f"Unknown Mastodon instance: {name}. Available: {', '.join(instance_names())}")
+    instance = _instances.get(key)
+    if instance is None:
+        with _instances_lock:
+            instance = _instances.get(key)
+            if instance is None:
+                instance = _instances[key] = MastodonInstance(key, instance_configs()[key])
+    return instance
+
+
+def instance_for_account(username: str, name: Optional[str] = None) -> MastodonInstance:
+    """
+    The instance to query for an account: the one named explicitly, else the
+    configured instance matching the account's domain, else the default.
+    """
+    if name:
+        return get_instance(name)
+    domain = username.lstrip("@").rpartition("@")[2] if "@" in username.lstrip("@") else ""
+    return get_instance(find_instance_name(domain) if domain else None)
+
+
+def active_instances() -> List[MastodonInstance]:
+    return list(_instances.values())
+
+
+def get_mastodon_client(instance: Optional[str] = None) -> "Mastodon":
+    return get_instance(instance).client
+
+
+@lru_cache()
+def get_cassette_session():
+    """
+    Recording/replaying requests session when MASTODON_CASSETTE_MODE is set,
+    else None. Shared by all instances so one cassette file has one writer.
+    """
+    if settings.MASTODON_CASSETTE_MODE == "off":
+        return None
+    from app.core.cassette import CassetteSession
+    return CassetteSession(
+        settings.MASTODON_CASSETTE_MODE,
+        settings.MASTODON_CASSETTE_PATH or os.path.join(settings.DATA_DIR, "mastodon.cassette.jsonl.gz"),
+        settings.MASTODON_CASSETTE_REPLAY_LATENCY,
+    )
+
+
+def _instances_changed(old: Settings, new: Settings):
+    configs = instance_configs(new)
+    with _instances_lock:
+        for name, instance in list(_instances.items()):
+            if name not in configs:
+                del _instances[name]
+                instance.executor.shutdown(wait=False)
+                instance.admin_executor.shutdown(wait=False)
+            else:
+                instance.reconfigure(configs[name])
+
+
+def _cassette_changed(old: Settings, new: Settings):
+    # Clients hold the old cassette session (or none); new ones pick up the new one
+    get_cassette_session.cache_clear()
+    for instance in active_instances():
+        instance.reset_client()
+
+
+register_settings_listener(
+    ["MASTODON_API_BASE", "MASTODON_ACCESS_TOKEN", "MASTODON_WORKERS", "MASTODON_INSTANCES"], _instances_changed
+)
+register_settings_listener(
+    ["MASTODON_CASSETTE_MODE", "MASTODON_CASSETTE_PATH", "MASTODON_CASSETTE_REPLAY_LATENCY"], _cassette_changed
+)
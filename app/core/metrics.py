@@ -0,0 +1,193 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters and histograms are plain dicts keyed by label values, guarded by a
+lock because upstream calls are timed from executor threads. Gauges are read
+from callbacks at scrape time, so nothing is sampled between scrapes.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def add_collector(self, fn):
+        """
+        Merge values from `fn()` (a dict of label tuple -> value) at scrape time.
+        """
+        self._collectors.append(fn)
+
+    def collect(self) -> dict:
+        with self._lock:
+            values = dict(self._values)
+        for fn in self._collectors:
+            for key, value in fn().items():
+                values[key] = values.get(key, 0) + value
+        return values
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self.collect().items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+        _registry.append(self)
+
+    def collect(self) -> dict:
+        return self.fn() if self.fn else {}
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for key, value in sorted(self.collect().items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}"
+
+
+TOOL_CALLS = Counter("nagatha_tool_calls_total", "MCP tool calls", ["tool"])
+TOOL_ERRORS = Counter("nagatha_tool_errors_total", "MCP tool calls that returned an error", ["tool"])
+TOOL_DURATION = Histogram("nagatha_tool_duration_seconds", "MCP tool call latency", ["tool"])
+UPSTREAM_DURATION = Histogram(
+    "nagatha_upstream_request_duration_seconds",
+    "Latency of calls to upstream services, by service and endpoint or function",
+    ["service", "operation"],
+)
+UPSTREAM_ERRORS = Counter(
+    "nagatha_upstream_errors_total", "Failed calls to upstream services", ["service", "operation"]
+)
+EXECUTOR_WAIT = Histogram(
+    "nagatha_executor_wait_seconds", "Time work spent queued before an executor thread picked it up", ["executor"]
+)
+CACHE_REQUESTS = Counter("nagatha_cache_requests_total", "Cache lookups by outcome", ["cache", "result"])
+CACHE_ENTRIES = Gauge(
+    "nagatha_cache_entries", "Entries held in in-memory caches", ["cache"],
+    fn=lambda: {(cache,): size for cache, size in cache_sizes().items()},
+)
+
+
+@contextmanager
+def track_upstream(service: str, operation: str):
+    """
+    Time one upstream call; exceptions are counted and re-raised.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(service, operation)
+        raise
+    finally:
+        UPSTREAM_DURATION.observe(time.perf_counter() - started, service, operation)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def register_lru_cache(cache: str, cached_function):
+    """
+    Export the hit/miss counts of a functools.lru_cache wrapped function.
+    """
+    def collect():
+        info = cached_function.cache_info()
+        return {(cache, "hit"): info.hits, (cache, "miss"): info.misses}
+    CACHE_REQUESTS.add_collector(collect)
+
+
+_cache_sizes = {}
+
+
+def register_cache_size(cache: str, size_fn):
+    """
+    Export the number of entries an in-memory cache holds, read at scrape time.
+    """
+    _cache_sizes[cache] = size_fn
+
+
+def cache_sizes() -> dict:
+    return {cache: size_fn() for cache, size_fn in _cache_sizes.items()}
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,137 @@
+"""
+Process-pool execution backend for CPU-bound analysis stages.
+
+Work submitted through run_cpu_bound() runs inline for small inputs and in a
+shared ProcessPoolExecutor for large ones, so heavy analysis never blocks the
+event loop that serves every other MCP session.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "inline": 0,
+    "queue_wait_seconds": 0.0,
+    "run_seconds": 0.0,
+    "max_queue_wait_seconds": 0.0,
+}
+
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process may run on (respects affinity/cgroup pinning).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def pool_size() -> int:
+    configured = settings.ANALYSIS_PROCESS_WORKERS
+    if configured > 0:
+        return configured
+    # Leave one core to the event loop when there is more than one.
+    cpus = available_cpus()
+    return max(1, cpus - 1) if cpus > 1 else 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = pool_size()
+            # spawn rather than fork: the parent runs threads and an event loop.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logging.info(f"Started analysis process pool with {workers} workers")
+        return _pool
+
+
+def shutdown_process_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+def _timed_call(func, args):
+    # Runs in the worker; wall-clock timestamps are comparable across processes.
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time()
+
+
+def _use_process_pool(size: int) -> bool:
+    return settings.ANALYSIS_EXECUTOR == "process" and size >= settings.ANALYSIS_PROCESS_MIN_ITEMS
+
+
+async def run_cpu_bound(func, *args, size: int = 0):
+    """
+    Run a picklable, module-level function on the analysis backend.
+    `size` is the number of items in the batch; batches below
+    ANALYSIS_PROCESS_MIN_ITEMS run inline because the IPC round trip would
+    cost more than the computation.
+    """
+    if not _use_process_pool(size):
+        _stats["inline"] += 1
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    submitted = time.time()
+    _stats["submitted"] += 1
+    try:
+        result, started, finished = await loop.run_in_executor(get_process_pool(), _timed_call, func, args)
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _stats["completed"] += 1
+    wait = max(0.0, started - submitted)
+    _stats["queue_wait_seconds"] += wait
+    _stats["run_seconds"] += finished - started
+    _stats["max_queue_wait_seconds"] = max(_stats["max_queue_wait_seconds"], wait)
+    return result
+
+
+def get_pool_stats() -> dict:
+    """
+    Snapshot of backend counters: in-flight depth plus cumulative queue wait
+    and run time for work that went through the process pool.
+    """
+    done = _stats["completed"] - _stats["failed"]
+    return {
+        "executor": settings.ANALYSIS_EXECUTOR,
+        "workers": pool_size() if settings.ANALYSIS_EXECUTOR == "process" else 0,
+        "started": _pool is not None,
+        "in_flight": _stats["submitted"] - _stats["completed"],
+        "avg_queue_wait_seconds": _stats["queue_wait_seconds"] / done if done else 0.0,
+        "avg_run_seconds": _stats["run_seconds"] / done if done else 0.0,
+        **_stats,
+    }
+
+
+Gauge(
+    "nagatha_analysis_in_flight",
+    "Analysis batches submitted to the process pool and not yet finished",
+    fn=lambda: {(): _stats["submitted"] - _stats["completed"]},
+)
+Counter(
+    "nagatha_analysis_seconds_total",
+    "Cumulative process-pool queue wait and run time",
+    ["phase"],
+).add_collector(lambda: {("queue_wait",): _stats["queue_wait_seconds"], ("run",): _stats["run_seconds"]})
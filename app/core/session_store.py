@@ -0,0 +1,159 @@
+"""
+Session-state backends for the Streamable HTTP transport.
+
+A session store records which MCP sessions have been initialized and by which
+worker. Workers consult it when a request carries a session ID they did not
+create, so a session opened on one worker can be served by any other.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import settings
+
+# Last-seen timestamps are only rewritten after this many seconds, so a busy
+# session does not turn every request into a write.
+TOUCH_INTERVAL_SECONDS = 15
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SessionStore:
+    """
+    Interface for session-state backends.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._touched: dict[str, float] = {}
+
+    def put(self, session_id: str, owner: str):
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def _write_last_seen(self, session_id: str, now: float):
+        raise NotImplementedError
+
+    def touch(self, session_id: str):
+        now = time.time()
+        if now - self._touched.get(session_id, 0.0) >= TOUCH_INTERVAL_SECONDS:
+            self._touched[session_id] = now
+            self._write_last_seen(session_id, now)
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local store; sessions are only visible to the worker that created them.
+    """
+
+    def __init__(self, ttl: int):
+        super().__init__(ttl)
+        self._sessions: dict[str, dict] = {}
+
+    def put(self, session_id: str, owner: str):
+        now = time.time()
+        self._sessions[session_id] = {"session_id": session_id, "owner": owner, "created_at": now, "last_seen": now}
+
+    def get(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.get(session_id)
+        if session and time.time() - session["last_seen"] > self.ttl:
+            self.delete(session_id)
+            return None
+        return session
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._touched.pop(session_id, None)
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def _write_last_seen(self, session_id: str, now: float):
+        if session_id in self._sessions:
+            self._sessions[session_id]["last_seen"] = now
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store shared by every worker that points at the same file.
+    WAL mode lets readers proceed while another worker writes.
+    """
+
+    def __init__(self, path: str, ttl: int):
+        super().__init__(ttl)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS mcp_sessions ("
+                "session_id TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_seen REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, session_id: str, owner: str):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("DELETE FROM mcp_sessions WHERE last_seen < ?", (now - self.ttl,))
+        conn.execute(
+            "INSERT OR REPLACE INTO mcp_sessions (session_id, owner, created_at, last_seen) VALUES (?, ?, ?, ?)",
+            (session_id, owner, now, now),
+        )
+
+    def get(self, session_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT session_id, owner, created_at, last_seen FROM mcp_sessions "
+            "WHERE session_id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("session_id", "owner", "created_at", "last_seen"), row))
+
+    def delete(self, session_id: str):
+        self._connect().execute("DELETE FROM mcp_sessions WHERE session_id = ?", (session_id,))
+        self._touched.pop(session_id, None)
+
+    def count(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM mcp_sessions WHERE last_seen >= ?", (time.time() - self.ttl,)
+        ).fetchone()[0]
+
+    def _write_last_seen(self, session_id: str, now: float):
+        self._connect().execute("UPDATE mcp_sessions SET last_seen = ? WHERE session_id = ?", (now, session_id))
+
+
+@lru_cache()
+def get_session_store() -> SessionStore:
+    backend = settings.MCP_SESSION_BACKEND
+    ttl = settings.MCP_SESSION_TTL
+    if backend == "sqlite":
+        path = settings.MCP_SESSION_DB_PATH or os.path.join(settings.DATA_DIR, "sessions.sqlite3")
+        logging.info(f"Using SQLite session store at {path}")
+        return SQLiteSessionStore(path, ttl)
+    return MemorySessionStore(ttl)
@@ -0,0 +1,169 @@
+"""
+Lightweight tracing for tool calls and the upstream calls they make.
+
+Spans use OpenTelemetry's data model (128-bit trace IDs, 64-bit span IDs,
+parent links, attributes, status) and are exported as one JSON object per
+line in the same shape as the OpenTelemetry SDK's console exporter, so no
+collector is needed. The current span is tracked in a context variable; code
+that hops to an executor thread must run under a copied context.
+
+Tracing is off by default and can be switched at runtime with set_tracing().
+"""
+
+import contextvars
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.core.config_reload import register_settings_listener
+
+_current_span = contextvars.ContextVar("nagatha_current_span", default=None)
+_state = {
+    "enabled": settings.TRACING_ENABLED,
+    "exporter": settings.TRACING_EXPORTER,
+    "path": settings.TRACING_FILE or os.path.join(settings.DATA_DIR, "traces.jsonl"),
+}
+_export_lock = threading.Lock()
+_file = None
+
+
+def _timestamp(ns: int) -> str:
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class Span:
+    def __init__(self, name: str, attributes: dict):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.status = "UNSET"
+        self.status_description = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, description: str):
+        self.status = "ERROR"
+        self.status_description = description
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.set_error(f"{exc_type.__name__}: {exc}")
+        elif self.status == "UNSET":
+            self.status = "OK"
+        _export(self)
+        return False
+
+    def to_dict(self) -> dict:
+        status = {"status_code": self.status}
+        if self.status_description:
+            status["description"] = self.status_description
+        return {
+            "name": self.name,
+            "context": {"trace_id": "0x" + self.trace_id, "span_id": "0x" + self.span_id},
+            "parent_id": "0x" + self.parent_id if self.parent_id else None,
+            "start_time": _timestamp(self.start_ns),
+            "end_time": _timestamp(self.end_ns),
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": status,
+            "attributes": self.attributes,
+            "resource": {"service.name": "nagatha-mastodon", "service.instance.id": settings.INSTANCE_ID},
+        }
+
+
+class _NoopSpan:
+    """
+    Returned while tracing is disabled so instrumented code pays almost nothing.
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, description):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """
+    Start a span as a context manager; it becomes the parent of spans opened inside it.
+    """
+    if not _state["enabled"]:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def current_span():
+    return _current_span.get() or _NOOP_SPAN
+
+
+def _export(finished: Span):
+    global _file
+    line = json.dumps(finished.to_dict(), default=str)
+    with _export_lock:
+        if _state["exporter"] == "file":
+            if _file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(_state["path"])), exist_ok=True)
+                _file = open(_state["path"], "a", encoding="utf-8")
+            _file.write(line + "\n")
+            if finished.parent_id is None:
+                _file.flush()
+        else:
+            # stderr, never stdout: stdout carries the stdio MCP transport.
+            print(line, file=sys.stderr, flush=True)
+
+
+def set_tracing(enabled: bool, exporter: str = None, path: str = None) -> dict:
+    """
+    Switch tracing on or off at runtime, optionally changing the exporter.
+    """
+    global _file
+    with _export_lock:
+        if exporter:
+            _state["exporter"] = exporter
+        if path:
+            _state["path"] = path
+        if _file is not None and (not enabled or exporter or path):
+            _file.close()
+            _file = None
+        _state["enabled"] = enabled
+    logging.info(f"Tracing {'enabled' if enabled else 'disabled'} ({_state['exporter']} exporter)")
+    return get_tracing_state()
+
+
+def get_tracing_state() -> dict:
+    return dict(_state)
+
+
+def _settings_changed(old, new):
+    set_tracing(new.TRACING_ENABLED, new.TRACING_EXPORTER, new.TRACING_FILE or os.path.join(new.DATA_DIR, "traces.jsonl"))
+
+
+register_settings_listener(["TRACING_ENABLED", "TRACING_EXPORTER", "TRACING_FILE"], _settings_changed)
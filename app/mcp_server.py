@@ -7,7 +7,9 @@ as MCP tools that can be used by LLM clients.
 
 import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl
 
 import mcp.server.stdio
 import mcp.types as types
@@ -18,201 +20,688 @@ from app.schemas.user_eval import UserProfileIn, UserEvaluationOut
 from app.schemas.user_activity import UserActivityIn, UserActivityOut, RecentPost
 from app.schemas.report import UserReportIn, ReportTriageOut
 from app.schemas.user_common import UserIdentifierIn
+from app.schemas.watchlist import WatchlistChangesOut
+from app.schemas.jobs import JobOut, JobResultsOut
+from app.schemas.audit import AuditEntry, AuditHistoryOut
 from app.services.llm import evaluate_user_profile
 from app.services.activity import analyze_user_activity
 from app.services.moderation import triage_user_report
 from app.services import mastodon as mastodon_service
+from app.services import watchlist as watchlist_service
+from app.services.cohorts import analyze_signup_cohort
+from app.services import interactions as interaction_service
+from app.services.resolver import resolve_accounts
+from app.services.links import link_report
+from app.services import archive as archive_service
+from app.services.export import run_export
+from app.services.trends import surging_terms
+import app.services.jobs  # noqa: F401 - registers the job types
+from app.core import audit_log, diagnostics, job_queue
+from app.core.admission import Overloaded, get_admission_controller
+from app.core.mastodon_client import find_instance_name, instance_configs
 from app.utils.mastodon import normalize_mastodon_username
+from app.utils.serialization import dumps, model_to_dict, project
+from app.core.background import background_services
 from app.core.config import settings
+from app.core.metrics import TOOL_CALLS, TOOL_DURATION, TOOL_ERRORS
+from app.core.tracing import current_span, get_tracing_state, set_tracing, span
+from app.core.process_pool import get_pool_stats
 
 
 # Create a server instance
 server = Server("nagatha-mastodon")
 
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
-    """
-    List available tools.
-    Each tool can take arguments and return results.
-    """
-    return [
-        types.Tool(
-            name="evaluate_user_profile",
-            description="Evaluate a Mastodon user's profile for moderation risk and engagement potential",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "username": {
-                        "type": "string",
-                        "description": "Mastodon username (with or without @domain)"
-                    },
-                    "display_name": {
-                        "type": "string", 
-                        "description": "User's display name"
-                    },
-                    "bio": {
-                        "type": "string",
-                        "description": "User's profile bio/description"
-                    },
-                    "followers_count": {
-                        "type": "integer",
-                        "description": "Number of followers"
-                    },
-                    "following_count": {
-                        "type": "integer", 
-                        "description": "Number of accounts following"
-                    },
-                    "posts_count": {
-                        "type": "integer",
-                        "description": "Total number of posts"
-                    },
-                    "avatar": {
-                        "type": "string",
-                        "description": "Avatar URL (optional)"
-                    },
-                    "created_at": {
-                        "type": "string",
-                        "description": "Account creation date (optional)"
-                    }
+# Tool definitions are built once at import time; list_tools just returns them.
+TOOLS = [
+    types.Tool(
+        name="evaluate_user_profile",
+        description="Evaluate a Mastodon user's profile for moderation risk and engagement potential",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username (with or without @domain)"
                 },
-                "required": ["username", "display_name", "bio", "followers_count", "following_count", "posts_count"]
-            }
-        ),
-        types.Tool(
-            name="evaluate_user_auto",
-            description="Auto-fetch and evaluate a Mastodon user's profile from their username",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "username": {
-                        "type": "string",
-                        "description": "Mastodon username (with or without @domain)"
-                    }
+                "display_name": {
+                    "type": "string", 
+                    "description": "User's display name"
                 },
-                "required": ["username"]
-            }
-        ),
-        types.Tool(
-            name="analyze_user_activity",
-            description="Analyze a user's recent posting activity and engagement patterns",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "username": {
-                        "type": "string",
-                        "description": "Mastodon username"
-                    },
-                    "recent_posts": {
-                        "type": "array",
-                        "description": "Array of recent posts",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "content": {"type": "string"},
-                                "created_at": {"type": "string"},
-                                "favorites": {"type": "integer"},
-                                "reblogs": {"type": "integer"},
-                                "replies": {"type": "integer"}
-                            },
-                            "required": ["content", "created_at", "favorites", "reblogs", "replies"]
-                        }
+                "bio": {
+                    "type": "string",
+                    "description": "User's profile bio/description"
+                },
+                "followers_count": {
+                    "type": "integer",
+                    "description": "Number of followers"
+                },
+                "following_count": {
+                    "type": "integer", 
+                    "description": "Number of accounts following"
+                },
+                "posts_count": {
+                    "type": "integer",
+                    "description": "Total number of posts"
+                },
+                "avatar": {
+                    "type": "string",
+                    "description": "Avatar URL (optional)"
+                },
+                "created_at": {
+                    "type": "string",
+                    "description": "Account creation date, ISO 8601 (optional)"
+                }
+            },
+            "required": ["username", "display_name", "bio", "followers_count", "following_count", "posts_count"]
+        }
+    ),
+    types.Tool(
+        name="evaluate_user_auto",
+        description="Auto-fetch and evaluate a Mastodon user's profile from their username",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username (with or without @domain)"
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="analyze_user_activity",
+        description="Analyze a user's recent posting activity and engagement patterns",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username"
+                },
+                "recent_posts": {
+                    "type": "array",
+                    "description": "Array of recent posts",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "content": {"type": "string"},
+                            "created_at": {"type": "string"},
+                            "favorites": {"type": "integer"},
+                            "reblogs": {"type": "integer"},
+                            "replies": {"type": "integer"}
+                        },
+                        "required": ["content", "created_at", "favorites", "reblogs", "replies"]
                     }
+                }
+            },
+            "required": ["username", "recent_posts"]
+        }
+    ),
+    types.Tool(
+        name="analyze_user_activity_auto",
+        description="Auto-fetch and analyze a Mastodon user's recent activity",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username (with or without @domain)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of recent posts to analyze (default: 5); up to ACTIVITY_MAX_POSTS are fetched in pages, and a few hundred or more make the posting-periodicity check meaningful",
+                    "default": 5
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="triage_user_report",
+        description="Triage a user report for moderation action",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "reporter": {
+                    "type": "string",
+                    "description": "Username of the reporter"
+                },
+                "username": {
+                    "type": "string",
+                    "description": "Username being reported"
+                },
+                "reason": {
+                    "type": "string",
+                    "description": "Reason for the report",
+                    "enum": ["abuse", "spam", "harassment", "impersonation", "other"]
+                },
+                "comment": {
+                    "type": "string",
+                    "description": "Additional comment about the report (optional)"
+                },
+                "post_excerpt": {
+                    "type": "string",
+                    "description": "Excerpt of problematic content (optional)"
+                }
+            },
+            "required": ["reporter", "username", "reason"]
+        }
+    ),
+    types.Tool(
+        name="get_user_profile",
+        description="Fetch a Mastodon user's profile information",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username (with or without @domain)"
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="get_user_posts",
+        description="Fetch a Mastodon user's recent posts",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username (with or without @domain)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of posts to fetch (default: 5)",
+                    "default": 5
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="configure_tracing",
+        description="Switch request tracing on or off at runtime and choose the span exporter (the file exporter writes to TRACING_FILE)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "enabled": {
+                    "type": "boolean",
+                    "description": "Whether to record spans"
+                },
+                "exporter": {
+                    "type": "string",
+                    "description": "Span exporter: console (stderr) or file (JSON lines)",
+                    "enum": ["console", "file"]
+                }
+            },
+            "required": ["enabled"]
+        }
+    ),
+    types.Tool(
+        name="watchlist_add",
+        description="Add an account to the watchlist; it is re-checked on a schedule and re-evaluated when its profile or posting pattern changes",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username to watch"
+                },
+                "interval_minutes": {
+                    "type": "integer",
+                    "description": "Minutes between checks (default: WATCHLIST_DEFAULT_INTERVAL)"
+                },
+                "note": {
+                    "type": "string",
+                    "description": "Why the account is being watched (optional)"
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="watchlist_remove",
+        description="Remove an account from the watchlist",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username to stop watching"
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="watchlist_list",
+        description="List watched accounts with their schedule and latest results",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    ),
+    types.Tool(
+        name="watchlist_changes",
+        description="Return changes detected on watched accounts since a timestamp",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "since": {
+                    "type": "string",
+                    "description": "ISO 8601 timestamp, e.g. 2024-05-01T00:00:00Z"
                 },
-                "required": ["username", "recent_posts"]
+                "username": {
+                    "type": "string",
+                    "description": "Only return changes for this account (optional)"
+                }
+            },
+            "required": ["since"]
+        }
+    ),
+    types.Tool(
+        name="analyze_signup_cohort",
+        description="Analyze recent local signups in bulk (admin API): signups per hour with burst detection, shared email domains and IP ranges, and clusters of near-identical bios",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "status": {
+                    "type": "string",
+                    "description": "Which accounts to include (default: all)",
+                    "enum": ["pending", "active", "all"]
+                },
+                "hours": {
+                    "type": "integer",
+                    "description": "Look-back window in hours (default: 24)",
+                    "default": 24
+                },
+                "max_accounts": {
+                    "type": "integer",
+                    "description": "Stop paging after this many accounts (default: COHORT_MAX_ACCOUNTS)"
+                }
             }
-        ),
-        types.Tool(
-            name="analyze_user_activity_auto",
-            description="Auto-fetch and analyze a Mastodon user's recent activity",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "username": {
-                        "type": "string",
-                        "description": "Mastodon username (with or without @domain)"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Number of recent posts to analyze (default: 5)",
-                        "default": 5
-                    }
+        }
+    ),
+    types.Tool(
+        name="interaction_ingest",
+        description="Fetch recent statuses of the given accounts into the interaction graph (statuses fetched by other tools are added automatically)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "usernames": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Accounts whose recent statuses to ingest"
                 },
-                "required": ["username"]
+                "limit": {
+                    "type": "integer",
+                    "description": "Statuses fetched per account (default: 40)",
+                    "default": 40
+                }
+            },
+            "required": ["usernames"]
+        }
+    ),
+    types.Tool(
+        name="interaction_pile_on",
+        description="List accounts that mentioned, replied to or boosted an account in the last N hours, most active first",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Target account"
+                },
+                "hours": {
+                    "type": "integer",
+                    "description": "Look-back window in hours (default: 24)",
+                    "default": 24
+                },
+                "min_interactions": {
+                    "type": "integer",
+                    "description": "Only list accounts with at least this many interactions (default: 1)",
+                    "default": 1
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="interaction_co_mentions",
+        description="Find groups of accounts that mention or reply to the same targets, a sign of coordinated behavior",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "hours": {
+                    "type": "integer",
+                    "description": "Look-back window in hours (default: 24)",
+                    "default": 24
+                },
+                "min_shared_targets": {
+                    "type": "integer",
+                    "description": "Targets two accounts must share to be grouped (default: 2)",
+                    "default": 2
+                },
+                "username": {
+                    "type": "string",
+                    "description": "Only consider accounts that interacted with this account (optional)"
+                }
             }
-        ),
-        types.Tool(
-            name="triage_user_report",
-            description="Triage a user report for moderation action",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "reporter": {
-                        "type": "string",
-                        "description": "Username of the reporter"
-                    },
-                    "username": {
-                        "type": "string",
-                        "description": "Username being reported"
-                    },
-                    "reason": {
-                        "type": "string",
-                        "description": "Reason for the report",
-                        "enum": ["abuse", "spam", "harassment", "impersonation", "other"]
-                    },
-                    "comment": {
-                        "type": "string",
-                        "description": "Additional comment about the report (optional)"
-                    },
-                    "post_excerpt": {
-                        "type": "string",
-                        "description": "Excerpt of problematic content (optional)"
-                    }
+        }
+    ),
+    types.Tool(
+        name="job_submit",
+        description="Submit a long-running job (bulk account evaluation or activity analysis, or a sweep over open reports) and get back a job ID; progress survives restarts and disconnects",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "kind": {
+                    "type": "string",
+                    "description": "Job type",
+                    "enum": ["evaluate_accounts", "analyze_accounts", "report_sweep"]
+                },
+                "usernames": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Accounts to process (evaluate_accounts, analyze_accounts)"
                 },
-                "required": ["reporter", "username", "reason"]
+                "limit": {
+                    "type": "integer",
+                    "description": "Posts per account (analyze_accounts) or reports to sweep (report_sweep)"
+                }
+            },
+            "required": ["kind"]
+        }
+    ),
+    types.Tool(
+        name="job_status",
+        description="Show the status and progress of a job, or list recent jobs when no job ID is given",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "job_id": {
+                    "type": "string",
+                    "description": "Job ID returned by job_submit (optional)"
+                }
             }
-        ),
-        types.Tool(
-            name="get_user_profile",
-            description="Fetch a Mastodon user's profile information",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "username": {
-                        "type": "string",
-                        "description": "Mastodon username (with or without @domain)"
-                    }
+        }
+    ),
+    types.Tool(
+        name="job_results",
+        description="Page through the per-item results of a job; results are available while the job is still running",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "job_id": {
+                    "type": "string",
+                    "description": "Job ID returned by job_submit"
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Index of the first result to return (default: 0)",
+                    "default": 0
                 },
-                "required": ["username"]
+                "limit": {
+                    "type": "integer",
+                    "description": "Results per page (default: 50)",
+                    "default": 50
+                }
+            },
+            "required": ["job_id"]
+        }
+    ),
+    types.Tool(
+        name="job_cancel",
+        description="Cancel a queued or running job; results completed so far are kept",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "job_id": {
+                    "type": "string",
+                    "description": "Job ID returned by job_submit"
+                }
+            },
+            "required": ["job_id"]
+        }
+    ),
+    types.Tool(
+        name="resolve_accounts",
+        description="Resolve many local or federated handles to accounts at once, with caching; remote servers that fail to answer are backed off and reported",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "usernames": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Handles to resolve, e.g. alice or @bob@other.server"
+                }
+            },
+            "required": ["usernames"]
+        }
+    ),
+    types.Tool(
+        name="check_links",
+        description="Check the domains linked from text or URLs against the local blocklists and how widely they were posted in fetched statuses",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "text": {
+                    "type": "string",
+                    "description": "Text or status HTML to extract links from"
+                },
+                "urls": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "URLs to check"
+                }
             }
-        ),
-        types.Tool(
-            name="get_user_posts",
-            description="Fetch a Mastodon user's recent posts",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "username": {
-                        "type": "string",
-                        "description": "Mastodon username (with or without @domain)"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Number of posts to fetch (default: 5)",
-                        "default": 5
-                    }
+        }
+    ),
+    types.Tool(
+        name="export_archive",
+        description="Export archived accounts, statuses and evaluation, activity and triage results over a date range to Parquet or Arrow files in EXPORT_DIR",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "start": {
+                    "type": "string",
+                    "description": "Start of the range, ISO date or time (UTC unless an offset is given)"
+                },
+                "end": {
+                    "type": "string",
+                    "description": "End of the range, exclusive (default: now)"
+                },
+                "tables": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(archive_service.TABLES)},
+                    "description": "Tables to export (default: all)"
                 },
-                "required": ["username"]
+                "file_format": {
+                    "type": "string",
+                    "enum": ["parquet", "arrow"],
+                    "description": "File format (default: parquet)",
+                    "default": "parquet"
+                }
+            },
+            "required": ["start"]
+        }
+    ),
+    types.Tool(
+        name="audit_history",
+        description="Past moderation decisions (profile evaluations, activity analyses, report triage) about a user from the audit log, newest first",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "username": {
+                    "type": "string",
+                    "description": "Mastodon username (e.g. @user or user@domain)"
+                },
+                "since": {
+                    "type": "string",
+                    "description": "Only decisions at or after this ISO date or time (UTC unless an offset is given)"
+                },
+                "until": {
+                    "type": "string",
+                    "description": "Only decisions before this ISO date or time"
+                },
+                "kinds": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["evaluation", "activity", "triage"]},
+                    "description": "Decision kinds to include (default: all)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of decisions to return",
+                    "default": 50
+                }
+            },
+            "required": ["username"]
+        }
+    ),
+    types.Tool(
+        name="surging_terms",
+        description="Hashtags and keywords surging in fetched statuses: counts over the last TREND_RECENT_MINUTES against their usual rate, to spot spam or harassment campaigns early",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "kind": {
+                    "type": "string",
+                    "enum": ["all", "hashtag", "keyword"],
+                    "description": "Which terms to return (default: all)",
+                    "default": "all"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of terms to return",
+                    "default": 20
+                },
+                "min_count": {
+                    "type": "integer",
+                    "description": "Least number of recent statuses using a term (default: TREND_MIN_COUNT)"
+                },
+                "min_ratio": {
+                    "type": "number",
+                    "description": "Least ratio of recent to expected count (default: TREND_MIN_RATIO)"
+                }
             }
-        )
-    ]
+        }
+    )
+]
+
+# Output options shared by every tool
+OUTPUT_PROPERTIES = {
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Only return these result fields (dotted names select nested fields, e.g. avg_engagement.favorites)"
+    },
+    "format": {
+        "type": "string",
+        "description": "Text output format: human-readable text (default) or compact JSON",
+        "enum": ["text", "json"]
+    }
+}
+for _tool in TOOLS:
+    _tool.inputSchema["properties"].update(OUTPUT_PROPERTIES)
+
+# Tools that call the Mastodon API can target any configured instance
+INSTANCE_TOOLS = {
+    "evaluate_user_auto", "analyze_user_activity_auto", "get_user_profile", "get_user_posts",
+    "analyze_signup_cohort", "interaction_ingest", "job_submit", "resolve_accounts",
+}
+INSTANCE_PROPERTY = {
+    "instance": {
+        "type": "string",
+        "description": "Mastodon instance name or domain from MASTODON_INSTANCES (default: the account's domain if configured, else MASTODON_API_BASE)"
+    }
+}
+for _tool in TOOLS:
+    if _tool.name in INSTANCE_TOOLS:
+        _tool.inputSchema["properties"].update(INSTANCE_PROPERTY)
+
+
+@server.list_tools()
+async def handle_list_tools() -> list[types.Tool]:
+    """
+    List available tools.
+    Each tool can take arguments and return results.
+    """
+    return TOOLS
+
+
+def _result(arguments: dict, data: dict, text: str):
+    """
+    Return the human-readable text together with `data` as structured content.
+    Callers may pass `fields` to project the data and `format: "json"` to get
+    the compact JSON instead of prose in the text block.
+    """
+    data = project(data, arguments.get("fields"))
+    if arguments.get("format") == "json":
+        text = dumps(data)
+    return [types.TextContent(type="text", text=text)], data
+
+
+def _bot_likelihood(result) -> str:
+    if result.bot_likelihood is None:
+        return "Not enough posts"
+    return f"{result.bot_likelihood:.2f}"
+
+
+def _timestamp_arg(value):
+    """
+    Unix time of an ISO date or time argument; naive values are UTC.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _error_result(name: str, text: str) -> list[types.TextContent]:
+    TOOL_ERRORS.inc(name)
+    current_span().set_error(text.split("\n", 1)[0])
+    return [types.TextContent(type="text", text=text)]
+
+
+def _overloaded_result(name: str, error: Overloaded) -> types.CallToolResult:
+    """
+    Fast rejection under load; clients should retry after `retry_after` seconds.
+    """
+    content = _error_result(name, f"{error}. Retry after {error.retry_after} seconds.")
+    return types.CallToolResult(
+        content=content,
+        structuredContent={"error": "overloaded", "retry_after": error.retry_after},
+        isError=True,
+    )
 
 
 @server.call_tool()
-async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent]:
+async def handle_call_tool(name: str, arguments: dict):
     """
-    Handle tool calls.
+    Handle tool calls, recording call counts and latency per tool.
     """
+    TOOL_CALLS.inc(name)
+    started = time.perf_counter()
+    try:
+        with span(f"tool {name}", **{"mcp.tool": name}) as tool_span:
+            if not settings.ADMISSION_ENABLED:
+                return await _call_tool(name, arguments)
+            try:
+                async with get_admission_controller().admit(name) as degraded:
+                    if degraded:
+                        tool_span.set_attribute("admission.degraded", True)
+                    return await _call_tool(name, arguments)
+            except Overloaded as e:
+                return _overloaded_result(name, e)
+    finally:
+        TOOL_DURATION.observe(time.perf_counter() - started, name)
+
+
+async def _call_tool(name: str, arguments: dict):
     try:
         if name == "evaluate_user_profile":
             # Manual profile evaluation - map the arguments to the correct schema fields
@@ -222,93 +711,89 @@ async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent
                 "follower_count": arguments["followers_count"],  # Map to correct field name
                 "following_count": arguments["following_count"],
                 "statuses_count": arguments["posts_count"],  # Map to correct field name
-                "created_at": datetime.utcnow()  # Use current time if not provided
+                "created_at": mastodon_service.parse_datetime(arguments.get("created_at"))  # None when unknown
             }
             user_profile = UserProfileIn(**profile_data)
             result = await evaluate_user_profile(user_profile)
             
-            return [
-                types.TextContent(
-                    type="text",
-                    text=f"User Evaluation Results:\n"
-                         f"Risk Score: {result.risk_score}\n"
-                         f"Recommendation: {result.recommendation}\n"
-                         f"Summary: {result.summary}"
-                )
-            ]
+            return _result(
+                arguments,
+                {"username": user_profile.username, **model_to_dict(result)},
+                f"User Evaluation Results:\n"
+                f"Risk Score: {result.risk_score}\n"
+                f"Recommendation: {result.recommendation}\n"
+                f"Summary: {result.summary}"
+            )
             
         elif name == "evaluate_user_auto":
             # Auto-fetch and evaluate profile
             username = normalize_mastodon_username(arguments["username"])
             try:
-                profile = await mastodon_service.get_user_profile(username)
+                profile = await mastodon_service.get_user_profile(username, arguments.get("instance"))
                 result = await evaluate_user_profile(profile)
                 
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"User Evaluation Results for @{username}:\n"
-                             f"Risk Score: {result.risk_score}\n"
-                             f"Recommendation: {result.recommendation}\n"
-                             f"Summary: {result.summary}"
-                    )
-                ]
+                return _result(
+                    arguments,
+                    {"username": username, **model_to_dict(result)},
+                    f"User Evaluation Results for @{username}:\n"
+                    f"Risk Score: {result.risk_score}\n"
+                    f"Recommendation: {result.recommendation}\n"
+                    f"Summary: {result.summary}"
+                )
             except Exception as e:
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error fetching profile for @{username}: {str(e)}\n\n"
-                             f"Please ensure:\n"
-                             f"- MASTODON_ACCESS_TOKEN is set\n"
-                             f"- MASTODON_API_BASE is set to your instance URL\n"
-                             f"- The username exists on that instance"
-                    )
-                ]
+                return _error_result(
+                    name,
+                    f"Error fetching profile for @{username}: {str(e)}\n\n"
+                    f"Please ensure:\n"
+                    f"- MASTODON_ACCESS_TOKEN is set\n"
+                    f"- MASTODON_API_BASE is set to your instance URL\n"
+                    f"- The username exists on that instance"
+                )
             
         elif name == "analyze_user_activity":
             # Manual activity analysis
             user_activity = UserActivityIn(**arguments)
+            current_span().set_attribute("posts.count", len(user_activity.recent_posts))
             result = await analyze_user_activity(user_activity)
             
-            return [
-                types.TextContent(
-                    type="text",
-                    text=f"User Activity Analysis:\n"
-                         f"Post Count: {result.post_count}\n"
-                         f"Average Engagement: {result.avg_engagement}\n"
-                         f"Posting Frequency: {result.posting_frequency}\n"
-                         f"Category: {result.category or 'Not categorized'}\n"
-                         f"Summary: {result.summary}"
-                )
-            ]
+            return _result(
+                arguments,
+                {"username": user_activity.username, **model_to_dict(result)},
+                f"User Activity Analysis:\n"
+                f"Post Count: {result.post_count}\n"
+                f"Average Engagement: {result.avg_engagement}\n"
+                f"Posting Frequency: {result.posting_frequency}\n"
+                f"Bot Likelihood: {_bot_likelihood(result)}\n"
+                f"Category: {result.category or 'Not categorized'}\n"
+                f"Summary: {result.summary}"
+            )
             
         elif name == "analyze_user_activity_auto":
             # Auto-fetch and analyze activity
             username = normalize_mastodon_username(arguments["username"])
             limit = arguments.get("limit", 5)
             try:
-                posts = await mastodon_service.get_recent_posts(username, limit)
+                posts = await mastodon_service.get_recent_posts(username, limit, arguments.get("instance"))
+                current_span().set_attribute("posts.count", len(posts))
                 user_activity = UserActivityIn(username=username, recent_posts=posts)
                 result = await analyze_user_activity(user_activity)
                 
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"User Activity Analysis for @{username}:\n"
-                             f"Post Count: {result.post_count}\n"
-                             f"Average Engagement: {result.avg_engagement}\n"
-                             f"Posting Frequency: {result.posting_frequency}\n"
-                             f"Category: {result.category or 'Not categorized'}\n"
-                             f"Summary: {result.summary}"
-                    )
-                ]
+                return _result(
+                    arguments,
+                    {"username": username, **model_to_dict(result)},
+                    f"User Activity Analysis for @{username}:\n"
+                    f"Post Count: {result.post_count}\n"
+                    f"Average Engagement: {result.avg_engagement}\n"
+                    f"Posting Frequency: {result.posting_frequency}\n"
+                    f"Bot Likelihood: {_bot_likelihood(result)}\n"
+                    f"Category: {result.category or 'Not categorized'}\n"
+                    f"Summary: {result.summary}"
+                )
             except Exception as e:
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error fetching posts for @{username}: {str(e)}"
-                    )
-                ]
+                return _error_result(
+                    name,
+                    f"Error fetching posts for @{username}: {str(e)}"
+                )
             
         elif name == "triage_user_report":
             # Triage user report - need to construct the proper report object
@@ -324,51 +809,47 @@ async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent
             report = UserReportIn(**report_data)
             result = await triage_user_report(report)
             
-            return [
-                types.TextContent(
-                    type="text",
-                    text=f"Report Triage Results:\n"
-                         f"Triage Level: {result.triage_level}\n"
-                         f"Recommended Action: {result.action}\n"
-                         f"Summary: {result.summary}"
-                )
-            ]
+            return _result(
+                arguments,
+                model_to_dict(result),
+                f"Report Triage Results:\n"
+                f"Triage Level: {result.triage_level}\n"
+                f"Recommended Action: {result.action}\n"
+                f"Summary: {result.summary}"
+            )
             
         elif name == "get_user_profile":
             # Fetch user profile
             username = normalize_mastodon_username(arguments["username"])
             try:
-                profile = await mastodon_service.get_user_profile(username)
+                profile = await mastodon_service.get_user_profile(username, arguments.get("instance"))
                 
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Profile for @{username}:\n"
-                             f"Bio: {profile.bio}\n"
-                             f"Followers: {profile.follower_count}\n"
-                             f"Following: {profile.following_count}\n"
-                             f"Posts: {profile.statuses_count}\n"
-                             f"Created: {profile.created_at}"
-                    )
-                ]
+                return _result(
+                    arguments,
+                    model_to_dict(profile),
+                    f"Profile for @{username}:\n"
+                    f"Bio: {profile.bio}\n"
+                    f"Followers: {profile.follower_count}\n"
+                    f"Following: {profile.following_count}\n"
+                    f"Posts: {profile.statuses_count}\n"
+                    f"Created: {profile.created_at}"
+                )
             except Exception as e:
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error fetching profile for @{username}: {str(e)}\n\n"
-                             f"This is expected if Mastodon credentials are not configured.\n"
-                             f"To use this feature, set:\n"
-                             f"- MASTODON_ACCESS_TOKEN\n"
-                             f"- MASTODON_API_BASE"
-                    )
-                ]
+                return _error_result(
+                    name,
+                    f"Error fetching profile for @{username}: {str(e)}\n\n"
+                    f"This is expected if Mastodon credentials are not configured.\n"
+                    f"To use this feature, set:\n"
+                    f"- MASTODON_ACCESS_TOKEN\n"
+                    f"- MASTODON_API_BASE"
+                )
             
         elif name == "get_user_posts":
             # Fetch user posts
             username = normalize_mastodon_username(arguments["username"])
             limit = arguments.get("limit", 5)
             try:
-                posts = await mastodon_service.get_recent_posts(username, limit)
+                posts = await mastodon_service.get_recent_posts(username, limit, arguments.get("instance"))
                 
                 posts_text = f"Recent posts for @{username} (showing {len(posts)} posts):\n\n"
                 for i, post in enumerate(posts, 1):
@@ -376,32 +857,272 @@ async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent
                     posts_text += f"   Posted: {post.created_at}\n"
                     posts_text += f"   Engagement: {post.favorites} favorites, {post.reblogs} reblogs, {post.replies} replies\n\n"
                 
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=posts_text
-                    )
-                ]
+                return _result(
+                    arguments,
+                    {"username": username, "posts": [model_to_dict(post) for post in posts]},
+                    posts_text
+                )
             except Exception as e:
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error fetching posts for @{username}: {str(e)}\n\n"
-                             f"This is expected if Mastodon credentials are not configured."
-                    )
-                ]
+                return _error_result(
+                    name,
+                    f"Error fetching posts for @{username}: {str(e)}\n\n"
+                    f"This is expected if Mastodon credentials are not configured."
+                )
+            
+        elif name == "configure_tracing":
+            # The file path is configuration only (TRACING_FILE): clients must not choose where the server writes
+            state = set_tracing(arguments["enabled"], arguments.get("exporter"))
+            return _result(
+                arguments,
+                state,
+                f"Tracing {'enabled' if state['enabled'] else 'disabled'}\n"
+                f"Exporter: {state['exporter']}\n"
+                f"File: {state['path']}"
+            )
             
+        elif name == "watchlist_add":
+            entry = watchlist_service.add_account(
+                arguments["username"], arguments.get("interval_minutes"), arguments.get("note")
+            )
+            return _result(
+                arguments,
+                model_to_dict(entry),
+                f"Watching @{entry.username}\n"
+                f"Check interval: {entry.interval_seconds // 60} minutes\n"
+                f"First check: {entry.next_check_at}"
+            )
+
+        elif name == "watchlist_remove":
+            username = normalize_mastodon_username(arguments["username"])
+            removed = watchlist_service.remove_account(username)
+            return _result(
+                arguments,
+                {"username": username, "removed": removed},
+                f"Stopped watching @{username}" if removed else f"@{username} was not on the watchlist"
+            )
+
+        elif name == "watchlist_list":
+            entries = watchlist_service.list_accounts()
+            text = f"Watchlist ({len(entries)} accounts):\n\n"
+            for entry in entries:
+                text += f"@{entry.username} every {entry.interval_seconds // 60} min"
+                text += f", last checked {entry.last_checked_at or 'never'}, next {entry.next_check_at}\n"
+                if entry.last_evaluation:
+                    text += f"   Risk score: {entry.last_evaluation.get('risk_score')}, {entry.last_evaluation.get('recommendation')}\n"
+                if entry.note:
+                    text += f"   Note: {entry.note}\n"
+            return _result(arguments, {"entries": [model_to_dict(entry) for entry in entries]}, text)
+
+        elif name == "watchlist_changes":
+            since = datetime.fromisoformat(arguments["since"].replace("Z", "+00:00"))
+            changes = watchlist_service.changes_since(since, arguments.get("username"))
+            out = WatchlistChangesOut(since=since, changes=changes)
+            text = f"Watchlist changes since {since} ({len(changes)}):\n\n"
+            for change in changes:
+                text += f"{change.detected_at} @{change.username} {change.kind}: {', '.join(change.details.get('fields', {}))}\n"
+            return _result(arguments, model_to_dict(out), text)
+
+        elif name == "analyze_signup_cohort":
+            try:
+                cohort = await analyze_signup_cohort(
+                    arguments.get("status", "all"), arguments.get("hours", 24), arguments.get("max_accounts"),
+                    arguments.get("instance"),
+                )
+            except RuntimeError as e:
+                return _error_result(
+                    name,
+                    f"Error analyzing signup cohort: {str(e)}\n\n"
+                    f"This requires Mastodon credentials with the admin:read:accounts scope."
+                )
+            text = (
+                f"Signup Cohort ({cohort.status}, {cohort.window_start:%Y-%m-%d %H:%M} to {cohort.window_end:%Y-%m-%d %H:%M} UTC):\n"
+                f"Accounts: {cohort.account_count} ({cohort.pending_count} pending)"
+                f"{' - truncated' if cohort.truncated else ''}\n"
+                f"Burst hours: {', '.join(f'{h:%Y-%m-%d %H:00}' for h in cohort.burst_hours) or 'none'}\n"
+            )
+            for label, shared in (("Shared email domains", cohort.email_domains), ("Shared IP ranges", cohort.ip_ranges)):
+                text += f"\n{label}:\n" + "".join(f"- {s.value}: {s.count} accounts\n" for s in shared)
+            text += "\nSimilar bio clusters:\n"
+            for cluster in cohort.bio_clusters:
+                text += f"- {cluster.size} accounts ({', '.join(cluster.usernames[:5])}): {cluster.sample_bio[:80]}\n"
+            return _result(arguments, model_to_dict(cohort), text)
+
+        elif name == "interaction_ingest":
+            result = await interaction_service.ingest_accounts(
+                arguments["usernames"], arguments.get("limit", 40), arguments.get("instance")
+            )
+            graph = result["graph"]
+            return _result(
+                arguments,
+                result,
+                f"Ingested {result['new_statuses']} new statuses from {result['accounts']} accounts"
+                f"{' (failed: ' + ', '.join(result['failed']) + ')' if result['failed'] else ''}\n"
+                f"Graph: {graph['accounts']} accounts, {graph['edges']} edges, {graph['statuses']} statuses"
+            )
+
+        elif name == "interaction_pile_on":
+            pile_on = interaction_service.get_pile_on(
+                arguments["username"], arguments.get("hours", 24), arguments.get("min_interactions", 1)
+            )
+            text = (
+                f"Interactions with @{pile_on.target} in the last {pile_on.hours}h: "
+                f"{pile_on.interaction_count} from {pile_on.account_count} accounts\n\n"
+            )
+            for entry in pile_on.accounts[:25]:
+                text += (
+                    f"- @{entry.account}: {entry.total} ({entry.mentions} mentions, {entry.replies} replies, "
+                    f"{entry.boosts} boosts) across {entry.active_buckets} buckets\n"
+                )
+            return _result(arguments, model_to_dict(pile_on), text)
+
+        elif name == "interaction_co_mentions":
+            co_mentions = interaction_service.get_co_mentions(
+                arguments.get("hours", 24), arguments.get("min_shared_targets", 2), arguments.get("username")
+            )
+            text = f"Co-mention groups in the last {co_mentions.hours}h: {len(co_mentions.groups)}\n\n"
+            for group in co_mentions.groups[:25]:
+                text += (
+                    f"- {', '.join('@' + a for a in group.accounts[:10])} share "
+                    f"{len(group.shared_targets)} targets: {', '.join('@' + t for t in group.shared_targets[:10])}\n"
+                )
+            return _result(arguments, model_to_dict(co_mentions), text)
+
+        elif name == "job_submit":
+            params = {key: arguments[key] for key in ("usernames", "limit", "instance") if key in arguments}
+            if arguments["kind"] in ("evaluate_accounts", "analyze_accounts") and not params.get("usernames"):
+                raise ValueError(f"{arguments['kind']} requires usernames")
+            if params.get("instance") and find_instance_name(params["instance"]) is None:
+                raise ValueError(f"Unknown Mastodon instance: {params['instance']}")
+            job = JobOut(**job_queue.get_job_queue().get(job_queue.submit_job(arguments["kind"], params)))
+            return _result(
+                arguments,
+                model_to_dict(job),
+                f"Submitted {job.kind} job {job.id}\n"
+                f"Check progress with job_status and fetch output with job_results."
+            )
+
+        elif name == "job_status":
+            queue = job_queue.get_job_queue()
+            if arguments.get("job_id"):
+                found = queue.get(arguments["job_id"])
+                if found is None:
+                    raise ValueError(f"Unknown job: {arguments['job_id']}")
+                jobs = [JobOut(**found)]
+            else:
+                jobs = [JobOut(**job) for job in queue.recent()]
+            text = ""
+            for job in jobs:
+                progress = f"{job.done}/{job.total}" if job.total is not None else "not started"
+                text += f"{job.id} {job.kind}: {job.status}, {progress} done, {job.failed} failed\n"
+                if job.error:
+                    text += f"   Error: {job.error}\n"
+            return _result(arguments, {"jobs": [model_to_dict(job) for job in jobs]}, text or "No jobs")
+
+        elif name == "job_results":
+            queue = job_queue.get_job_queue()
+            found = queue.get(arguments["job_id"])
+            if found is None:
+                raise ValueError(f"Unknown job: {arguments['job_id']}")
+            offset, limit = arguments.get("offset", 0), arguments.get("limit", 50)
+            results = queue.results(arguments["job_id"], offset, limit)
+            page = JobResultsOut(
+                job=JobOut(**found),
+                offset=offset,
+                results=results,
+                next_offset=offset + len(results) if len(results) == limit else None,
+            )
+            text = f"Job {page.job.id} ({page.job.status}), results {offset}-{offset + len(results)} of {page.job.done}:\n\n"
+            for item in page.results:
+                text += f"{item.index}. {item.item}: {dumps(item.result)}\n"
+            return _result(arguments, model_to_dict(page), text)
+
+        elif name == "job_cancel":
+            cancelled = job_queue.get_job_queue().cancel(arguments["job_id"])
+            return _result(
+                arguments,
+                {"job_id": arguments["job_id"], "cancelled": cancelled},
+                f"Cancelled job {arguments['job_id']}" if cancelled else f"Job {arguments['job_id']} is not queued or running"
+            )
+
+        elif name == "resolve_accounts":
+            resolved = await resolve_accounts(arguments["usernames"], arguments.get("instance"))
+            found = sum(1 for account in resolved.accounts if account.found)
+            text = f"Resolved {found} of {len(resolved.accounts)} accounts on {resolved.instance}:\n\n"
+            for account in resolved.accounts:
+                if account.found:
+                    text += f"- {account.username}: @{account.acct} (id {account.id}){' [cached]' if account.cached else ''}\n"
+                else:
+                    text += f"- {account.username}: {account.error}\n"
+            if resolved.backed_off:
+                text += "\nBacked-off servers:\n" + "".join(
+                    f"- {d.domain}: {d.failures} failures, retry in {d.retry_in_seconds}s\n" for d in resolved.backed_off
+                )
+            return _result(arguments, model_to_dict(resolved), text)
+
+        elif name == "check_links":
+            report = link_report([arguments.get("text")] + arguments.get("urls", []))
+            text = f"{report.link_count} links to {len(report.domains)} domains ({report.blocklist_size} blocklisted domains loaded):\n\n"
+            for domain in report.domains:
+                status = f"BLOCKLISTED ({domain.blocklisted_by})" if domain.blocklisted_by else "not blocklisted"
+                text += f"- {domain.domain}: {status}; {domain.links_seen} links from {domain.accounts_seen} accounts seen\n"
+            return _result(arguments, model_to_dict(report), text)
+
+        elif name == "export_archive":
+            exported = await run_export(
+                datetime.fromisoformat(arguments["start"]),
+                datetime.fromisoformat(arguments["end"]) if arguments.get("end") else None,
+                arguments.get("tables"),
+                arguments.get("file_format", "parquet"),
+            )
+            text = f"Exported {exported.start.isoformat()} to {exported.end.isoformat()} as {exported.format}:\n\n"
+            for file in exported.files:
+                text += f"- {file.table}: {file.rows} rows in {file.row_groups} batches, {file.bytes} bytes: {file.path}\n"
+            return _result(arguments, model_to_dict(exported), text)
+
+        elif name == "surging_terms":
+            trends = surging_terms(
+                arguments.get("kind", "all"),
+                arguments.get("limit", 20),
+                arguments.get("min_count"),
+                arguments.get("min_ratio"),
+            )
+            text = (
+                f"Surging terms over the last {trends.window_minutes} minutes ({trends.statuses_in_window} statuses), "
+                f"against the {trends.baseline_minutes} minutes before:\n\n"
+            )
+            for term in trends.terms:
+                text += f"- {term.term}: {term.recent_count} statuses, {term.ratio}x the expected {term.expected_count}\n"
+            if not trends.terms:
+                text += "No surging terms.\n"
+            return _result(arguments, model_to_dict(trends), text)
+
+        elif name == "audit_history":
+            entries = await audit_log.history(
+                arguments["username"],
+                _timestamp_arg(arguments.get("since")),
+                _timestamp_arg(arguments.get("until")),
+                arguments.get("kinds"),
+                arguments.get("limit", 50),
+            )
+            history = AuditHistoryOut(
+                account=normalize_mastodon_username(arguments["username"]),
+                entries=[AuditEntry(**entry) for entry in entries],
+            )
+            text = f"{len(history.entries)} recorded decisions about @{history.account}:\n\n"
+            for entry in history.entries:
+                outcome = entry.data.get("recommendation") or entry.data.get("action") or entry.data.get("category") or ""
+                text += f"- {entry.recorded_at.isoformat()} {entry.kind}: {outcome} - {entry.data.get('summary', '')}\n"
+            return _result(arguments, model_to_dict(history), text)
+
         else:
             raise ValueError(f"Unknown tool: {name}")
             
     except Exception as e:
         logging.error(f"Error in tool {name}: {e}")
-        return [
-            types.TextContent(
-                type="text",
-                text=f"Error executing {name}: {str(e)}"
-            )
-        ]
+        return _error_result(
+            name,
+            f"Error executing {name}: {str(e)}"
+        )
 
 
 @server.list_resources()
@@ -423,7 +1144,14 @@ async def handle_list_resources() -> list[types.Resource]:
             description="Available moderation and analysis capabilities",
             mimeType="application/json"
         )
-    ]
+    ] + ([
+        types.Resource(
+            uri="file://diagnostics",
+            name="Runtime Diagnostics",
+            description="Memory, top allocations, cache sizes, sessions, executor queues and event-loop lag; add ?profile_seconds=N for a sampling profile",
+            mimeType="application/json"
+        )
+    ] if settings.DIAGNOSTICS_ENABLED else [])
 
 
 @server.read_resource()
@@ -432,9 +1160,12 @@ async def handle_read_resource(uri: str) -> str:
     Read a specific resource.
     """
     # Convert to string and remove trailing slash if present
-    uri_str = str(uri).rstrip('/')
+    uri_str, _, query = str(uri).partition("?")
+    uri_str = uri_str.rstrip('/')
     
     if uri_str == "file://server-info":
+        pool_stats = get_pool_stats()
+        tracing_state = get_tracing_state()
         return f"""Nagatha Mastodon Moderation Server
 
 This MCP server provides tools for Mastodon content moderation including:
@@ -445,8 +1176,18 @@ This MCP server provides tools for Mastodon content moderation including:
 
 Configuration:
 - OpenAI Model: {settings.OPENAI_MODEL}
+- Model Routes: {settings.OPENAI_MODEL_ROUTES or 'none (single model)'}
 - LLM Activity Analysis: {settings.USE_LLM_ACTIVITY}
 - LLM Report Triage: {getattr(settings, 'USE_LLM_TRIAGE', False)}
+- Mastodon Instances: {', '.join(f"{name} ({config.api_base})" for name, config in instance_configs().items())}
+
+Analysis Backend:
+- Executor: {pool_stats['executor']} (workers: {pool_stats['workers']})
+- In flight: {pool_stats['in_flight']}
+- Avg queue wait: {pool_stats['avg_queue_wait_seconds']:.4f}s
+- Avg run time: {pool_stats['avg_run_seconds']:.4f}s
+
+Tracing: {'enabled' if tracing_state['enabled'] else 'disabled'} ({tracing_state['exporter']} exporter)
 """
     elif uri_str == "file://capabilities":
         import json
@@ -471,6 +1212,12 @@ Configuration:
             }
         }
         return json.dumps(capabilities, indent=2)
+    elif uri_str == "file://diagnostics":
+        if not settings.DIAGNOSTICS_ENABLED:
+            raise ValueError("Diagnostics are disabled; set DIAGNOSTICS_ENABLED=true")
+        params = dict(parse_qsl(query))
+        report = await diagnostics.collect(float(params.get("profile_seconds", 0)), int(params.get("top", 15)))
+        return dumps(report)
     else:
         raise ValueError(f"Unknown resource: {uri_str}")
 
@@ -479,8 +1226,9 @@ async def run_server():
     """Run the MCP server."""
     # Configure logging
     logging.basicConfig(level=logging.INFO)
-    
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+    diagnostics.register_session_source("stdio", lambda: 1)
+
+    async with background_services(), mcp.server.stdio.stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
             write_stream,
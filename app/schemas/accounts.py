@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class ResolvedAccount(BaseModel):
+    username: str
+    found: bool
+    cached: bool
+    id: Optional[str] = None
+    acct: Optional[str] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+class DomainBackoff(BaseModel):
+    domain: str
+    failures: int
+    retry_in_seconds: int
+
+class ResolveOut(BaseModel):
+    instance: str
+    accounts: List[ResolvedAccount]
+    backed_off: List[DomainBackoff]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List
+from datetime import datetime
+
+class AuditEntry(BaseModel):
+    id: str
+    recorded_at: datetime
+    kind: str
+    account: str
+    data: Dict[str, Any]
+
+class AuditHistoryOut(BaseModel):
+    account: str
+    entries: List[AuditEntry]
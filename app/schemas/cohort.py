@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+
+class SignupHour(BaseModel):
+    hour: datetime
+    count: int
+    burst: bool
+
+class SharedValue(BaseModel):
+    value: str
+    count: int
+    usernames: List[str]
+
+class BioCluster(BaseModel):
+    size: int
+    usernames: List[str]
+    sample_bio: str
+
+class CohortOut(BaseModel):
+    status: str
+    window_start: datetime
+    window_end: datetime
+    account_count: int
+    pending_count: int
+    pages_fetched: int
+    pages_cached: int
+    truncated: bool
+    signups_per_hour: List[SignupHour]
+    burst_hours: List[datetime]
+    email_domains: List[SharedValue]
+    ip_ranges: List[SharedValue]
+    bio_clusters: List[BioCluster]
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Literal
+from datetime import datetime
+
+class ExportedFile(BaseModel):
+    table: str
+    path: str
+    rows: int
+    row_groups: int
+    bytes: int
+
+class ExportOut(BaseModel):
+    start: datetime
+    end: datetime
+    format: Literal["parquet", "arrow"]
+    files: List[ExportedFile]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import List
+
+class PileOnEntry(BaseModel):
+    account: str
+    total: int
+    mentions: int
+    replies: int
+    boosts: int
+    active_buckets: int
+
+class PileOnOut(BaseModel):
+    target: str
+    hours: int
+    account_count: int
+    interaction_count: int
+    accounts: List[PileOnEntry]
+    graph: dict
+
+class CoMentionGroup(BaseModel):
+    accounts: List[str]
+    shared_targets: List[str]
+
+class CoMentionOut(BaseModel):
+    hours: int
+    groups: List[CoMentionGroup]
+    graph: dict
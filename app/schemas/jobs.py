@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Any, List, Optional
+from datetime import datetime
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    params: dict
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total: Optional[int] = None
+    done: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+
+class JobResult(BaseModel):
+    index: int
+    ok: bool
+    item: Any
+    result: dict
+
+class JobResultsOut(BaseModel):
+    job: JobOut
+    offset: int
+    results: List[JobResult]
+    next_offset: Optional[int] = None
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class DomainReputation(BaseModel):
+    domain: str
+    blocklisted_by: Optional[str] = None
+    links_seen: int
+    accounts_seen: int
+
+class LinkReport(BaseModel):
+    link_count: int
+    domains: List[DomainReputation]
+    blocklisted: List[str]
+    blocklist_size: int
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Literal
+
+class SurgingTerm(BaseModel):
+    term: str
+    kind: Literal["hashtag", "keyword"]
+    recent_count: int
+    baseline_count: int
+    expected_count: float
+    ratio: float
+
+class TrendsOut(BaseModel):
+    window_minutes: int
+    baseline_minutes: int
+    statuses_in_window: int
+    terms: List[SurgingTerm]
@@ -7,14 +7,23 @@ class RecentPost(BaseModel):
     created_at: datetime
     favorites: int
     reblogs: int
+    replies: int = 0
 
 class UserActivityIn(BaseModel):
     username: str
     recent_posts: List[RecentPost]
 
+class PostingTiming(BaseModel):
+    gap_cv: float
+    gap_entropy: float
+    periodicity: float
+    period_seconds: Optional[float] = None
+
 class UserActivityOut(BaseModel):
     post_count: int
     avg_engagement: dict
     posting_frequency: str
+    timing: Optional[PostingTiming] = None
+    bot_likelihood: Optional[float] = None
     category: Optional[str] = None
     summary: str 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 
 class UserProfileIn(BaseModel):
     username: str
@@ -7,7 +8,7 @@ class UserProfileIn(BaseModel):
     follower_count: int
     following_count: int
     statuses_count: int
-    created_at: datetime
+    created_at: Optional[datetime] = None
 
 class UserEvaluationOut(BaseModel):
     risk_score: float = Field(..., ge=0.0, le=1.0)
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class WatchlistEntry(BaseModel):
+    username: str
+    added_at: datetime
+    interval_seconds: int
+    next_check_at: datetime
+    last_checked_at: Optional[datetime] = None
+    note: Optional[str] = None
+    last_evaluation: Optional[dict] = None
+    last_activity: Optional[dict] = None
+
+class WatchlistChange(BaseModel):
+    username: str
+    detected_at: datetime
+    kind: str
+    details: dict
+
+class WatchlistChangesOut(BaseModel):
+    since: datetime
+    changes: List[WatchlistChange]
@@ -1,10 +1,22 @@
 from typing import Optional
-from app.schemas.user_activity import UserActivityIn, UserActivityOut
+from app.schemas.user_activity import PostingTiming, UserActivityIn, UserActivityOut
 from app.services.llm import classify_activity_pattern
+from app.services import archive
+from app.services.links import link_report, link_summary
+from app.core.admission import llm_allowed
+from app.core.audit_log import record_decision
 from app.core.config import settings
-import statistics
-from datetime import datetime
-import os
+from app.core.process_pool import run_cpu_bound
+from app.utils.analysis import PostBatch, compute_activity_stats
+from app.utils.serialization import model_to_dict
+
+def _describe_period(seconds: float) -> str:
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = round(seconds / size, 1)
+            count = int(count) if count == int(count) else count
+            return f"{count} {unit}{'' if count == 1 else 's'}"
+    return f"{int(seconds)} seconds"
 
 async def analyze_user_activity(data: UserActivityIn) -> UserActivityOut:
     posts = data.recent_posts
@@ -14,33 +26,36 @@ async def analyze_user_activity(data: UserActivityIn) -> UserActivityOut:
         posting_frequency = "none"
         summary = "No recent posts."
         category = None
+        timing = bot_likelihood = None
     else:
-        avg_favorites = statistics.mean([p.favorites for p in posts])
-        avg_reblogs = statistics.mean([p.reblogs for p in posts])
-        avg_engagement = {"favorites": avg_favorites, "reblogs": avg_reblogs}
-        # Estimate posting frequency
-        dates = sorted([p.created_at for p in posts], reverse=True)
-        if len(dates) > 1:
-            deltas = [(dates[i] - dates[i+1]).total_seconds() / 86400 for i in range(len(dates)-1)]
-            avg_delta = statistics.mean(deltas)
-            if avg_delta <= 1.5:
-                posting_frequency = "daily"
-            elif avg_delta <= 7:
-                posting_frequency = "weekly"
-            else:
-                posting_frequency = "sporadic"
-        else:
-            posting_frequency = "sporadic"
+        stats = await run_cpu_bound(compute_activity_stats, PostBatch.from_posts(posts), size=post_count)
+        avg_engagement = {"favorites": stats["avg_favorites"], "reblogs": stats["avg_reblogs"]}
+        posting_frequency = stats["posting_frequency"]
         summary = f"User posts {posting_frequency} with positive engagement."
+        timing = bot_likelihood = None
+        if stats["timing"]:
+            bot_likelihood = stats["timing"].pop("bot_likelihood")
+            timing = PostingTiming(**stats["timing"])
+            if bot_likelihood >= settings.ACTIVITY_BOT_THRESHOLD:
+                every = f" every {_describe_period(timing.period_seconds)}" if timing.period_seconds else ""
+                summary += f" Posting times are machine-regular{every} (bot likelihood {bot_likelihood:.2f})."
+        summary += link_summary(link_report(post.content for post in posts))
         category = None
-        if os.getenv("USE_LLM_ACTIVITY", "false").lower() == "true":
-            category = await classify_activity_pattern(posts)
+        if settings.USE_LLM_ACTIVITY and llm_allowed():
+            # Fetched posts come newest first and a few dozen are enough for a label;
+            # a long history would overflow the prompt
+            category = await classify_activity_pattern(posts[:settings.ACTIVITY_LLM_POSTS])
             if category:
                 category = category.lower()
-    return UserActivityOut(
+    result = UserActivityOut(
         post_count=post_count,
         avg_engagement=avg_engagement,
         posting_frequency=posting_frequency,
+        timing=timing,
+        bot_likelihood=bot_likelihood,
         category=category,
         summary=summary,
-    ) 
\ No newline at end of file
+    )
+    archive.record_activity(data.username, result)
+    record_decision("activity", data.username, model_to_dict(result))
+    return result 
\ No newline at end of file
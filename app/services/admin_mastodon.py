@@ -1,41 +1,28 @@
 import logging
-from app.core.mastodon_client import get_mastodon_client
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from app.core.executors import run_blocking
+from app.core.mastodon_client import get_instance
 
-_executor = ThreadPoolExecutor(max_workers=4)
+def _run_api_request(instance, method, endpoint, params=None, operation=None):
+    # Label raw API calls by their endpoint path (or the client method they replace)
+    return run_blocking(
+        instance.admin_executor, "mastodon", operation or endpoint, instance.api, method, endpoint, params
+    )
 
-def _run_in_executor(func, *args, **kwargs):
-    loop = asyncio.get_event_loop()
-    return loop.run_in_executor(_executor, lambda: func(*args, **kwargs))
-
-def _api_request(mastodon, method, endpoint, params=None):
-    # Try public 'request' method first, fallback to private '_Mastodon__api_request'
-    actual_params = params or {} # Ensure params is a dict, especially for _Mastodon__api_request
-    if hasattr(mastodon, 'request'):
-        # The public 'request' method likely handles params=None correctly itself.
-        return mastodon.request(method, endpoint, params=params)
-    elif hasattr(mastodon, '_Mastodon__api_request'):
-        # _Mastodon__api_request might be more sensitive to params not being a dict.
-        return mastodon._Mastodon__api_request(method, endpoint, params=actual_params)
-    else:
-        raise RuntimeError('No suitable Mastodon API request method found')
-
-async def get_federated_peers():
-    mastodon = get_mastodon_client()
+async def get_federated_peers(instance: Optional[str] = None):
+    server = get_instance(instance)
     try:
-        peers = await _run_in_executor(mastodon.instance_peers)
+        peers = await _run_api_request(server, 'GET', '/api/v1/instance/peers', operation='instance_peers')
         return peers
     except Exception as e:
         logging.error(f"Error fetching federated peers: {e}")
         raise RuntimeError(f"Error fetching federated peers: {e}")
 
-async def get_federated_instances():
-    mastodon = get_mastodon_client()
+async def get_federated_instances(instance: Optional[str] = None):
+    server = get_instance(instance)
     try:
-        result = await _run_in_executor(
-            lambda: _api_request(mastodon, 'GET', '/api/v1/admin/instances')
-        )
+        result = await _run_api_request(server, 'GET', '/api/v1/admin/instances')
         instances = []
         for inst in result:
             instances.append({
@@ -51,10 +38,10 @@ async def get_federated_instances():
         logging.error(f"Error fetching federated instances: {e}")
         raise RuntimeError(f"Error fetching federated instances: {e}")
 
-async def get_report_summary():
-    mastodon = get_mastodon_client()
+async def get_report_summary(instance: Optional[str] = None):
+    server = get_instance(instance)
     try:
-        reports = await _run_in_executor(mastodon.admin_reports)
+        reports = await _run_api_request(server, 'GET', '/api/v1/admin/reports', operation='admin_reports')
         open_reports = sum(1 for r in reports if not r.get("resolved"))
         resolved_reports = sum(1 for r in reports if r.get("resolved"))
         spam_related = sum(1 for r in reports if "spam" in (r.get("category") or ""))
@@ -73,23 +60,57 @@ async def get_report_summary():
         logging.error(f"Error fetching report summary: {e}")
         raise RuntimeError(f"Error fetching report summary: {e}")
 
-async def get_system_measures():
-    mastodon = get_mastodon_client()
+async def get_system_measures(instance: Optional[str] = None):
+    server = get_instance(instance)
     try:
         now = datetime.utcnow()
         yesterday = now - timedelta(days=1)
-        measures = await _run_in_executor(
-            lambda: _api_request(
-                mastodon,
-                'GET',
-                '/api/v1/admin/measures',
-                params={
-                    'start_at': yesterday.isoformat() + 'Z',
-                    'end_at': now.isoformat() + 'Z'
-                }
-            )
+        measures = await _run_api_request(
+            server,
+            'GET',
+            '/api/v1/admin/measures',
+            params={
+                'start_at': yesterday.isoformat() + 'Z',
+                'end_at': now.isoformat() + 'Z'
+            }
         )
         return measures
     except Exception as e:
         logging.error(f"Error fetching system measures: {e}")
-        raise RuntimeError(f"Error fetching system measures: {e}") 
\ No newline at end of file
+        raise RuntimeError(f"Error fetching system measures: {e}")
+
+async def get_admin_accounts_page(params: dict, instance: Optional[str] = None) -> list:
+    """
+    One page of /api/v1/admin/accounts (newest first). Page with `max_id`.
+    """
+    server = get_instance(instance)
+    try:
+        return await _run_api_request(server, 'GET', '/api/v1/admin/accounts', params=params)
+    except Exception as e:
+        logging.error(f"Error fetching admin accounts: {e}")
+        raise RuntimeError(f"Error fetching admin accounts: {e}")
+
+async def get_open_reports(limit: int = 200, instance: Optional[str] = None) -> list:
+    """
+    Unresolved reports, reduced to the fields report triage uses.
+    """
+    server = get_instance(instance)
+    try:
+        # The API lists unresolved reports unless `resolved` is set
+        reports = await _run_api_request(
+            server, 'GET', '/api/v1/admin/reports', params={'limit': limit}, operation='admin_reports'
+        )
+        return [
+            {
+                "id": str(r.get("id")),
+                "reporter": ((r.get("account") or {}).get("account") or {}).get("acct") or (r.get("account") or {}).get("username", ""),
+                "username": ((r.get("target_account") or {}).get("account") or {}).get("acct") or (r.get("target_account") or {}).get("username", ""),
+                "category": r.get("category") or "other",
+                "comment": r.get("comment"),
+                "created_at": str(r["created_at"]) if r.get("created_at") else None,
+            }
+            for r in reports
+        ]
+    except Exception as e:
+        logging.error(f"Error fetching open reports: {e}")
+        raise RuntimeError(f"Error fetching open reports: {e}")
@@ -0,0 +1,287 @@
+"""
+Local archive of fetched accounts and statuses and of moderation results.
+
+Every batch of statuses the server fetches, every resolved account and every
+evaluation, activity analysis and triage result is queued in memory and
+written to SQLite by a background flusher in batches, so tool calls never wait
+for the disk. Rows of a failed write go back to the queue for the next flush.
+The queue is bounded by ARCHIVE_MAX_PENDING rows (including a batch being
+written); past that new rows are dropped (and counted) rather than growing
+memory. Rows older than ARCHIVE_RETENTION_DAYS are pruned. app.services.export
+reads the archive back out as Parquet or Arrow files.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.background import register_background_service
+from app.core.config import settings
+from app.core.executors import make_executor, run_blocking
+from app.core.metrics import Counter, Gauge
+from app.services import mastodon as mastodon_service
+from app.services import resolver
+from app.utils.mastodon import canonical_acct, get_local_server_domain
+
+ARCHIVED = Counter("nagatha_archive_rows_total", "Rows written to the local archive, or dropped when the queue was full", ["table", "outcome"])
+
+# table -> [(column, type)]; types: text, int, float, bool, time (unix seconds)
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "accounts": [
+        ("instance", "text"), ("id", "text"), ("acct", "text"), ("display_name", "text"), ("note", "text"),
+        ("url", "text"), ("bot", "bool"), ("followers_count", "int"), ("following_count", "int"),
+        ("statuses_count", "int"), ("created_at", "time"), ("fetched_at", "time"),
+    ],
+    "statuses": [
+        ("instance", "text"), ("id", "text"), ("account", "text"), ("created_at", "time"), ("content", "text"),
+        ("language", "text"), ("visibility", "text"), ("url", "text"), ("in_reply_to_account_id", "text"),
+        ("reblog_of", "text"), ("replies_count", "int"), ("reblogs_count", "int"), ("favourites_count", "int"),
+        ("fetched_at", "time"),
+    ],
+    "evaluations": [
+        ("recorded_at", "time"), ("username", "text"), ("risk_score", "float"), ("recommendation", "text"),
+        ("summary", "text"),
+    ],
+    "activity": [
+        ("recorded_at", "time"), ("username", "text"), ("post_count", "int"), ("avg_favorites", "float"),
+        ("avg_reblogs", "float"), ("posting_frequency", "text"), ("category", "text"), ("summary", "text"),
+    ],
+    "triage": [
+        ("recorded_at", "time"), ("username", "text"), ("reporter", "text"), ("reason", "text"),
+        ("triage_level", "text"), ("action", "text"), ("summary", "text"),
+    ],
+}
+# Column that date ranges select on
+TIME_COLUMNS = {"accounts": "fetched_at", "statuses": "created_at", "evaluations": "recorded_at", "activity": "recorded_at", "triage": "recorded_at"}
+# Fetched entities are kept once per instance and refreshed when fetched again
+KEYS = {"accounts": ("instance", "id"), "statuses": ("instance", "id")}
+# Column that retention prunes on: when the row was written
+WRITTEN_COLUMNS = {"accounts": "fetched_at", "statuses": "fetched_at", "evaluations": "recorded_at", "activity": "recorded_at", "triage": "recorded_at"}
+
+_SQL_TYPES = {"text": "TEXT", "int": "INTEGER", "float": "REAL", "bool": "INTEGER", "time": "REAL"}
+
+
+class ArchiveStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for table, columns in TABLES.items():
+            key = f", PRIMARY KEY ({', '.join(KEYS[table])})" if table in KEYS else ""
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                + ", ".join(f"{name} {_SQL_TYPES[kind]}" for name, kind in columns) + key + ")"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_time ON {table} ({TIME_COLUMNS[table]})")
+
+    def write(self, batches: Dict[str, list]):
+        """
+        Insert queued rows, one transaction for all tables.
+        """
+        self.conn.execute("BEGIN")
+        try:
+            for table, rows in batches.items():
+                verb = "INSERT OR REPLACE" if table in KEYS else "INSERT"
+                placeholders = ", ".join("?" * len(TABLES[table]))
+                self.conn.executemany(f"{verb} INTO {table} VALUES ({placeholders})", rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, before: float) -> int:
+        return sum(
+            self.conn.execute(f"DELETE FROM {table} WHERE {column} < ?", (before,)).rowcount
+            for table, column in WRITTEN_COLUMNS.items()
+        )
+
+    def rows(self, table: str, start: float, end: float, batch_rows: int) -> Iterator[list]:
+        """
+        Rows of `table` whose time column falls in [start, end), in batches.
+        Reads use their own connection so an export never blocks the flusher.
+        """
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            columns = ", ".join(name for name, _ in TABLES[table])
+            time_column = TIME_COLUMNS[table]
+            cursor = conn.execute(
+                f"SELECT {columns} FROM {table} WHERE {time_column} >= ? AND {time_column} < ? ORDER BY {time_column}",
+                (start, end),
+            )
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+
+@lru_cache()
+def get_archive() -> ArchiveStore:
+    return ArchiveStore(settings.ARCHIVE_DB_PATH or os.path.join(settings.DATA_DIR, "archive.sqlite3"))
+
+
+_pending: Dict[str, list] = {}
+_pending_rows = 0
+# Rows taken from _pending by a write that has not finished yet
+_in_flight = 0
+_executor = make_executor("archive", 1)
+
+
+def record(table: str, row: tuple):
+    global _pending_rows
+    if not settings.ARCHIVE_ENABLED:
+        return
+    if _pending_rows + _in_flight >= settings.ARCHIVE_MAX_PENDING:
+        ARCHIVED.inc(table, "dropped")
+        return
+    _pending.setdefault(table, []).append(row)
+    _pending_rows += 1
+
+
+def _take_pending() -> Dict[str, list]:
+    global _pending, _pending_rows
+    batches, _pending, _pending_rows = _pending, {}, 0
+    return batches
+
+
+def _requeue(batches: Dict[str, list]):
+    """
+    Put rows that were not written back at the front of the queue, ahead of
+    what was queued meanwhile. record() counts rows in flight against
+    ARCHIVE_MAX_PENDING, so the queue stays within the bound.
+    """
+    global _pending_rows
+    for table, rows in batches.items():
+        _pending[table] = rows + _pending.get(table, [])
+        _pending_rows += len(rows)
+
+
+def _write(batches: Dict[str, list]):
+    get_archive().write(batches)
+    for table, rows in batches.items():
+        ARCHIVED.inc(table, "written", amount=len(rows))
+
+
+async def flush_pending():
+    """
+    Write everything queued so far. All writes go through the single archive
+    thread, so they never overlap.
+    """
+    global _in_flight
+    batches = _take_pending()
+    if batches:
+        rows = sum(len(table_rows) for table_rows in batches.values())
+        _in_flight += rows
+        try:
+            await run_blocking(_executor, "archive", "write", _write, batches)
+        except Exception:
+            # The write is one transaction, so nothing was kept; retry it all next time.
+            # (On cancellation the worker thread still finishes the write.)
+            _requeue(batches)
+            raise
+        finally:
+            _in_flight -= rows
+
+
+def _timestamp(value) -> Optional[float]:
+    parsed = mastodon_service.parse_datetime(value)
+    return parsed.timestamp() if parsed is not None else None
+
+
+def record_account(account: dict, domain: Optional[str] = None):
+    """
+    `domain` is the instance the account was fetched from when it is not the default one.
+    """
+    record("accounts", (
+        domain or get_local_server_domain(), str(account.get("id")), canonical_acct(account.get("acct") or "", domain),
+        account.get("display_name"), account.get("note"), account.get("url"), bool(account.get("bot")),
+        account.get("followers_count"), account.get("following_count"), account.get("statuses_count"),
+        _timestamp(account.get("created_at")), time.time(),
+    ))
+
+
+resolver.register_account_listener(record_account)
+
+
+def record_statuses(statuses, domain: Optional[str] = None):
+    if not settings.ARCHIVE_ENABLED:
+        return
+    instance = domain or get_local_server_domain()
+    now = time.time()
+    for status in statuses:
+        reblog = status.get("reblog")
+        record("statuses", (
+            instance, str(status.get("id")), canonical_acct((status.get("account") or {}).get("acct") or "", domain),
+            _timestamp(status.get("created_at")), status.get("content"), status.get("language"),
+            status.get("visibility"), status.get("url"), status.get("in_reply_to_account_id"),
+            str(reblog["id"]) if reblog else None, status.get("replies_count"), status.get("reblogs_count"),
+            status.get("favourites_count"), now,
+        ))
+
+
+mastodon_service.register_status_listener(record_statuses)
+
+
+def record_evaluation(username: str, result):
+    record("evaluations", (time.time(), username, result.risk_score, result.recommendation, result.summary))
+
+
+def record_activity(username: str, result):
+    record("activity", (
+        time.time(), username, result.post_count, result.avg_engagement.get("favorites"),
+        result.avg_engagement.get("reblogs"), result.posting_frequency, result.category, result.summary,
+    ))
+
+
+def record_triage(report, result):
+    record("triage", (
+        time.time(), report.username, report.reporter, report.reason, result.triage_level, result.action, result.summary,
+    ))
+
+
+_flusher_task = None
+
+
+async def _flush_loop():
+    last_prune = 0.0
+    while True:
+        await asyncio.sleep(settings.ARCHIVE_FLUSH_SECONDS)
+        try:
+            await flush_pending()
+            if time.time() - last_prune > 3600:
+                last_prune = time.time()
+                before = last_prune - settings.ARCHIVE_RETENTION_DAYS * 86400
+                await run_blocking(_executor, "archive", "prune", get_archive().prune, before)
+        except Exception as e:
+            logging.error(f"Archive flush failed, {_pending_rows} rows kept for a retry: {e}")
+
+
+async def start_flusher():
+    global _flusher_task
+    if settings.ARCHIVE_ENABLED and _flusher_task is None:
+        _flusher_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_flusher():
+    global _flusher_task
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+        await flush_pending()
+
+
+register_background_service("archive", start_flusher, stop_flusher)
+
+Gauge("nagatha_archive_pending_rows", "Rows queued for the local archive", fn=lambda: {(): _pending_rows})
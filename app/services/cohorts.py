@@ -0,0 +1,155 @@
+"""
+Signup-cohort analytics over the admin accounts API.
+
+Pages /api/v1/admin/accounts back to the start of the window, then computes
+cohort statistics on the CPU stage. Each normalized page, the newest (head)
+page included, is cached in SQLite for COHORT_CACHE_TTL seconds, keyed by
+status filter and max_id. A repeated query within the TTL makes no API calls.
+Once the head page has expired it is fetched again; older pages are reused
+while cached and still reached at the same max_id.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import settings
+from app.core.mastodon_client import MastodonInstance, get_instance
+from app.core.metrics import record_cache
+from app.core.process_pool import run_cpu_bound
+from app.schemas.cohort import CohortOut
+from app.services import admin_mastodon
+from app.services.mastodon import parse_datetime
+
+STATUS_FILTERS = {
+    "pending": {"local": True, "pending": True},
+    "active": {"local": True, "active": True},
+    "all": {"local": True},
+}
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class PageCache:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS admin_account_pages (key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, body TEXT NOT NULL)"
+        )
+
+    def get(self, key: str, ttl: float) -> Optional[list]:
+        row = self.conn.execute(
+            "SELECT body FROM admin_account_pages WHERE key = ? AND fetched_at >= ?", (key, time.time() - ttl)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, records: list):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO admin_account_pages (key, fetched_at, body) VALUES (?, ?, ?)",
+            (key, time.time(), json.dumps(records)),
+        )
+
+    def prune(self, ttl: float):
+        self.conn.execute("DELETE FROM admin_account_pages WHERE fetched_at < ?", (time.time() - ttl,))
+
+
+@lru_cache()
+def get_page_cache() -> PageCache:
+    return PageCache(os.path.join(settings.DATA_DIR, "admin_accounts.sqlite3"))
+
+
+def account_record(raw) -> dict:
+    """
+    Reduce an admin account entity to the fields cohort statistics use.
+    """
+    email = raw.get("email") or ""
+    ip = raw.get("ip")
+    if isinstance(ip, dict):
+        ip = ip.get("ip")
+    if not ip and raw.get("ips"):
+        ip = raw["ips"][0].get("ip")
+    account = raw.get("account") or {}
+    bio = _TAG_RE.sub(" ", account.get("note") or "").strip() or (raw.get("invite_request") or "")
+    created_at = parse_datetime(raw.get("created_at"))
+    if created_at is not None and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return {
+        "id": str(raw.get("id")),
+        "username": raw.get("username") or account.get("acct") or "",
+        "created_at": created_at.timestamp() if created_at else 0.0,
+        "email_domain": email.rsplit("@", 1)[-1].lower() if "@" in email else "",
+        "ip": str(ip) if ip else "",
+        "bio": bio,
+        "pending": raw.get("approved") is False,
+    }
+
+
+async def _fetch_page(status: str, max_id: Optional[str], cache: PageCache, instance: MastodonInstance) -> tuple[list, bool]:
+    key = f"{instance.name}:{status}:{max_id or 'head'}"
+    records = cache.get(key, settings.COHORT_CACHE_TTL)
+    record_cache("admin_accounts", records is not None)
+    if records is not None:
+        return records, True
+    params = dict(STATUS_FILTERS[status], limit=settings.COHORT_PAGE_SIZE)
+    if max_id:
+        params["max_id"] = max_id
+    records = [account_record(raw) for raw in await admin_mastodon.get_admin_accounts_page(params, instance.name)]
+    cache.put(key, records)
+    return records, False
+
+
+async def analyze_signup_cohort(
+    status: str = "all", hours: int = 24, max_accounts: Optional[int] = None, instance: Optional[str] = None
+) -> CohortOut:
+    if status not in STATUS_FILTERS:
+        raise ValueError(f"Unknown status filter: {status}")
+    server = get_instance(instance)
+    max_accounts = max_accounts or settings.COHORT_MAX_ACCOUNTS
+    window_end = datetime.now(timezone.utc)
+    window_start = window_end - timedelta(hours=hours)
+    since = window_start.timestamp()
+
+    cache = get_page_cache()
+    accounts, fetched, cached = [], 0, 0
+    max_id, truncated = None, False
+    while True:
+        records, hit = await _fetch_page(status, max_id, cache, server)
+        cached += hit
+        fetched += not hit
+        accounts.extend(r for r in records if r["created_at"] >= since)
+        if len(accounts) >= max_accounts:
+            accounts, truncated = accounts[:max_accounts], True
+            break
+        # Pages are newest first; stop at the first page reaching past the window.
+        if len(records) < settings.COHORT_PAGE_SIZE or min(r["created_at"] for r in records) < since:
+            break
+        max_id = records[-1]["id"]
+    cache.prune(settings.COHORT_CACHE_TTL)
+
+    # numpy is only needed here, so it is imported on first use to keep cold start fast
+    from app.utils.cohorts import CohortBatch, compute_cohort_stats
+
+    stats = await run_cpu_bound(
+        compute_cohort_stats,
+        CohortBatch.from_accounts(accounts),
+        settings.COHORT_BURST_FACTOR,
+        settings.COHORT_BIO_DISTANCE,
+        size=len(accounts),
+    )
+    logging.info(f"Cohort analysis over {len(accounts)} accounts ({fetched} pages fetched, {cached} cached)")
+    return CohortOut(
+        status=status,
+        window_start=window_start,
+        window_end=window_end,
+        pages_fetched=fetched,
+        pages_cached=cached,
+        truncated=truncated,
+        **stats,
+    )
@@ -0,0 +1,115 @@
+"""
+Export the local archive as Parquet or Arrow IPC files.
+
+Each table is streamed out of SQLite EXPORT_BATCH_ROWS rows at a time and
+every batch is written as one record batch (one Parquet row group), so memory
+stays bounded by a batch whatever the date range. Files are written under a
+temporary name and renamed when complete.
+
+pyarrow is only needed here and is imported on first use.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.executors import make_executor, run_blocking
+from app.schemas.export import ExportedFile, ExportOut
+from app.services import archive
+
+_executor = make_executor("export", 1)
+
+
+def _arrow_schema(pa, table: str):
+    types = {
+        "text": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+        "time": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in archive.TABLES[table]])
+
+
+def _record_batch(pa, schema, table: str, rows: list):
+    columns = []
+    for i, (name, kind) in enumerate(archive.TABLES[table]):
+        values = [row[i] for row in rows]
+        if kind == "time":
+            values = [round(v * 1_000_000) if v is not None else None for v in values]
+            columns.append(pa.array(values, pa.int64()).cast(schema.field(name).type))
+        elif kind == "bool":
+            # SQLite stores booleans as 0/1
+            columns.append(pa.array([bool(v) if v is not None else None for v in values], pa.bool_()))
+        else:
+            columns.append(pa.array(values, schema.field(name).type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def export_dir() -> str:
+    return settings.EXPORT_DIR or os.path.join(settings.DATA_DIR, "exports")
+
+
+def export_table(table: str, start: datetime, end: datetime, directory: str, format: str = "parquet",
+                 batch_rows: Optional[int] = None) -> ExportedFile:
+    """
+    Stream one archive table over [start, end) into a file in `directory`. Blocking.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Export needs pyarrow: pip install pyarrow")
+
+    schema = _arrow_schema(pa, table)
+    extension = "parquet" if format == "parquet" else "arrow"
+    path = os.path.join(directory, f"{table}-{start:%Y%m%dT%H%M%S}-{end:%Y%m%dT%H%M%S}.{extension}")
+    tmp = f"{path}.tmp"
+    rows = row_groups = 0
+    if format == "parquet":
+        writer = pq.ParquetWriter(tmp, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(tmp, schema)
+    try:
+        for batch in archive.get_archive().rows(table, start.timestamp(), end.timestamp(), batch_rows or settings.EXPORT_BATCH_ROWS):
+            writer.write_batch(_record_batch(pa, schema, table, batch))
+            rows += len(batch)
+            row_groups += 1
+    except BaseException:
+        writer.close()
+        os.remove(tmp)
+        raise
+    writer.close()
+    os.replace(tmp, path)
+    return ExportedFile(table=table, path=path, rows=rows, row_groups=row_groups, bytes=os.path.getsize(path))
+
+
+def export_archive(start: datetime, end: Optional[datetime] = None, tables: Optional[List[str]] = None,
+                   format: str = "parquet", directory: Optional[str] = None) -> ExportOut:
+    """
+    Export the archived tables (all by default) over [start, end). Naive
+    datetimes are taken as UTC. Blocking; rows still queued in memory are not
+    included (see archive.flush_pending).
+    """
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    end = end or datetime.now(timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise ValueError("Export range is empty: end must be after start")
+    if format not in ("parquet", "arrow"):
+        raise ValueError(f"Unknown export format: {format}. Available: parquet, arrow")
+    tables = tables or list(archive.TABLES)
+    unknown = [t for t in tables if t not in archive.TABLES]
+    if unknown:
+        raise ValueError(f"Unknown archive tables: {', '.join(unknown)}. Available: {', '.join(archive.TABLES)}")
+    directory = directory or export_dir()
+    os.makedirs(directory, exist_ok=True)
+    files = [export_table(table, start, end, directory, format) for table in tables]
+    return ExportOut(start=start, end=end, format=format, files=files)
+
+
+async def run_export(start: datetime, end: Optional[datetime] = None, tables: Optional[List[str]] = None,
+                     format: str = "parquet") -> ExportOut:
+    """
+    Flush queued rows, then export into EXPORT_DIR on the export thread.
+    """
+    await archive.flush_pending()
+    return await run_blocking(_executor, "archive", "export", export_archive, start, end, tables, format)
@@ -0,0 +1,117 @@
+"""
+Interaction graph built from every batch of statuses the server fetches.
+
+Mentions, replies and boosts become edges in a time-bucketed in-memory graph
+(see app.utils.interaction_graph) that answers pile-on and co-mention queries.
+"""
+
+import logging
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_cache_size
+from app.schemas.interactions import CoMentionGroup, CoMentionOut, PileOnEntry, PileOnOut
+from app.services import mastodon as mastodon_service
+from app.utils.interaction_graph import BOOST, MENTION, REPLY, InteractionGraph
+from app.utils.mastodon import canonical_acct
+
+
+@lru_cache()
+def get_interaction_graph() -> InteractionGraph:
+    return InteractionGraph(
+        bucket_seconds=settings.INTERACTION_BUCKET_SECONDS,
+        retention_seconds=settings.INTERACTION_RETENTION_HOURS * 3600,
+        max_edges=settings.INTERACTION_MAX_EDGES,
+    )
+
+
+def status_interactions(status, domain: Optional[str] = None) -> Optional[tuple]:
+    """
+    (status id, author, [(target, kind)], timestamp) for a raw status, or None
+    when it has no author or no interactions. `domain` is the instance the
+    status was fetched from when it is not the default one.
+    """
+    author = (status.get("account") or {}).get("acct")
+    created_at = mastodon_service.parse_datetime(status.get("created_at"))
+    if not author or created_at is None:
+        return None
+    reblog = status.get("reblog")
+    if reblog:
+        targets = [(canonical_acct(reblog["account"]["acct"], domain), BOOST)]
+    else:
+        reply_to = status.get("in_reply_to_account_id")
+        targets = [
+            (canonical_acct(m["acct"], domain), REPLY if reply_to is not None and str(m.get("id")) == str(reply_to) else MENTION)
+            for m in status.get("mentions") or []
+        ]
+    if not targets:
+        return None
+    # Status ids are only unique per instance
+    status_id = f"{status.get('id')}@{domain}" if domain else str(status.get("id"))
+    return status_id, canonical_acct(author, domain), targets, created_at.timestamp()
+
+
+def ingest_statuses(statuses, domain: Optional[str] = None) -> int:
+    graph = get_interaction_graph()
+    now = time.time()
+    added = 0
+    for status in statuses:
+        parsed = status_interactions(status, domain)
+        if parsed is not None:
+            added += graph.add_interactions(*parsed, now=now)
+    return added
+
+
+mastodon_service.register_status_listener(ingest_statuses)
+
+
+async def ingest_accounts(usernames: List[str], limit: int = 40, instance: Optional[str] = None) -> dict:
+    """
+    Fetch recent statuses for each account; the status listener adds them to the graph.
+    """
+    before = get_interaction_graph().stats()["statuses"]
+    failed = []
+    for username in usernames:
+        try:
+            await mastodon_service.get_recent_posts(username, limit, instance)
+        except Exception as e:
+            logging.error(f"Interaction ingest failed for {username}: {e}")
+            failed.append(username)
+    graph = get_interaction_graph().stats()
+    return {"accounts": len(usernames), "failed": failed, "new_statuses": graph["statuses"] - before, "graph": graph}
+
+
+def get_pile_on(username: str, hours: int = 24, min_interactions: int = 1) -> PileOnOut:
+    graph = get_interaction_graph()
+    target = canonical_acct(username)
+    rows = [r for r in graph.pile_on(target, time.time() - hours * 3600) if r["total"] >= min_interactions]
+    return PileOnOut(
+        target=target,
+        hours=hours,
+        account_count=len(rows),
+        interaction_count=sum(r["total"] for r in rows),
+        accounts=[PileOnEntry(**r) for r in rows],
+        graph=graph.stats(),
+    )
+
+
+def get_co_mentions(hours: int = 24, min_shared_targets: int = 2, username: Optional[str] = None) -> CoMentionOut:
+    graph = get_interaction_graph()
+    groups = graph.co_mentioners(
+        time.time() - hours * 3600,
+        min_shared=min_shared_targets,
+        max_target_fanin=settings.INTERACTION_MAX_TARGET_FANIN,
+        target=canonical_acct(username) if username else None,
+    )
+    return CoMentionOut(hours=hours, groups=[CoMentionGroup(**g) for g in groups], graph=graph.stats())
+
+
+def _graph_size(key: str) -> int:
+    # Not built until the first batch of statuses arrives
+    return get_interaction_graph().stats()[key] if get_interaction_graph.cache_info().currsize else 0
+
+
+register_cache_size("interaction_graph_edges", lambda: _graph_size("edges"))
+register_cache_size("interaction_graph_accounts", lambda: _graph_size("accounts"))
@@ -0,0 +1,54 @@
+"""
+Job types for the durable job queue: bulk account evaluation, bulk activity
+analysis and sweeps over open reports.
+"""
+
+from datetime import datetime
+
+from app.core.job_queue import register_job_type
+from app.schemas.report import UserReportIn
+from app.schemas.user_activity import UserActivityIn
+from app.services import admin_mastodon
+from app.services import mastodon as mastodon_service
+from app.services.activity import analyze_user_activity
+from app.services.llm import evaluate_user_profile
+from app.services.moderation import triage_user_report
+from app.utils.serialization import model_to_dict
+
+# Mastodon report categories mapped onto the triage reasons
+REPORT_CATEGORY_REASONS = {"spam": "spam", "violation": "abuse", "legal": "other", "other": "other"}
+
+
+async def _usernames(params: dict) -> list:
+    return list(dict.fromkeys(params["usernames"]))
+
+
+async def _evaluate_account(username: str, params: dict) -> dict:
+    profile = await mastodon_service.get_user_profile(username, params.get("instance"))
+    return model_to_dict(await evaluate_user_profile(profile))
+
+
+async def _analyze_account(username: str, params: dict) -> dict:
+    posts = await mastodon_service.get_recent_posts(username, params.get("limit", 20), params.get("instance"))
+    return model_to_dict(await analyze_user_activity(UserActivityIn(username=username, recent_posts=posts)))
+
+
+async def _open_reports(params: dict) -> list:
+    return await admin_mastodon.get_open_reports(params.get("limit", 200), params.get("instance"))
+
+
+async def _triage_report(report: dict, params: dict) -> dict:
+    triage = await triage_user_report(UserReportIn(
+        reporter=report["reporter"],
+        username=report["username"],
+        reason=REPORT_CATEGORY_REASONS.get(report["category"], "other"),
+        comment=report.get("comment"),
+        created_at=mastodon_service.parse_datetime(report.get("created_at")) or datetime.utcnow(),
+        recent_posts=[],
+    ))
+    return model_to_dict(triage)
+
+
+register_job_type("evaluate_accounts", _usernames, _evaluate_account)
+register_job_type("analyze_accounts", _usernames, _analyze_account)
+register_job_type("report_sweep", _open_reports, _triage_report)
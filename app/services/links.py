@@ -0,0 +1,205 @@
+"""
+Link reputation: local domain blocklists and domains seen in fetched statuses.
+
+Blocklists (LINK_BLOCKLIST_PATHS: plain domain lists, hosts files or
+adblock-style "||domain^" rules, optionally gzipped) are compiled into one
+index file (see app.utils.link_reputation) in a background thread at startup.
+The index is rebuilt only when a source file changes, so restarts just map it.
+Until it is ready, lookups see an empty blocklist. A configuration reload that
+changes the blocklist settings loads it again the same way.
+
+Every batch of statuses the server fetches is scanned for links, counting per
+domain how many links and how many distinct accounts posted them. Triage and
+activity heuristics use both signals.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional
+
+from app.core.background import register_background_service
+from app.core.config import settings
+from app.core.config_reload import register_settings_listener
+from app.core.metrics import Counter, Gauge, register_cache_size
+from app.schemas.links import DomainReputation, LinkReport
+from app.services import mastodon as mastodon_service
+from app.utils.link_reputation import DomainBlocklist, extract_link_domains, extract_urls, parse_blocklist, url_domain
+from app.utils.mastodon import canonical_acct
+
+LINK_CHECKS = Counter("nagatha_link_checks_total", "Linked domains checked against the blocklist", ["result"])
+
+_blocklist = DomainBlocklist()
+# domain -> [links seen, sample of accounts that posted them]
+_seen: Dict[str, list] = {}
+
+
+def get_blocklist() -> DomainBlocklist:
+    return _blocklist
+
+
+def _index_path() -> str:
+    return settings.LINK_INDEX_PATH or os.path.join(settings.DATA_DIR, "link_blocklist.idx")
+
+
+def _sources_signature(paths: List[str]) -> bytes:
+    digest = blake2b(digest_size=16)
+    digest.update(str(settings.LINK_BLOOM_BITS_PER_DOMAIN).encode())
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.digest()
+
+
+def _read_domains(paths: List[str]) -> Iterable[str]:
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            yield from parse_blocklist(f)
+
+
+def load_blocklist() -> DomainBlocklist:
+    """
+    Open the blocklist index, rebuilding it first when the sources changed.
+    Blocking; runs in a worker thread.
+    """
+    global _blocklist
+    paths = settings.LINK_BLOCKLIST_PATHS
+    if not paths:
+        _blocklist = DomainBlocklist()
+        return _blocklist
+    index_path = _index_path()
+    signature = _sources_signature(paths)
+    try:
+        blocklist = DomainBlocklist(index_path)
+        if blocklist.signature != signature:
+            blocklist = None
+    except (OSError, ValueError):
+        blocklist = None
+    if blocklist is None:
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        blocklist = DomainBlocklist.build(
+            _read_domains(paths), index_path, signature, settings.LINK_BLOOM_BITS_PER_DOMAIN
+        )
+        logging.info(f"Built link blocklist index with {len(blocklist)} domains at {index_path}")
+    _blocklist = blocklist
+    return blocklist
+
+
+def _record(domain: str, account: str):
+    entry = _seen.get(domain)
+    if entry is None:
+        entry = _seen[domain] = [0, set()]
+    entry[0] += 1
+    if len(entry[1]) < max(100, settings.LINK_SPREAD_ACCOUNTS):
+        entry[1].add(account)
+
+
+def _prune():
+    """
+    Keep the most-linked half once more than LINK_TRACKED_DOMAINS are tracked.
+    """
+    keep = sorted(_seen.items(), key=lambda item: item[1][0], reverse=True)[:settings.LINK_TRACKED_DOMAINS // 2]
+    _seen.clear()
+    _seen.update(keep)
+
+
+def observe_statuses(statuses, domain: Optional[str] = None):
+    for status in statuses:
+        status = status.get("reblog") or status
+        author = (status.get("account") or {}).get("acct")
+        if not author:
+            continue
+        domains = set(extract_link_domains(status.get("content") or ""))
+        card_url = (status.get("card") or {}).get("url")
+        card_domain = url_domain(card_url) if card_url else None
+        if card_domain:
+            domains.add(card_domain)
+        account = canonical_acct(author, domain)
+        for linked in domains:
+            _record(linked, account)
+    if len(_seen) > settings.LINK_TRACKED_DOMAINS:
+        _prune()
+
+
+mastodon_service.register_status_listener(observe_statuses)
+
+
+def domain_reputation(domain: str) -> DomainReputation:
+    blocklisted_by = _blocklist.match(domain)
+    LINK_CHECKS.inc("blocklisted" if blocklisted_by else "clean")
+    links, accounts = _seen.get(domain, (0, ()))
+    return DomainReputation(domain=domain, blocklisted_by=blocklisted_by, links_seen=links, accounts_seen=len(accounts))
+
+
+def link_report(texts: Iterable[Optional[str]]) -> LinkReport:
+    """
+    Reputation of every domain linked from `texts` (plain text or status HTML).
+    """
+    urls = [url for text in texts if text for url in extract_urls(text)]
+    domains = [domain_reputation(d) for d in dict.fromkeys(filter(None, map(url_domain, urls)))]
+    return LinkReport(
+        link_count=len(urls),
+        domains=domains,
+        blocklisted=[d.domain for d in domains if d.blocklisted_by],
+        blocklist_size=len(_blocklist),
+    )
+
+
+def link_summary(report: LinkReport) -> str:
+    """
+    Sentences describing link-spam signals in `report`, or "" when there are none.
+    """
+    text = ""
+    if report.blocklisted:
+        text += f" Links to blocklisted domains: {', '.join(report.blocklisted)}."
+    spread = [d for d in report.domains if not d.blocklisted_by and d.accounts_seen >= settings.LINK_SPREAD_ACCOUNTS]
+    if spread:
+        text += " Widely posted links: " + ", ".join(f"{d.domain} ({d.accounts_seen} accounts)" for d in spread) + "."
+    return text
+
+
+_load_task = None
+
+
+async def start_loader():
+    global _load_task
+    if settings.LINK_BLOCKLIST_PATHS and _load_task is None:
+        _load_task = asyncio.create_task(asyncio.to_thread(load_blocklist))
+        _load_task.add_done_callback(_loaded)
+
+
+def _loaded(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Failed to load link blocklists: {task.exception()}")
+
+
+def _blocklist_changed(old, new):
+    global _load_task
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        load_blocklist()
+        return
+    # The old blocklist keeps answering until the new one is ready
+    _load_task = asyncio.create_task(asyncio.to_thread(load_blocklist))
+    _load_task.add_done_callback(_loaded)
+
+
+register_settings_listener(["LINK_BLOCKLIST_PATHS", "LINK_INDEX_PATH", "LINK_BLOOM_BITS_PER_DOMAIN"], _blocklist_changed)
+
+
+async def stop_loader():
+    global _load_task
+    # A build in progress finishes in its thread; nothing waits for it.
+    _load_task = None
+
+
+register_background_service("link blocklists", start_loader, stop_loader)
+
+Gauge("nagatha_link_blocklist_domains", "Domains in the loaded link blocklist", fn=lambda: {(): len(_blocklist)})
+Gauge("nagatha_link_domains_tracked", "Linked domains counted from fetched statuses", fn=lambda: {(): len(_seen)})
+register_cache_size("link_domains", lambda: len(_seen))
+register_cache_size("link_blocklist_matches", lambda: len(_blocklist._matches))
@@ -1,90 +1,265 @@
 import logging
 import json
+import time
+from functools import lru_cache
 
-from openai import AsyncOpenAI
+from pydantic import ValidationError
 
+from app.core.audit_log import record_decision
 from app.core.config import settings
+from app.core.config_reload import register_settings_listener
+from app.core.metrics import Counter, Histogram, track_upstream
+from app.core.tracing import span
 from app.schemas.user_eval import UserProfileIn, UserEvaluationOut
 from app.schemas.user_activity import RecentPost
 from app.schemas.report import UserReportIn, ReportTriageOut
+from app.services import archive
+from app.services.links import link_report
+from app.utils.json_extract import extract_json_object, normalize_literals
+from app.utils.serialization import model_to_dict
+
+LLM_REQUESTS = Counter("nagatha_llm_requests_total", "LLM requests per routed model", ["function", "model"])
+LLM_DURATION = Histogram("nagatha_llm_request_duration_seconds", "LLM request latency per routed model", ["function", "model"])
+LLM_TOKENS = Counter("nagatha_llm_tokens_total", "LLM tokens used per routed model", ["function", "model", "kind"])
+LLM_COST = Counter("nagatha_llm_cost_usd_total", "Estimated LLM spend from OPENAI_MODEL_PRICES", ["function", "model"])
+LLM_ESCALATIONS = Counter(
+    "nagatha_llm_escalations_total", "Results sent on to a stronger model", ["function", "model", "reason"]
+)
+LLM_PARSE = Counter(
+    "nagatha_llm_parse_total", "Structured LLM outputs by parse outcome (ok, repaired, reasked, failed)", ["function", "outcome"]
+)
+LLM_REASKS = Counter("nagatha_llm_reasks_total", "Follow-up requests for invalid fields", ["function", "model"])
+
+# Asked of every JSON-returning prompt so the router can escalate unsure answers
+CONFIDENCE_INSTRUCTION = " Also include confidence (float between 0 and 1): how sure you are of this assessment."
+
+@lru_cache()
+def get_openai_client():
+    # Imported on first use: the openai package dominates server import time.
+    # The client is shared so its connection pool stays warm across calls.
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+
+# Models, routes and prices are read per call; only the client depends on the key and URL
+register_settings_listener(["OPENAI_API_KEY", "OPENAI_BASE_URL"], lambda old, new: get_openai_client.cache_clear())
+
+def _llm_span(function: str, model: str):
+    return span(f"openai {function}", **{"llm.function": function, "llm.model": model})
+
+def _record_usage(llm_span, response, function: str, model: str):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        llm_span.set_attribute("llm.prompt_tokens", usage.prompt_tokens)
+        llm_span.set_attribute("llm.completion_tokens", usage.completion_tokens)
+        LLM_TOKENS.inc(function, model, "prompt", amount=usage.prompt_tokens)
+        LLM_TOKENS.inc(function, model, "completion", amount=usage.completion_tokens)
+        prices = settings.OPENAI_MODEL_PRICES.get(model)
+        if prices:
+            LLM_COST.inc(function, model, amount=(usage.prompt_tokens * prices[0] + usage.completion_tokens * prices[1]) / 1e6)
+
+def route_models(function: str, input_chars: int) -> list[str]:
+    """
+    Models to try for one call, cheapest first. OPENAI_MODEL_ROUTES maps a
+    function name (or "default") to an escalation ladder; inputs larger than
+    OPENAI_LARGE_INPUT_CHARS skip the first, cheapest rung.
+    """
+    ladder = settings.OPENAI_MODEL_ROUTES.get(function) or settings.OPENAI_MODEL_ROUTES.get("default") or [settings.OPENAI_MODEL]
+    if len(ladder) > 1 and input_chars > settings.OPENAI_LARGE_INPUT_CHARS:
+        return ladder[1:]
+    return ladder
+
+@lru_cache()
+def _output_schema(output_model) -> dict:
+    schema = output_model.model_json_schema()
+    schema["properties"]["confidence"] = {"type": "number", "minimum": 0, "maximum": 1}
+    return schema
+
+def _response_format(name: str, schema: dict):
+    """
+    Constrain the completion to `schema` as far as OPENAI_RESPONSE_FORMAT allows.
+    """
+    if settings.OPENAI_RESPONSE_FORMAT == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
+    if settings.OPENAI_RESPONSE_FORMAT == "json_object":
+        return {"type": "json_object"}
+    return None
+
+# Models that rejected a json_schema response format; they are asked for json_object instead
+_schema_unsupported = set()
+
+def _rejects_response_format(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 400 and "response_format" in str(error)
+
+async def _complete(function: str, model: str, messages: list, response_format=None):
+    client = get_openai_client()
+    if response_format and response_format["type"] == "json_schema" and model in _schema_unsupported:
+        response_format = {"type": "json_object"}
+    kwargs = {"response_format": response_format} if response_format else {}
+    LLM_REQUESTS.inc(function, model)
+    started = time.perf_counter()
+    with track_upstream("openai", function), _llm_span(function, model) as llm_span:
+        try:
+            response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except Exception as e:
+            # Older models (e.g. gpt-3.5-turbo) answer 400 to json_schema; the prompts ask for JSON anyway
+            if not (response_format and response_format["type"] == "json_schema" and _rejects_response_format(e)):
+                raise
+            logging.warning(f"Model {model} does not support json_schema output, using json_object")
+            _schema_unsupported.add(model)
+            response = await client.chat.completions.create(
+                model=model, messages=messages, response_format={"type": "json_object"}
+            )
+        _record_usage(llm_span, response, function, model)
+    LLM_DURATION.observe(time.perf_counter() - started, function, model)
+    return response.choices[0].message.content
+
+async def _structured_result(function: str, model: str, messages: list, content: str, output_model):
+    """
+    Parse and validate a structured completion. Deviations such as fences,
+    prose, quoting and label case are repaired locally; fields that still fail
+    validation are re-asked, alone, up to OPENAI_REASK_ATTEMPTS times.
+    Returns (result, confidence or None).
+    """
+    try:
+        data, repaired = extract_json_object(content)
+    except ValueError as e:
+        LLM_PARSE.inc(function, "failed")
+        logging.error(f"JSON parse error ({function}): {e}")
+        raise RuntimeError("Invalid response from OpenAI API")
+    confidence = _confidence(data)
+    normalize_literals(output_model, data)
+    schema = _output_schema(output_model)
+    for attempt in range(settings.OPENAI_REASK_ATTEMPTS + 1):
+        try:
+            result = output_model(**data)
+            LLM_PARSE.inc(function, "reasked" if attempt else "repaired" if repaired else "ok")
+            return result, confidence
+        except ValidationError as e:
+            invalid = {str(err["loc"][0]): err["msg"] for err in e.errors() if err["loc"]}
+        if attempt == settings.OPENAI_REASK_ATTEMPTS or not invalid:
+            break
+        LLM_REASKS.inc(function, model)
+        fields = {name: schema["properties"][name] for name in invalid if name in schema["properties"]}
+        reask = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": (
+                "These fields in your answer were invalid:\n"
+                + "".join(f"- {name}: {msg}\n" for name, msg in invalid.items())
+                + f"Return a JSON object with corrected values for only these fields: {', '.join(invalid)}."
+            )},
+        ]
+        content = await _complete(function, model, reask, _response_format(
+            f"{output_model.__name__}_fix", {"type": "object", "properties": fields, "required": list(fields)}
+        ))
+        try:
+            fix, _ = extract_json_object(content)
+        except ValueError:
+            continue
+        data.update({name: value for name, value in fix.items() if name in invalid})
+        normalize_literals(output_model, data)
+    LLM_PARSE.inc(function, "failed")
+    logging.error(f"Validation error ({function}): invalid fields {sorted(invalid)}")
+    raise RuntimeError("Invalid data format from OpenAI API")
+
+async def _routed_completion(function: str, system_prompt: str, user_content: str, parse=None, output_model=None):
+    """
+    Run the prompt on the routed models in order. Structured calls pass
+    `output_model` and are parsed by _structured_result; free-text calls pass
+    `parse(content)` returning (result, confidence or None). Unusable output or
+    a confidence below OPENAI_ESCALATION_CONFIDENCE moves on to the next
+    model, and the last model's outcome stands. API errors are raised immediately.
+    """
+    models = route_models(function, len(user_content))
+    response_format = None
+    if output_model is not None:
+        response_format = _response_format(output_model.__name__, _output_schema(output_model))
+    for tier, model in enumerate(models):
+        last = tier == len(models) - 1
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ]
+        content = await _complete(function, model, messages, response_format)
+        try:
+            if output_model is not None:
+                result, confidence = await _structured_result(function, model, messages, content, output_model)
+            else:
+                result, confidence = parse(content)
+        except (RuntimeError, ValueError):
+            if last:
+                raise
+            LLM_ESCALATIONS.inc(function, model, "invalid")
+            continue
+        if not last and confidence is not None and confidence < settings.OPENAI_ESCALATION_CONFIDENCE:
+            LLM_ESCALATIONS.inc(function, model, "low_confidence")
+            continue
+        return result
+
+def _confidence(result: dict):
+    try:
+        return float(result.pop("confidence"))
+    except (KeyError, TypeError, ValueError):
+        return None
 
 async def evaluate_user_profile(user_data: UserProfileIn) -> UserEvaluationOut:
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
     system_prompt = (
         "You are a content moderation AI. Based on the user profile below, "
         "estimate a risk score, recommend a moderation action (approve, flag, deny), "
         "and explain briefly why. Return a JSON object with keys: "
         "risk_score (float between 0 and 1), recommendation (approve, flag, or deny), "
-        "and summary (a concise explanation)."
+        "and summary (a concise explanation)." + CONFIDENCE_INSTRUCTION
     )
+
+    profile = user_data.dict()
+    # Reputation of links in the bio, which the model cannot look up itself
+    links = link_report([user_data.bio])
+    if links.domains:
+        profile["bio_links"] = [d.dict() for d in links.domains]
     try:
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(user_data.dict(), default=str)},
-            ],
+        result = await _routed_completion(
+            "evaluate_user_profile", system_prompt, json.dumps(profile, default=str),
+            output_model=UserEvaluationOut,
         )
+    except RuntimeError:
+        raise
     except Exception as e:
         logging.error(f"OpenAI API error: {e}")
         raise RuntimeError("Error contacting OpenAI API")
-    content = response.choices[0].message.content
-    try:
-        result = json.loads(content)
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON parse error: {e}")
-        raise RuntimeError("Invalid response from OpenAI API")
-    try:
-        return UserEvaluationOut(**result)
-    except Exception as e:
-        logging.error(f"Validation error: {e}")
-        raise RuntimeError("Invalid data format from OpenAI API")
+    archive.record_evaluation(user_data.username, result)
+    record_decision("evaluation", user_data.username, model_to_dict(result))
+    return result
 
 async def classify_activity_pattern(posts: list[RecentPost]) -> str:
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
     system_prompt = (
         "You are an expert in social media analysis. Given a user's recent posts, classify their activity pattern with a single label such as 'engaged community member', 'low-effort spammer', or 'new quiet user'. Respond with only the label."
     )
+
+    def parse(content):
+        label = content.strip()
+        # A label is a few words; anything longer means the model ignored the format.
+        if not label or len(label) > 80 or "\n" in label:
+            raise ValueError("Expected a short activity label")
+        return label, None
+
     try:
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps([p.dict() for p in posts], default=str)},
-            ],
+        return await _routed_completion(
+            "classify_activity_pattern", system_prompt, json.dumps([p.dict() for p in posts], default=str), parse
         )
-        label = response.choices[0].message.content.strip()
-        return label
     except Exception as e:
         logging.error(f"OpenAI API error (activity pattern): {e}")
         return None
 
 async def triage_report(report: UserReportIn) -> ReportTriageOut:
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
     system_prompt = (
         "You are a moderation assistant. Given this user report, estimate severity (low, medium, high), "
         "suggest a moderation action (ignore, review, flag_immediately), and summarize briefly. "
-        "Return a JSON object with keys: triage_level, action, summary."
+        "Return a JSON object with keys: triage_level, action, summary." + CONFIDENCE_INSTRUCTION
     )
+
     try:
-        response = await client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(report.dict(), default=str)},
-            ],
+        return await _routed_completion(
+            "triage_report", system_prompt, json.dumps(report.dict(), default=str), output_model=ReportTriageOut
         )
     except Exception as e:
         logging.error(f"OpenAI API error (triage): {e}")
         raise
-    content = response.choices[0].message.content
-    try:
-        result = json.loads(content)
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON parse error (triage): {e}")
-        raise
-    try:
-        return ReportTriageOut(**result)
-    except Exception as e:
-        logging.error(f"Validation error (triage): {e}")
-        raise
\ No newline at end of file
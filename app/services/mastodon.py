@@ -1,21 +1,38 @@
 import logging
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
-import httpx
 
-from app.core.mastodon_client import get_mastodon_client
+from app.core.executors import run_blocking
+from app.core.mastodon_client import DEFAULT_INSTANCE, MastodonInstance, instance_for_account
 from app.schemas.user_eval import UserProfileIn
 from app.schemas.user_activity import RecentPost
-from app.utils.mastodon import extract_local_username, get_local_server_domain
+from app.services.resolver import DomainUnreachable, resolve_account
 from app.core.config import settings
 
-_executor = ThreadPoolExecutor(max_workers=4)
+_status_listeners = []
 
-def _run_in_executor(func, *args, **kwargs):
-    loop = asyncio.get_event_loop()
-    return loop.run_in_executor(_executor, lambda: func(*args, **kwargs))
+# Most statuses the API returns per page
+STATUS_PAGE_SIZE = 40
+
+def _api(instance: MastodonInstance, operation: str, endpoint: str, params: Optional[dict] = None):
+    return run_blocking(instance.executor, "mastodon", operation, instance.api, "GET", endpoint, params)
+
+def register_status_listener(listener):
+    """
+    Call `listener(statuses, domain)` with every batch of raw statuses fetched
+    from the API. `domain` is the instance they came from when it is not the
+    default one (bare 'acct' values are local to it), else None. Listeners run
+    inline, so they must be cheap and must not block.
+    """
+    _status_listeners.append(listener)
+
+def _notify_status_listeners(statuses, instance: MastodonInstance):
+    domain = None if instance.name == DEFAULT_INSTANCE else instance.domain
+    for listener in _status_listeners:
+        try:
+            listener(statuses, domain)
+        except Exception as e:
+            logging.error(f"Status listener {getattr(listener, '__name__', listener)} failed: {e}")
 
 def parse_datetime(dt):
     if isinstance(dt, datetime):
@@ -25,16 +42,15 @@ def parse_datetime(dt):
         return datetime.fromisoformat(dt.replace('Z', '+00:00'))
     return None
 
-async def get_user_profile(username: str) -> UserProfileIn:
-    mastodon = get_mastodon_client()
-    local_username = extract_local_username(username)
-    domain = get_local_server_domain()
-    acct = f"@{local_username}@{domain}" if "@" in username else f"@{local_username}@{domain}"
+async def get_user_profile(username: str, instance: Optional[str] = None) -> UserProfileIn:
+    """
+    Profile of `username` on the named instance, or on the instance matching
+    its domain (the default instance otherwise). Served from the resolver
+    cache for up to RESOLVE_CACHE_TTL seconds.
+    """
+    server = instance_for_account(username, instance)
     try:
-        user = await _run_in_executor(mastodon.account_search, acct, 1)
-        if not user:
-            raise RuntimeError("User not found")
-        user = user[0]
+        user = await resolve_account(username, server)
         return UserProfileIn(
             username=user.get("acct"),
             bio=user.get("note", ""),
@@ -43,21 +59,32 @@ async def get_user_profile(username: str) -> UserProfileIn:
             statuses_count=user.get("statuses_count", 0),
             created_at=parse_datetime(user.get("created_at")),
         )
+    except DomainUnreachable:
+        # Already specific, and cheap: the remote server was not contacted again
+        raise
     except Exception as e:
         logging.error(f"Mastodon user profile error: {e}")
         raise RuntimeError("Error fetching user profile")
 
-async def get_recent_posts(username: str, limit: int = 5) -> List[RecentPost]:
-    mastodon = get_mastodon_client()
-    local_username = extract_local_username(username)
-    domain = get_local_server_domain()
-    acct = f"@{local_username}@{domain}" if "@" in username else f"@{local_username}@{domain}"
+async def get_recent_posts(username: str, limit: int = 5, instance: Optional[str] = None) -> List[RecentPost]:
+    """
+    Up to `limit` (at most ACTIVITY_MAX_POSTS) of the user's latest statuses,
+    newest first, fetched in pages of STATUS_PAGE_SIZE.
+    """
+    server = instance_for_account(username, instance)
+    limit = min(limit, settings.ACTIVITY_MAX_POSTS)
     try:
-        user = await _run_in_executor(mastodon.account_search, acct, 1)
-        if not user:
-            raise RuntimeError("User not found")
-        user_id = user[0]["id"]
-        statuses = await _run_in_executor(mastodon.account_statuses, user_id, limit=limit)
+        user = await resolve_account(username, server)
+        user_id = user["id"]
+        statuses = []
+        params = {"limit": min(limit, STATUS_PAGE_SIZE)}
+        while len(statuses) < limit:
+            page = await _api(server, "account_statuses", f"/api/v1/accounts/{user_id}/statuses", params)
+            _notify_status_listeners(page, server)
+            statuses.extend(page[:limit - len(statuses)])
+            if len(page) < params["limit"]:
+                break
+            params = {"limit": min(limit - len(statuses), STATUS_PAGE_SIZE), "max_id": page[-1]["id"]}
         posts = []
         for s in statuses:
             posts.append(RecentPost(
@@ -65,8 +92,11 @@ async def get_recent_posts(username: str, limit: int = 5) -> List[RecentPost]:
                 created_at=parse_datetime(s.get("created_at")),
                 favorites=s.get("favourites_count", 0),
                 reblogs=s.get("reblogs_count", 0),
+                replies=s.get("replies_count", 0),
             ))
         return posts
+    except DomainUnreachable:
+        raise
     except Exception as e:
         logging.error(f"Mastodon recent posts error: {e}")
         raise RuntimeError("Error fetching recent posts") 
\ No newline at end of file
@@ -1,7 +1,20 @@
 import logging
-import os
 from app.schemas.report import UserReportIn, ReportTriageOut, KNOWN_REASONS
 from app.services.llm import triage_report
+from app.services.interactions import get_pile_on
+from app.services import archive
+from app.services.links import link_report, link_summary
+from app.core.admission import llm_allowed
+from app.core.audit_log import record_decision
+from app.core.config import settings
+from app.utils.serialization import model_to_dict
+
+
+def _audit(data: UserReportIn, result: ReportTriageOut, source: str):
+    record_decision("triage", data.username, {
+        "reporter": data.reporter, "reason": data.reason, "source": source, **model_to_dict(result),
+    })
+
 
 async def triage_user_report(data: UserReportIn) -> ReportTriageOut:
     # Basic validation
@@ -10,10 +23,14 @@ async def triage_user_report(data: UserReportIn) -> ReportTriageOut:
         reason = "other"
     else:
         reason = data.reason
-    use_llm = os.getenv("USE_LLM_TRIAGE", "false").lower() == "true"
+    # Degraded admission (LLM saturated) falls through to the heuristic triage below
+    use_llm = settings.USE_LLM_TRIAGE and llm_allowed()
     if use_llm:
         try:
-            return await triage_report(data)
+            result = await triage_report(data)
+            archive.record_triage(data, result)
+            _audit(data, result, "llm")
+            return result
         except Exception as e:
             logging.error(f"LLM triage failed: {e}")
     # Fallback logic
@@ -21,6 +38,12 @@ async def triage_user_report(data: UserReportIn) -> ReportTriageOut:
         triage_level = "high"
         action = "flag_immediately"
         summary = "Report suggests possible harassment or abuse; prompt review required."
+        pile_on = get_pile_on(data.username, hours=24)
+        if pile_on.account_count >= settings.INTERACTION_PILE_ON_ACCOUNTS:
+            summary += (
+                f" {pile_on.account_count} accounts interacted with @{pile_on.target} "
+                f"{pile_on.interaction_count} times in the last 24h (possible pile-on)."
+            )
     elif reason == "spam":
         triage_level = "medium"
         action = "review"
@@ -29,4 +52,15 @@ async def triage_user_report(data: UserReportIn) -> ReportTriageOut:
         triage_level = "low"
         action = "ignore"
         summary = "Report does not indicate urgent action."
-    return ReportTriageOut(triage_level=triage_level, action=action, summary=summary) 
\ No newline at end of file
+    links = link_report([data.post_excerpt] + [post.content for post in data.recent_posts])
+    if links.blocklisted:
+        # Links to blocklisted domains need a look whatever the report says; in a spam report they settle it
+        if reason == "spam":
+            triage_level, action = "high", "flag_immediately"
+        elif triage_level == "low":
+            triage_level, action = "medium", "review"
+    summary += link_summary(links)
+    result = ReportTriageOut(triage_level=triage_level, action=action, summary=summary)
+    archive.record_triage(data, result)
+    _audit(data, result, "heuristic")
+    return result 
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Account resolution with caching, per-domain fan-out limits and dead-domain backoff.
+
+Handles are resolved through `accounts/lookup` first, which only consults the
+instance's own database and never fetches from a remote server. A remote
+handle the instance does not know yet is checked with a WebFinger request to
+its home server, bounded by RESOLVE_WEBFINGER_TIMEOUT, and only imported with
+a resolving search once that server answered. Unreachable servers are
+remembered with exponential backoff, so later handles on them fail fast
+instead of stalling a search on the instance.
+
+Results, including "not found", are cached per instance and handle. Lookups
+of the same handle running at the same time share one request, and requests
+to any one remote server are limited to RESOLVE_DOMAIN_CONCURRENCY at a time.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import Settings, settings
+from app.core.config_reload import register_settings_listener
+from app.core.executors import make_executor, run_blocking
+from app.core.mastodon_client import DEFAULT_INSTANCE, MastodonInstance, get_instance, instance_configs
+from app.core.metrics import Counter, Gauge, record_cache, register_cache_size
+from app.schemas.accounts import DomainBackoff, ResolvedAccount, ResolveOut
+from app.utils.mastodon import extract_local_username, normalize_mastodon_username
+
+RESOLUTIONS = Counter("nagatha_account_resolutions_total", "Account resolutions by how they were answered", ["source"])
+
+_webfinger_executor = make_executor("webfinger", 8)
+
+# (instance, handle) -> (expires_at, account or None for "not found")
+_cache: "OrderedDict[Tuple[str, str], Tuple[float, Optional[dict]]]" = OrderedDict()
+_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+# domain -> [consecutive failures, retry_at]
+_domains: Dict[str, list] = {}
+_domain_limits: Dict[str, asyncio.Semaphore] = {}
+_account_listeners = []
+
+
+class AccountNotFound(RuntimeError):
+    pass
+
+
+class DomainUnreachable(RuntimeError):
+    pass
+
+
+def register_account_listener(listener):
+    """
+    Call `listener(account, domain)` with every account entity fetched from
+    the API (not with cache hits). `domain` is the instance it came from when
+    it is not the default one.
+    """
+    _account_listeners.append(listener)
+
+
+def _notify_account_listeners(account: dict, instance: MastodonInstance):
+    domain = None if instance.name == DEFAULT_INSTANCE else instance.domain
+    for listener in _account_listeners:
+        try:
+            listener(account, domain)
+        except Exception as e:
+            logging.error(f"Account listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+
+def split_handle(username: str, instance: MastodonInstance) -> Tuple[str, Optional[str]]:
+    """
+    (handle, remote domain or None): local handles lose their domain.
+    """
+    handle = extract_local_username(normalize_mastodon_username(username).strip(), instance.domain)
+    if "@" in handle:
+        user, _, domain = handle.partition("@")
+        domain = domain.lower()
+        return f"{user}@{domain}", domain
+    return handle, None
+
+
+def _cached(key: Tuple[str, str]):
+    entry = _cache.get(key)
+    if entry is None or entry[0] < time.time():
+        return False, None
+    _cache.move_to_end(key)
+    return True, entry[1]
+
+
+def _store(key: Tuple[str, str], account: Optional[dict]):
+    ttl = settings.RESOLVE_CACHE_TTL if account is not None else settings.RESOLVE_NEGATIVE_TTL
+    _cache[key] = (time.time() + ttl, account)
+    _cache.move_to_end(key)
+    while len(_cache) > settings.RESOLVE_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def domain_retry_at(domain: str) -> Optional[float]:
+    state = _domains.get(domain)
+    if state and state[1] > time.time():
+        return state[1]
+    return None
+
+
+def _domain_failed(domain: str, error: Exception):
+    failures = _domains.get(domain, [0, 0.0])[0] + 1
+    delay = min(settings.RESOLVE_BACKOFF_MAX, settings.RESOLVE_BACKOFF_SECONDS * 2 ** (failures - 1))
+    _domains[domain] = [failures, time.time() + delay]
+    logging.warning(f"Remote server {domain} unreachable ({error}); backing off for {delay:.0f}s")
+
+
+def _domain_limit(domain: str) -> asyncio.Semaphore:
+    limit = _domain_limits.get(domain)
+    if limit is None:
+        limit = _domain_limits[domain] = asyncio.Semaphore(settings.RESOLVE_DOMAIN_CONCURRENCY)
+    return limit
+
+
+def _webfinger(handle: str, domain: str) -> bool:
+    """
+    Whether the remote server knows `handle`. Raises when it cannot be reached.
+    """
+    import requests
+
+    response = requests.get(
+        f"https://{domain}/.well-known/webfinger",
+        params={"resource": f"acct:{handle}"},
+        headers={"Accept": "application/jrd+json"},
+        timeout=settings.RESOLVE_WEBFINGER_TIMEOUT,
+    )
+    if response.status_code in (404, 410):
+        return False
+    if response.status_code >= 500:
+        raise RuntimeError(f"WebFinger returned HTTP {response.status_code}")
+    # Other client errors (some servers restrict WebFinger) leave it to the instance to resolve.
+    return True
+
+
+async def _lookup(instance: MastodonInstance, handle: str) -> Optional[dict]:
+    from mastodon import MastodonNotFoundError
+
+    try:
+        return await run_blocking(
+            instance.executor, "mastodon", "account_lookup", instance.api, "GET", "/api/v1/accounts/lookup", {"acct": handle}
+        )
+    except MastodonNotFoundError:
+        return None
+
+
+async def _resolve_remote(instance: MastodonInstance, handle: str, domain: str) -> Optional[dict]:
+    retry_at = domain_retry_at(domain)
+    if retry_at is not None:
+        RESOLUTIONS.inc("backoff")
+        raise DomainUnreachable(f"Remote server {domain} is unreachable; retrying after {time.ctime(retry_at)}")
+    async with _domain_limit(domain):
+        # Recorded replays must not reach out to real servers.
+        if settings.MASTODON_CASSETTE_MODE == "off":
+            try:
+                known = await run_blocking(_webfinger_executor, "webfinger", "lookup", _webfinger, handle, domain)
+            except Exception as e:
+                _domain_failed(domain, e)
+                raise DomainUnreachable(f"Remote server {domain} is unreachable: {e}")
+            _domains.pop(domain, None)
+            if not known:
+                RESOLUTIONS.inc("webfinger_not_found")
+                return None
+        results = await run_blocking(
+            instance.executor, "mastodon", "account_search", instance.api, "GET", "/api/v1/accounts/search",
+            {"q": f"@{handle}", "resolve": "true", "limit": 1},
+        )
+    RESOLUTIONS.inc("remote")
+    matches = [a for a in results or [] if (a.get("acct") or "").lower() == handle.lower()]
+    return matches[0] if matches else None
+
+
+async def _resolve(instance: MastodonInstance, handle: str, domain: Optional[str]) -> Optional[dict]:
+    account = await _lookup(instance, handle)
+    if account is not None:
+        RESOLUTIONS.inc("lookup")
+    elif domain is not None:
+        account = await _resolve_remote(instance, handle, domain)
+    if account is not None:
+        _notify_account_listeners(account, instance)
+    _store((instance.name, handle), account)
+    return account
+
+
+async def resolve_account(username: str, instance: MastodonInstance) -> dict:
+    """
+    The account entity for `username` on `instance`. Raises AccountNotFound,
+    or DomainUnreachable while its home server is backed off.
+    """
+    handle, domain = split_handle(username, instance)
+    key = (instance.name, handle)
+    hit, account = _cached(key)
+    record_cache("accounts", hit)
+    if not hit:
+        task = _inflight.get(key)
+        if task is None:
+            task = _inflight[key] = asyncio.ensure_future(_resolve(instance, handle, domain))
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        account = await asyncio.shield(task)
+    if account is None:
+        raise AccountNotFound("User not found")
+    return account
+
+
+async def resolve_accounts(usernames: List[str], instance: Optional[str] = None) -> ResolveOut:
+    """
+    Resolve many handles concurrently; failures are reported per handle.
+    """
+    server = get_instance(instance)
+
+    async def resolve(username: str) -> ResolvedAccount:
+        cached = _cached((server.name, split_handle(username, server)[0]))[0]
+        try:
+            account = await resolve_account(username, server)
+        except (AccountNotFound, DomainUnreachable) as e:
+            return ResolvedAccount(username=username, found=False, cached=cached, error=str(e))
+        except Exception as e:
+            logging.error(f"Account resolution failed for {username}: {e}")
+            return ResolvedAccount(username=username, found=False, cached=cached, error=str(e))
+        return ResolvedAccount(
+            username=username, found=True, cached=cached,
+            id=str(account.get("id")), acct=account.get("acct"), url=account.get("url"),
+        )
+
+    accounts = await asyncio.gather(*(resolve(u) for u in dict.fromkeys(usernames)))
+    return ResolveOut(instance=server.name, accounts=accounts, backed_off=backed_off_domains())
+
+
+def backed_off_domains() -> List[DomainBackoff]:
+    now = time.time()
+    return [
+        DomainBackoff(domain=domain, failures=failures, retry_in_seconds=round(retry_at - now))
+        for domain, (failures, retry_at) in sorted(_domains.items())
+        if retry_at > now
+    ]
+
+
+def _instances_changed(old: Settings, new: Settings):
+    """
+    Cached accounts stay valid unless their instance now points at another server.
+    """
+    before, after = instance_configs(old), instance_configs(new)
+    moved = {name for name, config in before.items() if name not in after or after[name].api_base != config.api_base}
+    for key in [key for key in _cache if key[0] in moved]:
+        del _cache[key]
+
+
+register_settings_listener(["MASTODON_API_BASE", "MASTODON_INSTANCES"], _instances_changed)
+
+Gauge(
+    "nagatha_resolver_domains_backed_off",
+    "Remote servers currently skipped after failed WebFinger requests",
+    fn=lambda: {(): sum(1 for _, retry_at in _domains.values() if retry_at > time.time())},
+)
+register_cache_size("accounts", lambda: len(_cache))
@@ -0,0 +1,99 @@
+"""
+Hashtag and keyword trends in the statuses the server fetches.
+
+Every batch of fetched statuses is split into terms (see app.utils.trends)
+and counted, once per status, in the bucket of the status's creation time.
+Statuses fetched again (watchlist checks, repeated lookups) are recognised
+by id and not counted twice. surging_terms() compares the last
+TREND_RECENT_MINUTES with the rest of the TREND_WINDOW_HOURS window, so a
+campaign shows up as its tags and phrases spike, before reports arrive.
+"""
+
+import time
+from collections import Counter as TallyCounter
+from functools import lru_cache
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter, register_cache_size
+from app.schemas.trends import SurgingTerm, TrendsOut
+from app.services import mastodon as mastodon_service
+from app.utils.trends import SeenIds, TrendSketch, status_terms
+
+TREND_STATUSES = Counter("nagatha_trend_statuses_total", "Fetched statuses seen by the trend detector", ["outcome"])
+
+
+@lru_cache()
+def get_trend_sketch() -> TrendSketch:
+    bucket_seconds = settings.TREND_BUCKET_SECONDS
+    return TrendSketch(
+        bucket_seconds=bucket_seconds,
+        buckets=max(2, settings.TREND_WINDOW_HOURS * 3600 // bucket_seconds),
+        width=settings.TREND_SKETCH_WIDTH,
+        depth=settings.TREND_SKETCH_DEPTH,
+        top_k=settings.TREND_TOP_TERMS,
+    )
+
+
+@lru_cache()
+def _seen_statuses() -> SeenIds:
+    return SeenIds(settings.TREND_SEEN_STATUSES)
+
+
+def observe_statuses(statuses, domain: Optional[str] = None):
+    """
+    Status listener: runs inline on the event loop, so the terms of a batch
+    are tallied per bucket first and each bucket is updated once.
+    """
+    sketch = get_trend_sketch()
+    seen = _seen_statuses()
+    now = time.time()
+    # bucket -> (term counts, statuses)
+    batches: Dict[int, list] = {}
+    for status in statuses:
+        # A boost spreads the boosted status; count that status, once
+        status = status.get("reblog") or status
+        key = status.get("uri") or f"{domain}:{status.get('id')}"
+        if not seen.add(key):
+            TREND_STATUSES.inc("repeat")
+            continue
+        created_at = mastodon_service.parse_datetime(status.get("created_at"))
+        if created_at is None:
+            continue
+        terms = status_terms(status.get("content"), (tag.get("name") for tag in status.get("tags") or []))
+        batch = batches.setdefault(int(created_at.timestamp() // sketch.bucket_seconds), [TallyCounter(), 0])
+        batch[0].update(terms)
+        batch[1] += 1
+        TREND_STATUSES.inc("counted")
+    for bucket, (terms, documents) in batches.items():
+        sketch.add(terms, bucket * sketch.bucket_seconds, now, documents)
+
+
+mastodon_service.register_status_listener(observe_statuses)
+
+
+def surging_terms(kind: str = "all", limit: int = 20, min_count: Optional[int] = None,
+                  min_ratio: Optional[float] = None) -> TrendsOut:
+    sketch = get_trend_sketch()
+    recent_buckets = max(1, settings.TREND_RECENT_MINUTES * 60 // sketch.bucket_seconds)
+    result = sketch.surging(
+        time.time(),
+        recent_buckets,
+        min_count=settings.TREND_MIN_COUNT if min_count is None else min_count,
+        min_ratio=settings.TREND_MIN_RATIO if min_ratio is None else min_ratio,
+        prefix="#" if kind == "hashtag" else None,
+        exclude_prefix="#" if kind == "keyword" else None,
+        limit=limit,
+    )
+    return TrendsOut(
+        window_minutes=result["recent_buckets"] * sketch.bucket_seconds // 60,
+        baseline_minutes=result["baseline_buckets"] * sketch.bucket_seconds // 60,
+        statuses_in_window=result["recent_documents"],
+        terms=[
+            SurgingTerm(kind="hashtag" if term["term"].startswith("#") else "keyword", **term)
+            for term in result["terms"]
+        ],
+    )
+
+
+register_cache_size("trend_seen_statuses", lambda: len(_seen_statuses()))
@@ -0,0 +1,341 @@
+"""
+Watchlist of accounts under observation.
+
+A background scheduler re-fetches each watched account on its own interval
+(with jitter, pausing when the Mastodon rate limit runs low). It fingerprints
+the profile and posting pattern and re-runs the LLM-backed evaluation or the
+activity analysis only when the fingerprint moved past a threshold. Detected
+changes are stored so they can be queried by time.
+
+State lives in SQLite. Due entries are claimed with a conditional UPDATE, so
+several workers can run the scheduler without checking an account twice.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+from app.core.background import register_background_service
+from app.core.config import settings
+from app.core.mastodon_client import instance_for_account
+from app.schemas.user_activity import UserActivityIn
+from app.schemas.watchlist import WatchlistChange, WatchlistEntry
+from app.services import mastodon as mastodon_service
+from app.services.activity import analyze_user_activity
+from app.services.llm import evaluate_user_profile
+from app.utils.analysis import PostBatch, SECONDS_PER_DAY, compute_activity_stats
+from app.utils.mastodon import normalize_mastodon_username
+from app.utils.serialization import model_to_dict
+
+PROFILE_COUNT_FIELDS = ("follower_count", "following_count")
+# Fingerprint fields whose change triggers a profile evaluation
+PROFILE_FIELDS = ("bio_hash",) + PROFILE_COUNT_FIELDS
+
+
+def _to_datetime(ts: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc) if ts is not None else None
+
+
+class WatchlistStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS watchlist ("
+            "username TEXT PRIMARY KEY, added_at REAL NOT NULL, interval_seconds INTEGER NOT NULL, "
+            "next_check_at REAL NOT NULL, last_checked_at REAL, note TEXT, "
+            "fingerprint TEXT, last_evaluation TEXT, last_activity TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS watchlist_changes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, "
+            "detected_at REAL NOT NULL, kind TEXT NOT NULL, details TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS watchlist_changes_time ON watchlist_changes (detected_at)")
+
+    def add(self, username: str, interval_seconds: int, note: Optional[str]) -> WatchlistEntry:
+        now = time.time()
+        # Re-adding keeps the stored fingerprint but schedules an immediate check.
+        self.conn.execute(
+            "INSERT INTO watchlist (username, added_at, interval_seconds, next_check_at, note) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET interval_seconds = excluded.interval_seconds, "
+            "next_check_at = excluded.next_check_at, note = COALESCE(excluded.note, note)",
+            (username, now, interval_seconds, now, note),
+        )
+        return self.get(username)
+
+    def remove(self, username: str) -> bool:
+        return self.conn.execute("DELETE FROM watchlist WHERE username = ?", (username,)).rowcount > 0
+
+    def get(self, username: str) -> Optional[WatchlistEntry]:
+        row = self.conn.execute(
+            "SELECT username, added_at, interval_seconds, next_check_at, last_checked_at, note, "
+            "last_evaluation, last_activity FROM watchlist WHERE username = ?",
+            (username,),
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def entries(self) -> List[WatchlistEntry]:
+        rows = self.conn.execute(
+            "SELECT username, added_at, interval_seconds, next_check_at, last_checked_at, note, "
+            "last_evaluation, last_activity FROM watchlist ORDER BY username"
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _entry(row) -> WatchlistEntry:
+        return WatchlistEntry(
+            username=row[0],
+            added_at=_to_datetime(row[1]),
+            interval_seconds=row[2],
+            next_check_at=_to_datetime(row[3]),
+            last_checked_at=_to_datetime(row[4]),
+            note=row[5],
+            last_evaluation=json.loads(row[6]) if row[6] else None,
+            last_activity=json.loads(row[7]) if row[7] else None,
+        )
+
+    def claim_due(self, now: float, limit: int) -> list[tuple[str, int, Optional[dict]]]:
+        """
+        Claim up to `limit` due entries by pushing their next check out by one
+        interval; an entry claimed by another worker fails the conditional update.
+        """
+        claimed = []
+        rows = self.conn.execute(
+            "SELECT username, next_check_at, interval_seconds, fingerprint FROM watchlist "
+            "WHERE next_check_at <= ? ORDER BY next_check_at LIMIT ?",
+            (now, limit),
+        ).fetchall()
+        for username, next_check_at, interval, fingerprint in rows:
+            updated = self.conn.execute(
+                "UPDATE watchlist SET next_check_at = ? WHERE username = ? AND next_check_at = ?",
+                (now + interval, username, next_check_at),
+            ).rowcount
+            if updated:
+                claimed.append((username, interval, json.loads(fingerprint) if fingerprint else None))
+        return claimed
+
+    def save_check(self, username: str, next_check_at: float, fingerprint: Optional[dict],
+                   evaluation: Optional[dict], activity: Optional[dict]):
+        self.conn.execute(
+            "UPDATE watchlist SET next_check_at = ?, last_checked_at = ?, fingerprint = ?, "
+            "last_evaluation = COALESCE(?, last_evaluation), last_activity = COALESCE(?, last_activity) "
+            "WHERE username = ?",
+            (
+                next_check_at,
+                time.time(),
+                json.dumps(fingerprint) if fingerprint is not None else None,
+                json.dumps(evaluation) if evaluation is not None else None,
+                json.dumps(activity) if activity is not None else None,
+                username,
+            ),
+        )
+
+    def record_change(self, username: str, kind: str, details: dict):
+        self.conn.execute(
+            "INSERT INTO watchlist_changes (username, detected_at, kind, details) VALUES (?, ?, ?, ?)",
+            (username, time.time(), kind, json.dumps(details, default=str)),
+        )
+
+    def changes_since(self, since: float, username: Optional[str] = None, limit: int = 500) -> list[WatchlistChange]:
+        query = "SELECT username, detected_at, kind, details FROM watchlist_changes WHERE detected_at >= ?"
+        params = [since]
+        if username:
+            query += " AND username = ?"
+            params.append(username)
+        query += " ORDER BY detected_at LIMIT ?"
+        params.append(limit)
+        return [
+            WatchlistChange(username=row[0], detected_at=_to_datetime(row[1]), kind=row[2], details=json.loads(row[3]))
+            for row in self.conn.execute(query, params).fetchall()
+        ]
+
+
+@lru_cache()
+def get_watchlist_store() -> WatchlistStore:
+    return WatchlistStore(settings.WATCHLIST_DB_PATH or os.path.join(settings.DATA_DIR, "watchlist.sqlite3"))
+
+
+def build_fingerprint(profile, posts) -> dict:
+    """
+    Summarize what the change detector compares: profile fields and posting pattern.
+    """
+    batch = PostBatch.from_posts(posts)
+    stats = compute_activity_stats(batch)
+    posts_per_day = 0.0
+    if len(batch) > 1:
+        span_days = (max(batch.timestamps) - min(batch.timestamps)) / SECONDS_PER_DAY
+        posts_per_day = len(batch) / span_days if span_days > 0 else float(len(batch))
+    return {
+        "bio_hash": hashlib.sha1(profile.bio.encode("utf-8")).hexdigest(),
+        "follower_count": profile.follower_count,
+        "following_count": profile.following_count,
+        "statuses_count": profile.statuses_count,
+        "posting_frequency": stats["posting_frequency"],
+        "posts_per_day": round(posts_per_day, 3),
+        "avg_engagement": round(stats["avg_favorites"] + stats["avg_reblogs"], 3),
+    }
+
+
+def _keep_profile(previous: Optional[dict], current: dict) -> Optional[dict]:
+    """
+    The current fingerprint with the profile fields of the previous one, so the
+    next check sees the profile change again. No previous fingerprint means the
+    whole baseline is taken again.
+    """
+    if previous is None:
+        return None
+    return dict(current, **{field: previous[field] for field in PROFILE_FIELDS})
+
+
+def _relative_change(old: float, new: float) -> float:
+    return abs(new - old) / max(abs(old), 1.0)
+
+
+def detect_changes(previous: Optional[dict], current: dict) -> dict:
+    """
+    Compare two fingerprints. Returns {"profile": {...}, "activity": {...}}
+    with the fields that moved past their thresholds; empty dicts mean no change.
+    """
+    if previous is None:
+        return {"profile": {"baseline": True}, "activity": {"baseline": True}}
+    profile, activity = {}, {}
+    if previous["bio_hash"] != current["bio_hash"]:
+        profile["bio"] = "changed"
+    for field in PROFILE_COUNT_FIELDS:
+        if _relative_change(previous[field], current[field]) >= settings.WATCHLIST_COUNT_CHANGE_THRESHOLD:
+            profile[field] = [previous[field], current[field]]
+    if previous["posting_frequency"] != current["posting_frequency"]:
+        activity["posting_frequency"] = [previous["posting_frequency"], current["posting_frequency"]]
+    if _relative_change(previous["posts_per_day"], current["posts_per_day"]) >= settings.WATCHLIST_COUNT_CHANGE_THRESHOLD:
+        activity["posts_per_day"] = [previous["posts_per_day"], current["posts_per_day"]]
+    if _relative_change(previous["avg_engagement"], current["avg_engagement"]) >= settings.WATCHLIST_ENGAGEMENT_CHANGE_THRESHOLD:
+        activity["avg_engagement"] = [previous["avg_engagement"], current["avg_engagement"]]
+    return {"profile": profile, "activity": activity}
+
+
+def _next_check(interval: int) -> float:
+    jitter = settings.WATCHLIST_JITTER
+    return time.time() + interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def _check_spacing() -> float:
+    # WATCHLIST_JITTER is a fraction, so it scales the poll period: with the defaults checks
+    # due together are up to 3s apart, and a batch of 20 spreads over about one period
+    return random.uniform(0, settings.WATCHLIST_POLL_SECONDS * settings.WATCHLIST_JITTER)
+
+
+async def refresh_account(username: str, interval: int, previous: Optional[dict]) -> dict:
+    """
+    Fetch one watched account, detect changes and re-run analysis only where needed.
+    """
+    store = get_watchlist_store()
+    profile = await mastodon_service.get_user_profile(username)
+    posts = await mastodon_service.get_recent_posts(username, settings.WATCHLIST_POST_LIMIT)
+    fingerprint = build_fingerprint(profile, posts)
+    changes = detect_changes(previous, fingerprint)
+
+    evaluation = activity = None
+    if changes["profile"]:
+        try:
+            evaluation = model_to_dict(await evaluate_user_profile(profile))
+        except Exception as e:
+            logging.error(f"Watchlist evaluation failed for {username}, retrying on the next check: {e}")
+            fingerprint = _keep_profile(previous, fingerprint)
+        store.record_change(username, "profile", {"fields": changes["profile"], "evaluation": evaluation})
+    if changes["activity"]:
+        activity = model_to_dict(await analyze_user_activity(UserActivityIn(username=username, recent_posts=posts)))
+        store.record_change(username, "activity", {"fields": changes["activity"], "activity": activity})
+    store.save_check(username, _next_check(interval), fingerprint, evaluation, activity)
+    return changes
+
+
+async def _wait_for_rate_limit(username: str):
+    # Accounts on another configured instance count against that instance's limit.
+    instance = instance_for_account(username)
+    remaining = instance.ratelimit_remaining
+    reset = instance.ratelimit_reset
+    if remaining is not None and reset and remaining < settings.WATCHLIST_RATELIMIT_RESERVE:
+        delay = max(0.0, float(reset) - time.time())
+        logging.info(
+            f"Watchlist pausing {delay:.0f}s for the {instance.name} instance's rate limit ({remaining} requests left)"
+        )
+        await asyncio.sleep(delay)
+
+
+async def run_due_checks(limit: int = 20) -> int:
+    store = get_watchlist_store()
+    checked = 0
+    for username, interval, previous in store.claim_due(time.time(), limit):
+        try:
+            await _wait_for_rate_limit(username)
+            await refresh_account(username, interval, previous)
+            checked += 1
+        except Exception as e:
+            logging.error(f"Watchlist check failed for {username}: {e}")
+        # Spread requests out instead of bursting through the batch.
+        await asyncio.sleep(_check_spacing())
+    return checked
+
+
+def add_account(username: str, interval_minutes: Optional[int] = None, note: Optional[str] = None) -> WatchlistEntry:
+    interval = interval_minutes * 60 if interval_minutes else settings.WATCHLIST_DEFAULT_INTERVAL
+    return get_watchlist_store().add(normalize_mastodon_username(username), interval, note)
+
+
+def remove_account(username: str) -> bool:
+    return get_watchlist_store().remove(normalize_mastodon_username(username))
+
+
+def list_accounts() -> list[WatchlistEntry]:
+    return get_watchlist_store().entries()
+
+
+def changes_since(since: datetime, username: Optional[str] = None) -> list[WatchlistChange]:
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return get_watchlist_store().changes_since(
+        since.timestamp(), normalize_mastodon_username(username) if username else None
+    )
+
+
+_scheduler_task = None
+
+
+async def _scheduler_loop():
+    while True:
+        try:
+            await run_due_checks()
+        except Exception as e:
+            logging.error(f"Watchlist scheduler error: {e}")
+        await asyncio.sleep(settings.WATCHLIST_POLL_SECONDS)
+
+
+async def start_scheduler():
+    global _scheduler_task
+    if settings.WATCHLIST_ENABLED and _scheduler_task is None:
+        _scheduler_task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_scheduler():
+    global _scheduler_task
+    if _scheduler_task is not None:
+        _scheduler_task.cancel()
+        try:
+            await _scheduler_task
+        except asyncio.CancelledError:
+            pass
+        _scheduler_task = None
+
+
+register_background_service("watchlist", start_scheduler, stop_scheduler)
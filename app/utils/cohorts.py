@@ -0,0 +1,185 @@
+import hashlib
+import ipaddress
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, NamedTuple
+
+# numpy is imported inside the functions that use it, so importing this module
+# stays cheap; only cohort queries pay for it.
+if TYPE_CHECKING:
+    import numpy as np
+
+SECONDS_PER_HOUR = 3600
+SIMHASH_BITS = 64
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class CohortBatch(NamedTuple):
+    """
+    Columnar view of admin account records for cohort statistics.
+    Plain lists keep the batch cheap to pickle for the process pool.
+    """
+    usernames: List[str]
+    created_at: List[float]
+    email_domains: List[str]
+    ips: List[str]
+    bios: List[str]
+    pending: List[bool]
+
+    @classmethod
+    def from_accounts(cls, accounts: List[dict]) -> "CohortBatch":
+        return cls(
+            usernames=[a["username"] for a in accounts],
+            created_at=[a["created_at"] for a in accounts],
+            email_domains=[a.get("email_domain") or "" for a in accounts],
+            ips=[a.get("ip") or "" for a in accounts],
+            bios=[a.get("bio") or "" for a in accounts],
+            pending=[bool(a.get("pending")) for a in accounts],
+        )
+
+    def __len__(self) -> int:
+        return len(self.usernames)
+
+
+def ip_range(ip: str) -> str:
+    """
+    Collapse an address to the network it most likely shares with neighbours:
+    /24 for IPv4, /48 for IPv6. Returns "" for missing or invalid addresses.
+    """
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ""
+    prefix = 24 if address.version == 4 else 48
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+@lru_cache()
+def _popcount_table() -> "np.ndarray":
+    # Set bits per byte value, used to popcount XORed simhashes a byte at a time
+    import numpy as np
+
+    return np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def simhashes(texts: List[str]) -> "np.ndarray":
+    """
+    64-bit simhash per text over its word tokens. Empty texts hash to 0.
+    """
+    import numpy as np
+
+    shifts = np.arange(SIMHASH_BITS, dtype=np.uint64)
+    out = np.zeros(len(texts), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall(_TAG_RE.sub(" ", text).lower())
+        if not tokens:
+            continue
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little") for t in tokens],
+            dtype=np.uint64,
+        )
+        bits = ((hashes[:, None] >> shifts) & np.uint64(1)).astype(np.int32)
+        weights = (2 * bits - 1).sum(axis=0)
+        out[i] = np.sum(np.uint64(1) << shifts[weights > 0], dtype=np.uint64)
+    return out
+
+
+def hamming_to_all(hashes: "np.ndarray", index: int) -> "np.ndarray":
+    import numpy as np
+
+    xored = np.bitwise_xor(hashes, hashes[index])
+    return _popcount_table()[xored.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def cluster_simhashes(hashes: "np.ndarray", max_distance: int) -> List[List[int]]:
+    """
+    Group indices whose simhashes are within `max_distance` bits of each other
+    (single linkage). Zero hashes (empty bios) are left out; singletons are dropped.
+    """
+    import numpy as np
+
+    parent = np.arange(len(hashes))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    candidates = np.flatnonzero(hashes)
+    subset = hashes[candidates]
+    for pos in range(len(subset)):
+        near = candidates[pos + 1:][hamming_to_all(subset, pos)[pos + 1:] <= max_distance]
+        root = find(candidates[pos])
+        for other in near:
+            parent[find(other)] = root
+
+    groups = {}
+    for i in candidates:
+        groups.setdefault(find(i), []).append(int(i))
+    return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+
+def _shared_values(values: List[str], usernames: List[str], min_count: int, top: int) -> List[dict]:
+    import numpy as np
+
+    column = np.array(values, dtype=object)
+    present = column != ""
+    if not present.any():
+        return []
+    unique, inverse, counts = np.unique(column[present], return_inverse=True, return_counts=True)
+    names = np.array(usernames, dtype=object)[present]
+    order = np.argsort(-counts, kind="stable")
+    return [
+        {"value": unique[k], "count": int(counts[k]), "usernames": sorted(names[inverse == k])[:20]}
+        for k in order[:top]
+        if counts[k] >= min_count
+    ]
+
+
+def compute_cohort_stats(batch: CohortBatch, burst_factor: float = 3.0, bio_distance: int = 3, top: int = 10) -> dict:
+    """
+    Signup rate per hour (with burst hours flagged), shared email domains and
+    IP ranges, and clusters of near-duplicate bios for a batch of accounts.
+    Pure function with no I/O so it can run inline or in a worker process.
+    """
+    import numpy as np
+
+    count = len(batch)
+    if count == 0:
+        return {"account_count": 0, "pending_count": 0, "signups_per_hour": [], "burst_hours": [],
+                "email_domains": [], "ip_ranges": [], "bio_clusters": []}
+
+    hours = np.floor(np.asarray(batch.created_at, dtype=np.float64) / SECONDS_PER_HOUR).astype(np.int64)
+    first, last = hours.min(), hours.max()
+    per_hour = np.bincount(hours - first, minlength=int(last - first) + 1)
+    # A burst is an hour well above the typical rate; median + MAD is robust to the bursts themselves.
+    median = float(np.median(per_hour))
+    mad = float(np.median(np.abs(per_hour - median))) or 1.0
+    threshold = max(median + burst_factor * mad, 2 * median, 3)
+    buckets = [
+        {"hour": int(first + i) * SECONDS_PER_HOUR, "count": int(n), "burst": bool(n >= threshold)}
+        for i, n in enumerate(per_hour)
+        if n
+    ]
+
+    ranges = [ip_range(ip) if ip else "" for ip in batch.ips]
+    clusters = cluster_simhashes(simhashes(batch.bios), bio_distance)
+
+    return {
+        "account_count": count,
+        "pending_count": int(np.count_nonzero(batch.pending)),
+        "signups_per_hour": buckets,
+        "burst_hours": [b["hour"] for b in buckets if b["burst"]],
+        "email_domains": _shared_values(batch.email_domains, batch.usernames, 2, top),
+        "ip_ranges": _shared_values(ranges, batch.usernames, 2, top),
+        "bio_clusters": [
+            {
+                "size": len(group),
+                "usernames": sorted(batch.usernames[i] for i in group)[:20],
+                "sample_bio": batch.bios[group[0]][:200],
+            }
+            for group in clusters[:top]
+        ],
+    }
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+MENTION, REPLY, BOOST = 0, 1, 2
+KINDS = ("mentions", "replies", "boosts")
+
+
+class _Bucket:
+    """
+    Edges observed in one time bucket, as adjacency lists keyed by interned
+    account ids: incoming[target][source] = [mentions, replies, boosts].
+    """
+    __slots__ = ("incoming", "status_ids", "edges")
+
+    def __init__(self):
+        self.incoming: Dict[int, Dict[int, List[int]]] = {}
+        self.status_ids: List[str] = []
+        self.edges = 0
+
+
+class InteractionGraph:
+    """
+    Time-bucketed interaction graph (mentions, replies, boosts) between accounts.
+
+    Edges are grouped into fixed-width time buckets, so expiry drops whole
+    buckets and a query over the last N hours only touches the buckets in that
+    window. Account names are interned to ints to keep the adjacency lists small.
+    Memory is bounded by `retention_seconds` and `max_edges`; when the edge
+    budget is exceeded the oldest buckets are dropped first.
+    """
+
+    def __init__(self, bucket_seconds: int = 3600, retention_seconds: int = 7 * 86400, max_edges: int = 1_000_000):
+        self.bucket_seconds = bucket_seconds
+        self.retention_seconds = retention_seconds
+        self.max_edges = max_edges
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._buckets: "OrderedDict[int, _Bucket]" = OrderedDict()
+        self._seen: Dict[str, int] = {}
+        self._edges = 0
+
+    def _intern(self, name: str) -> int:
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return node
+
+    def _bucket(self, start: int) -> _Bucket:
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            # Statuses usually arrive roughly in time order; keep buckets sorted regardless.
+            out_of_order = bool(self._buckets) and start < next(reversed(self._buckets))
+            bucket = self._buckets[start] = _Bucket()
+            if out_of_order:
+                self._buckets = OrderedDict(sorted(self._buckets.items()))
+        return bucket
+
+    def add_interactions(self, status_id: str, source: str, targets: List[Tuple[str, int]], timestamp: float, now: float) -> bool:
+        """
+        Record the edges of one status. Returns False for statuses already seen
+        or older than the retention window.
+        """
+        if status_id in self._seen or timestamp < now - self.retention_seconds or not targets:
+            return False
+        start = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        bucket = self._bucket(start)
+        self._seen[status_id] = start
+        bucket.status_ids.append(status_id)
+        src = self._intern(source)
+        for target, kind in targets:
+            if target == source:
+                continue
+            sources = bucket.incoming.setdefault(self._intern(target), {})
+            counts = sources.get(src)
+            if counts is None:
+                counts = sources[src] = [0, 0, 0]
+                bucket.edges += 1
+                self._edges += 1
+            counts[kind] += 1
+        self.expire(now)
+        return True
+
+    def expire(self, now: float):
+        cutoff = now - self.retention_seconds
+        dropped = False
+        while self._buckets:
+            start, bucket = next(iter(self._buckets.items()))
+            if start + self.bucket_seconds > cutoff and self._edges <= self.max_edges:
+                break
+            self._buckets.popitem(last=False)
+            self._edges -= bucket.edges
+            for status_id in bucket.status_ids:
+                self._seen.pop(status_id, None)
+            dropped = True
+        # Names of expired accounts are only reclaimed once they dominate the table.
+        if dropped and len(self._names) > 1024 and len(self._names) > 2 * self._live_nodes():
+            self._compact()
+
+    def _live_nodes(self) -> int:
+        live = set()
+        for bucket in self._buckets.values():
+            live.update(bucket.incoming)
+            for sources in bucket.incoming.values():
+                live.update(sources)
+        return len(live)
+
+    def _compact(self):
+        names, self._ids, self._names = self._names, {}, []
+        for bucket in self._buckets.values():
+            bucket.incoming = {
+                self._intern(names[dst]): {self._intern(names[src]): counts for src, counts in sources.items()}
+                for dst, sources in bucket.incoming.items()
+            }
+
+    def _window(self, since: float):
+        for start, bucket in reversed(self._buckets.items()):
+            if start + self.bucket_seconds <= since:
+                break
+            yield bucket
+
+    def pile_on(self, target: str, since: float) -> List[dict]:
+        """
+        Accounts that interacted with `target` since a timestamp, most active first.
+        """
+        node = self._ids.get(target)
+        if node is None:
+            return []
+        totals: Dict[int, List[int]] = {}
+        buckets: Dict[int, int] = {}
+        for bucket in self._window(since):
+            for src, counts in bucket.incoming.get(node, {}).items():
+                total = totals.setdefault(src, [0, 0, 0])
+                for kind in range(3):
+                    total[kind] += counts[kind]
+                buckets[src] = buckets.get(src, 0) + 1
+        rows = [
+            dict(account=self._names[src], total=sum(counts), active_buckets=buckets[src], **dict(zip(KINDS, counts)))
+            for src, counts in totals.items()
+        ]
+        return sorted(rows, key=lambda r: (-r["total"], r["account"]))
+
+    def co_mentioners(self, since: float, min_shared: int = 2, max_target_fanin: int = 50,
+                      target: Optional[str] = None) -> List[dict]:
+        """
+        Groups of accounts that mention or reply to the same targets. Pairs of
+        sources sharing at least `min_shared` targets are linked and connected
+        groups are returned. Targets with more than `max_target_fanin` sources
+        (popular accounts everyone talks to) are ignored. With `target`, only
+        sources that interacted with that account are considered.
+        """
+        sources_by_target: Dict[int, set] = {}
+        for bucket in self._window(since):
+            for dst, sources in bucket.incoming.items():
+                direct = {src for src, counts in sources.items() if counts[MENTION] or counts[REPLY]}
+                if direct:
+                    sources_by_target.setdefault(dst, set()).update(direct)
+        if target is not None:
+            node = self._ids.get(target)
+            focus = sources_by_target.get(node, set()) if node is not None else set()
+            sources_by_target = {dst: srcs & focus for dst, srcs in sources_by_target.items()}
+
+        shared: Dict[Tuple[int, int], List[int]] = {}
+        for dst, srcs in sources_by_target.items():
+            if 2 <= len(srcs) <= max_target_fanin:
+                for pair in combinations(sorted(srcs), 2):
+                    shared.setdefault(pair, []).append(dst)
+
+        parent: Dict[int, int] = {}
+
+        def find(node):
+            while parent.setdefault(node, node) != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        linked = {pair: targets for pair, targets in shared.items() if len(targets) >= min_shared}
+        for a, b in linked:
+            parent[find(a)] = find(b)
+        groups: Dict[int, dict] = {}
+        for (a, b), targets in linked.items():
+            group = groups.setdefault(find(a), {"accounts": set(), "targets": set()})
+            group["accounts"].update((a, b))
+            group["targets"].update(targets)
+        result = [
+            {
+                "accounts": sorted(self._names[n] for n in group["accounts"]),
+                "shared_targets": sorted(self._names[n] for n in group["targets"]),
+            }
+            for group in groups.values()
+        ]
+        return sorted(result, key=lambda g: (-len(g["accounts"]), -len(g["shared_targets"])))
+
+    def stats(self) -> dict:
+        return {
+            "accounts": len(self._names),
+            "edges": self._edges,
+            "statuses": len(self._seen),
+            "buckets": len(self._buckets),
+        }
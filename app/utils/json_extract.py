@@ -0,0 +1,103 @@
+import json
+import re
+from typing import Literal, get_args, get_origin
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def _balanced_object(text: str) -> str:
+    """
+    The first {...} block in `text`, matching braces outside of strings.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object found")
+    depth, in_string, quote, escaped = 0, False, "", False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                in_string = False
+        elif ch in "\"'":
+            in_string, quote = True, ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    # Unterminated object, usually a truncated completion: close it and let the parser decide.
+    return text[start:] + "}" * depth
+
+
+def _single_to_double_quotes(text: str) -> str:
+    out, in_string, quote = [], False, ""
+    for i, ch in enumerate(text):
+        if in_string:
+            if ch == quote and text[i - 1] != "\\":
+                in_string = False
+                ch = '"'
+            elif ch == '"' and quote == "'":
+                ch = '\\"'
+        elif ch in "\"'":
+            in_string, quote = True, ch
+            ch = '"'
+        out.append(ch)
+    return "".join(out)
+
+
+def _python_literals(text: str) -> str:
+    return re.sub(r"\b(True|False|None)\b", lambda m: _PY_LITERALS[m.group(1)], text)
+
+
+def extract_json_object(content: str) -> tuple[dict, bool]:
+    """
+    Parse a JSON object out of an LLM completion. Returns (object, repaired),
+    where `repaired` is True when the text needed fixing: markdown fences or
+    surrounding prose, smart or single quotes, trailing commas, Python
+    True/False/None. Raises ValueError when no object can be recovered.
+    """
+    try:
+        value = json.loads(content)
+        if isinstance(value, dict):
+            return value, False
+    except (json.JSONDecodeError, TypeError):
+        pass
+    if not content:
+        raise ValueError("Empty completion")
+    fenced = _FENCE_RE.search(content)
+    text = _balanced_object(fenced.group(1) if fenced else content).translate(_SMART_QUOTES)
+    candidates = [text, _TRAILING_COMMA_RE.sub(r"\1", text)]
+    candidates.append(_python_literals(_single_to_double_quotes(candidates[-1])))
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value, True
+    raise ValueError("Could not repair JSON object")
+
+
+def normalize_literals(model, data: dict) -> dict:
+    """
+    Map near-miss values of Literal fields onto the allowed ones: case,
+    surrounding whitespace and spaces or hyphens for underscores
+    ("Flag Immediately" -> "flag_immediately").
+    """
+    for name, field in model.model_fields.items():
+        value = data.get(name)
+        if get_origin(field.annotation) is not Literal or not isinstance(value, str):
+            continue
+        allowed = get_args(field.annotation)
+        candidate = re.sub(r"[\s-]+", "_", value.strip().lower())
+        if value not in allowed and candidate in allowed:
+            data[name] = candidate
+    return data
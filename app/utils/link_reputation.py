@@ -0,0 +1,196 @@
+"""
+URL extraction and a compact domain blocklist index.
+
+The index stores each blocklisted domain as a 64-bit hash. A Bloom filter over
+those hashes stays in memory (about bits_per_domain / 8 bytes per
+domain) and answers most lookups on its own, since most linked domains are not
+blocklisted. Only Bloom hits are confirmed against the exact set: the sorted
+hashes, memory-mapped from the index file, searched by bisection. Millions of
+domains therefore cost a few megabytes of resident memory and no false
+positives beyond 64-bit hash collisions. Linked domains repeat heavily, so
+`match` also remembers its recent answers.
+"""
+
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_left
+from hashlib import blake2b
+from html import unescape
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+_MENTION_LINK = re.compile(r'<a\s[^>]*class="[^"]*\b(?:mention|hashtag)\b[^"]*"[^>]*>.*?</a>', re.IGNORECASE | re.DOTALL)
+_URL = re.compile(r'https?://[^\s<>"\']+', re.IGNORECASE)
+_HOSTNAME = re.compile(r"^[a-z0-9.-]+$")
+
+_MAGIC = b"NLBI"
+_VERSION = 1
+# magic, version, probes, bloom bytes, domain count, source signature
+_HEADER = struct.Struct("<4sHHQQ16s")
+_HEADER_SIZE = 64
+_MATCH_MEMO_SIZE = 65536
+
+
+def normalize_domain(domain: str) -> Optional[str]:
+    """
+    Lowercase ASCII form of a hostname without "www." or a trailing dot, or
+    None when it is not a plausible hostname.
+    """
+    domain = domain.strip().strip(".").lower()
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if domain.startswith("www."):
+        domain = domain[4:]
+    if "." not in domain or not _HOSTNAME.match(domain):
+        return None
+    return domain
+
+
+def url_domain(url: str) -> Optional[str]:
+    try:
+        hostname = urlsplit(url).hostname
+    except ValueError:
+        return None
+    return normalize_domain(hostname) if hostname else None
+
+
+def extract_urls(text: str) -> List[str]:
+    """
+    Links in plain text or status HTML, without mention and hashtag links.
+    """
+    if not text:
+        return []
+    text = unescape(_MENTION_LINK.sub(" ", text))
+    # The same link usually appears both as href and as anchor text
+    return list(dict.fromkeys(url.rstrip(".,;:!?)]}") for url in _URL.findall(text)))
+
+
+def extract_link_domains(text: str) -> List[str]:
+    return list(dict.fromkeys(d for d in map(url_domain, extract_urls(text)) if d))
+
+
+def domain_suffixes(domain: str) -> List[str]:
+    """
+    The domain and its parents down to two labels: a.b.example.com,
+    b.example.com, example.com. A blocklisted domain covers its subdomains.
+    """
+    labels = domain.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)]
+
+
+def hash_domain(domain: str) -> int:
+    return int.from_bytes(blake2b(domain.encode(), digest_size=8).digest(), "little")
+
+
+def parse_blocklist(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Domains from plain lists, hosts files ("0.0.0.0 example.com") and
+    adblock-style rules ("||example.com^"). Comments and other rules are skipped.
+    """
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith("!"):
+            continue
+        if line.startswith("||"):
+            line = line[2:].split("^", 1)[0]
+        else:
+            fields = line.split()
+            line = fields[-1] if len(fields) <= 2 else ""
+        if "/" in line or "*" in line:
+            continue
+        domain = normalize_domain(line)
+        if domain is not None and domain not in ("localhost", "localhost.localdomain"):
+            yield domain
+
+
+class DomainBlocklist:
+    """
+    Read-only blocklist backed by an index file written by `build`.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.signature = b""
+        self._probes = 0
+        self._mask = 0
+        self._bloom = b""
+        self._hashes: memoryview = memoryview(b"").cast("Q")
+        self._matches: Dict[str, Optional[str]] = {}
+        if path is None:
+            return
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, probes, bloom_bytes, count, signature = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a link blocklist index")
+        self.signature = signature
+        self._probes = probes
+        self._mask = bloom_bytes * 8 - 1
+        # The filter is the only part that is read on every lookup; keep it resident.
+        self._bloom = bytes(data[_HEADER_SIZE:_HEADER_SIZE + bloom_bytes])
+        start = _HEADER_SIZE + bloom_bytes
+        self._hashes = memoryview(data)[start:start + count * 8].cast("Q")
+
+    @classmethod
+    def build(cls, domains: Iterable[str], path: str, signature: bytes = b"", bits_per_domain: int = 10) -> "DomainBlocklist":
+        """
+        Write an index of `domains` to `path` (atomically) and open it.
+        """
+        import numpy as np
+        from array import array
+
+        hashes = array("Q", map(hash_domain, domains))
+        hashes = np.unique(np.frombuffer(hashes, dtype=np.uint64))
+        count = len(hashes)
+        bits = 64
+        while bits < count * bits_per_domain:
+            bits *= 2
+        # Probes for the requested density; rounding the size up only lowers the false-positive rate
+        probes = max(1, min(16, round(bits_per_domain * 0.6931)))
+        first, step = hashes & np.uint64(0xFFFFFFFF), (hashes >> np.uint64(32)) | np.uint64(1)
+        bloom = np.zeros(bits, dtype=bool)
+        for i in range(probes):
+            bloom[(first + np.uint64(i) * step) & np.uint64(bits - 1)] = True
+        header = _HEADER.pack(_MAGIC, _VERSION, probes, bits // 8, count, signature[:16].ljust(16, b"\0"))
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(header.ljust(_HEADER_SIZE, b"\0"))
+            f.write(np.packbits(bloom, bitorder="little").tobytes())
+            f.write(hashes.astype("<u8").tobytes())
+        os.replace(tmp, path)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, domain: str) -> bool:
+        if not self._probes:
+            return False
+        h = hash_domain(domain)
+        first, step, mask, bloom = h & 0xFFFFFFFF, (h >> 32) | 1, self._mask, self._bloom
+        for i in range(self._probes):
+            bit = (first + i * step) & mask
+            if not bloom[bit >> 3] >> (bit & 7) & 1:
+                return False
+        hashes = self._hashes
+        i = bisect_left(hashes, h)
+        return i < len(hashes) and hashes[i] == h
+
+    def match(self, domain: str) -> Optional[str]:
+        """
+        The blocklisted entry covering `domain` (itself or a parent), if any.
+        """
+        try:
+            return self._matches[domain]
+        except KeyError:
+            pass
+        match = next((suffix for suffix in domain_suffixes(domain) if suffix in self), None)
+        if len(self._matches) >= _MATCH_MEMO_SIZE:
+            self._matches.clear()
+        self._matches[domain] = match
+        return match
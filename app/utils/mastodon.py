@@ -1,3 +1,7 @@
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlsplit
+
 def normalize_mastodon_username(username: str) -> str:
     """
     Normalize a Mastodon username by removing a leading '@' if present.
@@ -8,31 +12,46 @@ def normalize_mastodon_username(username: str) -> str:
         return username[1:]
     return username
 
+@lru_cache(maxsize=64)
+def server_domain(api_base: str) -> str:
+    """
+    The domain of an API base URL, e.g. 'https://stranger.social/' -> 'stranger.social'.
+    Cached: it runs for every username handled.
+    """
+    parts = urlsplit(api_base if "://" in api_base else f"https://{api_base}")
+    return (parts.netloc or parts.path).rstrip("/").lower()
+
 def get_local_server_domain() -> str:
     """
     Extract the domain from the Mastodon API base URL in settings.
     Returns the domain as a string, e.g., 'stranger.social'.
     """
     from app.core.config import settings
-    import re
-    api_base = settings.MASTODON_API_BASE or "https://stranger.social"
-    # Remove protocol
-    domain = re.sub(r"^https?://", "", api_base)
-    # Remove trailing slash if present
-    domain = domain.rstrip("/")
-    return domain
+    return server_domain(settings.MASTODON_API_BASE or "https://stranger.social")
 
-def extract_local_username(username: str) -> str:
+def extract_local_username(username: str, domain: Optional[str] = None) -> str:
     """
-    If the username is in the form 'username@localdomain', and localdomain matches the local server,
-    return just 'username'. Otherwise, return the username unchanged.
+    If the username is in the form 'username@localdomain', and localdomain matches the local server
+    (or `domain`), return just 'username'. Otherwise, return the username unchanged.
     """
-    domain = get_local_server_domain()
+    domain = domain or get_local_server_domain()
     if "@" in username:
         parts = username.split("@")
         # Handles both '@username@domain' and 'username@domain'
-        if len(parts) == 3 and parts[2] == domain:
+        if len(parts) == 3 and parts[2].lower() == domain:
             return parts[1]
-        elif len(parts) == 2 and parts[1] == domain:
+        elif len(parts) == 2 and parts[1].lower() == domain:
             return parts[0]
-    return username 
\ No newline at end of file
+    return username 
+
+def canonical_acct(acct: str, domain: Optional[str] = None) -> str:
+    """
+    Key for comparing accounts: lowercase, no leading '@', and no domain for
+    local accounts, matching how the API reports 'acct' for local users.
+    `domain` is the instance that reported `acct`, when it is not the local one:
+    its bare usernames are qualified with it.
+    """
+    acct = normalize_mastodon_username(acct)
+    if domain and "@" not in acct:
+        acct = f"{acct}@{domain}"
+    return extract_local_username(acct).lower()
@@ -0,0 +1,51 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to the standard library
+    orjson = None
+
+
+def dumps(data) -> str:
+    """
+    Serialize to compact JSON, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+def model_to_dict(model) -> dict:
+    """
+    JSON-compatible dict of a pydantic model (datetimes become ISO strings).
+    """
+    return model.model_dump(mode="json")
+
+
+def _field_tree(fields) -> dict:
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _apply_projection(value, tree: dict):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_apply_projection(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _apply_projection(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def project(data: dict, fields) -> dict:
+    """
+    Keep only the requested fields. Dotted names select nested keys and apply
+    to every element of a list, e.g. 'posts.created_at'; unknown names are ignored.
+    """
+    if not fields:
+        return data
+    return _apply_projection(data, _field_tree(fields))
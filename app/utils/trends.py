@@ -0,0 +1,271 @@
+"""
+Streaming trend detection in fixed memory.
+
+Term counts go into a ring of time buckets, each a count-min sketch (depth
+rows of width counters; a term's count is the minimum of its counters, which
+never undercounts and overcounts by a small fraction of the bucket total).
+Sketches cannot list their keys, so every bucket also keeps a Space-Saving
+summary of its `top_k` most frequent terms; those are the candidates a trend
+query scores. A term is surging when its count over the recent buckets is
+well above its rate over the older ones. Memory is
+buckets * (depth * width * 4 bytes + top_k entries) whatever the volume.
+"""
+
+import heapq
+import re
+from hashlib import blake2b
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.link_reputation import extract_urls
+
+# numpy is imported inside the functions that use it, so importing this module
+# at server startup stays cheap; it loads with the first sketch.
+if TYPE_CHECKING:
+    import numpy as np
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_MENTION_OR_TAG_LINK = re.compile(r'<a\s[^>]*class="[^"]*\b(?:mention|hashtag)\b[^"]*"[^>]*>.*?</a>', re.IGNORECASE | re.DOTALL)
+_HASHTAG_RE = re.compile(r"(?<![\w/])#(\w{2,})", re.UNICODE)
+_WORD_RE = re.compile(r"[^\W\d_][\w'-]*[^\W_]", re.UNICODE)
+
+# Common words that would otherwise crowd out real terms
+STOPWORDS = frozenset("""
+about above after again against also because been before being below between both could does doing down during
+each from further have having here hers herself himself into itself just like more most myself never only other
+ours ourselves over same should some such than that their theirs them themselves then there these they this those
+through under until very were what when where which while whom will with would your yours yourself yourselves
+really still even much many want know think going make made said says today year years people thing things
+""".split())
+
+
+def status_terms(content: Optional[str], tags: Iterable[str] = (), min_length: int = 4) -> Set[str]:
+    """
+    Distinct terms of one status: hashtags as "#tag" (from the status's tag
+    list and its text) and other words as plain lowercase keywords. Links,
+    mentions and stopwords are left out.
+    """
+    terms = {f"#{tag.lower()}" for tag in tags if tag}
+    if not content:
+        return terms
+    # Tags removed without a gap so "#<span>tag</span>" reads as "#tag"
+    terms.update(f"#{tag.lower()}" for tag in _HASHTAG_RE.findall(_TAG_RE.sub("", content)))
+    text = _MENTION_OR_TAG_LINK.sub(" ", content)
+    text = _TAG_RE.sub(" ", text)
+    for url in extract_urls(text):
+        text = text.replace(url, " ")
+    text = _HASHTAG_RE.sub(" ", text)
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) >= min_length and word not in STOPWORDS:
+            terms.add(word)
+    return terms
+
+
+def _term_hashes(terms: List[str]) -> "np.ndarray":
+    import numpy as np
+
+    return np.array(
+        [int.from_bytes(blake2b(term.encode(), digest_size=8).digest(), "little") for term in terms], dtype=np.uint64
+    )
+
+
+class TrendSketch:
+    """
+    Sliding window of count-min sketches and Space-Saving summaries, one per
+    `bucket_seconds` bucket, `buckets` of them. Counts are bucketed by the
+    time the caller gives (the status's creation time), so a late batch of
+    old statuses lands in the bucket it belongs to, or nowhere when it is
+    older than the window.
+    """
+
+    def __init__(self, bucket_seconds: int = 600, buckets: int = 144, width: int = 2048, depth: int = 4, top_k: int = 200):
+        import numpy as np
+
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self._tables = np.zeros((buckets, depth, width), dtype=np.uint32)
+        # Absolute bucket number held in each slot; -1 when unused
+        self._slot_bucket = np.full(buckets, -1, dtype=np.int64)
+        # Documents (statuses) counted per slot
+        self._documents = np.zeros(buckets, dtype=np.int64)
+        # Per slot: a Space-Saving summary of its most frequent terms
+        self._top: List[SpaceSaving] = [SpaceSaving(top_k) for _ in range(buckets)]
+        self._rows = np.arange(depth, dtype=np.uint64)
+        self.first_bucket: Optional[int] = None
+
+    def _columns(self, hashes: "np.ndarray") -> "np.ndarray":
+        # Double hashing: column of row i is h1 + i * h2, one 64-bit hash per term
+        import numpy as np
+
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        return ((h1[None, :] + self._rows[:, None] * h2[None, :]) % np.uint64(self.width)).astype(np.intp)
+
+    def _slot(self, bucket: int) -> Optional[int]:
+        slot = bucket % self.buckets
+        held = self._slot_bucket[slot]
+        if held == bucket:
+            return slot
+        if held > bucket:
+            return None
+        self._tables[slot] = 0
+        self._documents[slot] = 0
+        self._top[slot] = SpaceSaving(self.top_k)
+        self._slot_bucket[slot] = bucket
+        return slot
+
+    def add(self, terms: Dict[str, int], timestamp: float, now: float, documents: int = 1):
+        """
+        Count the `terms` (term -> occurrences) of `documents` documents
+        created at `timestamp`. Documents of the same bucket are best added
+        together: the cost is per call and per distinct term.
+        """
+        import numpy as np
+
+        if not terms:
+            return
+        bucket = int(min(timestamp, now) // self.bucket_seconds)
+        if bucket <= int(now // self.bucket_seconds) - self.buckets:
+            return
+        slot = self._slot(bucket)
+        if slot is None:
+            return
+        if self.first_bucket is None or bucket < self.first_bucket:
+            self.first_bucket = bucket
+        keys = list(terms)
+        counts = np.array([terms[key] for key in keys], dtype=np.uint32)
+        columns = self._columns(_term_hashes(keys))
+        table = self._tables[slot]
+        for row in range(self.depth):
+            np.add.at(table[row], columns[row], counts)
+        self._documents[slot] += documents
+        self._top[slot].update(terms)
+
+    def _window_slots(self, first: int, last: int) -> "np.ndarray":
+        import numpy as np
+
+        return np.nonzero((self._slot_bucket >= first) & (self._slot_bucket <= last))[0]
+
+    def estimate(self, terms: List[str], slots: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        if not len(slots) or not terms:
+            return np.zeros(len(terms), dtype=np.int64)
+        columns = self._columns(_term_hashes(terms))
+        summed = self._tables[slots].sum(axis=0, dtype=np.int64)
+        return summed[self._rows.astype(np.intp)[:, None], columns].min(axis=0)
+
+    def surging(self, now: float, recent_buckets: int, min_count: int = 5, min_ratio: float = 3.0,
+                prefix: Optional[str] = None, exclude_prefix: Optional[str] = None, limit: int = 20) -> dict:
+        """
+        Terms whose count over the last `recent_buckets` buckets is at least
+        `min_count` and `min_ratio` times what their rate over the older
+        buckets predicts. The ratio is smoothed by one so terms never seen
+        before rank by their recent count.
+        """
+        import numpy as np
+
+        current = int(now // self.bucket_seconds)
+        recent_first = current - recent_buckets + 1
+        recent_slots = self._window_slots(recent_first, current)
+        baseline_first = max(current - self.buckets + 1, self.first_bucket if self.first_bucket is not None else current)
+        baseline_slots = self._window_slots(baseline_first, recent_first - 1)
+        baseline_buckets = max(0, recent_first - baseline_first)
+        candidates = sorted({term for slot in recent_slots for term in self._top[slot].counts})
+        if prefix is not None:
+            candidates = [term for term in candidates if term.startswith(prefix)]
+        if exclude_prefix is not None:
+            candidates = [term for term in candidates if not term.startswith(exclude_prefix)]
+        recent = self.estimate(candidates, recent_slots)
+        baseline = self.estimate(candidates, baseline_slots)
+        expected = baseline / baseline_buckets * recent_buckets if baseline_buckets else np.zeros(len(candidates))
+        ratios = (recent + 1) / (expected + 1)
+        picked = np.nonzero((recent >= min_count) & (ratios >= min_ratio))[0]
+        picked = picked[np.lexsort((-recent[picked], -ratios[picked]))][:limit]
+        return {
+            "recent_buckets": recent_buckets,
+            "baseline_buckets": baseline_buckets,
+            "recent_documents": int(self._documents[recent_slots].sum()),
+            "terms": [
+                {
+                    "term": candidates[i],
+                    "recent_count": int(recent[i]),
+                    "baseline_count": int(baseline[i]),
+                    "expected_count": round(float(expected[i]), 2),
+                    "ratio": round(float(ratios[i]), 2),
+                }
+                for i in picked
+            ],
+        }
+
+    def memory_bytes(self) -> int:
+        return self._tables.nbytes + self._slot_bucket.nbytes + self._documents.nbytes
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the `capacity` most frequent terms of a stream.
+    When full, a new term replaces the least counted one and inherits its
+    count. The least counted term is found with a min-heap that is allowed
+    to go stale: counts only grow, so a popped entry whose count is behind
+    is pushed back with the current one, and the first entry that is up to
+    date is the minimum. Each update costs O(log capacity) amortized.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def update(self, terms: Dict[str, int]):
+        counts, heap = self.counts, self._heap
+        for term, count in terms.items():
+            if term in counts:
+                counts[term] += count
+                continue
+            if len(counts) < self.capacity:
+                counts[term] = count
+                heapq.heappush(heap, (count, term))
+                continue
+            while True:
+                floor, smallest = heap[0]
+                current = counts[smallest]
+                if current == floor:
+                    break
+                heapq.heapreplace(heap, (current, smallest))
+            del counts[smallest]
+            counts[term] = floor + count
+            heapq.heapreplace(heap, (floor + count, term))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+
+class SeenIds:
+    """
+    Recently seen status ids in fixed memory: two generations of hashes; when
+    the current one fills up it becomes the previous one and the old previous
+    one is dropped.
+    """
+
+    def __init__(self, capacity: int = 50000):
+        self.capacity = capacity
+        self._current: Set[int] = set()
+        self._previous: Set[int] = set()
+
+    def add(self, key: str) -> bool:
+        """
+        Remember `key`; False when it was already seen.
+        """
+        digest = hash(key)
+        if digest in self._current or digest in self._previous:
+            return False
+        if len(self._current) >= self.capacity:
+            self._previous, self._current = self._current, set()
+        self._current.add(digest)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
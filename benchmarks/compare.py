@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files produced by run_benchmark.py.
+
+Prints throughput and per-tool latency percentiles side by side and exits
+with status 1 when any p95 latency regressed by more than --threshold percent.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json --threshold 15
+"""
+
+import argparse
+import json
+import sys
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def format_change(pct):
+    return "   n/a" if pct is None else f"{pct:+6.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95 regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline.get('commit')} vs candidate {candidate.get('commit')}")
+    regressions = []
+    for transport, new in candidate["transports"].items():
+        old = baseline["transports"].get(transport)
+        if old is None:
+            continue
+        print(f"\n[{transport}] throughput {old['throughput_per_s']:.1f} -> {new['throughput_per_s']:.1f} calls/s "
+              f"({format_change(change(old['throughput_per_s'], new['throughput_per_s']))})")
+        old_mem, new_mem = old.get("server_memory"), new.get("server_memory")
+        if old_mem and new_mem:
+            print(f"  peak RSS {old_mem['peak_rss_kib']} -> {new_mem['peak_rss_kib']} KiB "
+                  f"({format_change(change(old_mem['peak_rss_kib'], new_mem['peak_rss_kib']))})")
+        print(f"  {'tool':<28} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16}")
+        for tool, stats in sorted(new["tools"].items()):
+            before = old["tools"].get(tool)
+            if before is None:
+                continue
+            cells = []
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                cells.append(f"{stats[key]:8.1f} {format_change(change(before[key], stats[key]))}")
+            print(f"  {tool:<28} {' '.join(cells)}")
+            p95_change = change(before["p95_ms"], stats["p95_ms"])
+            if p95_change is not None and p95_change > args.threshold:
+                regressions.append(f"{transport}/{tool} p95 {p95_change:+.1f}%")
+
+    if regressions:
+        print("\nRegressions over threshold:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Mastodon and OpenAI APIs used by the benchmarks.
+
+One Starlette app serves both: the Mastodon endpoints the server calls under
+/api/v1 and the OpenAI chat completions endpoint under /v1. Latency, rate
+limits and payload sizes are configurable so benchmarks can reproduce slow
+instances, throttling and large timelines without any network access.
+
+Usage:
+    python benchmarks/fake_upstreams.py --port 8900 --mastodon-latency-ms 50 --llm-latency-ms 400
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+@dataclass
+class UpstreamConfig:
+    mastodon_latency_ms: float = 30.0
+    llm_latency_ms: float = 300.0
+    jitter: float = 0.2
+    # Requests allowed per rate-limit window; 0 disables rate limiting
+    rate_limit: int = 0
+    rate_limit_window: float = 300.0
+    statuses: int = 40
+    status_bytes: int = 500
+    bio_bytes: int = 200
+    # Admin accounts spread over the last two days; a sixth arrive as one bot wave
+    signups: int = 600
+    # Fraction of JSON completions returned the way weaker models drift: fenced, with prose, off-case labels
+    llm_malformed_rate: float = 0.0
+
+
+class RateLimiter:
+    """
+    Fixed-window limiter that mimics Mastodon's X-RateLimit-* headers.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.window_start = time.time()
+        self.used = 0
+
+    def check(self):
+        now = time.time()
+        if now - self.window_start >= self.window:
+            self.window_start = now
+            self.used = 0
+        self.used += 1
+        reset = datetime.fromtimestamp(self.window_start + self.window, tz=timezone.utc).isoformat()
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.limit - self.used)),
+            "X-RateLimit-Reset": reset,
+        }
+        return self.used <= self.limit, headers
+
+
+class FakeUpstreams:
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        self.limiter = RateLimiter(config.rate_limit, config.rate_limit_window) if config.rate_limit else None
+        self.request_counts = {}
+        self.app = Starlette(routes=[
+            Route("/api/v1/instance", self.instance),
+            Route("/api/v1/accounts/search", self.account_search),
+            Route("/api/v1/accounts/lookup", self.account_lookup),
+            Route("/api/v1/accounts/{id}/statuses", self.account_statuses),
+            Route("/api/v1/admin/accounts", self.admin_accounts),
+            Route("/v1/chat/completions", self.chat_completions, methods=["POST"]),
+        ])
+
+    async def _delay(self, base_ms: float):
+        if base_ms > 0:
+            jitter = base_ms * self.config.jitter
+            await asyncio.sleep(max(0.0, base_ms + random.uniform(-jitter, jitter)) / 1000)
+
+    async def _mastodon(self, name: str, payload):
+        self.request_counts[name] = self.request_counts.get(name, 0) + 1
+        await self._delay(self.config.mastodon_latency_ms)
+        headers = {}
+        if self.limiter:
+            allowed, headers = self.limiter.check()
+            if not allowed:
+                return JSONResponse({"error": "Too many requests"}, status_code=429, headers=headers)
+        return JSONResponse(payload, headers=headers)
+
+    def _account(self, acct: str) -> dict:
+        username = acct.lstrip("@").split("@")[0]
+        return {
+            "id": str(abs(hash(username)) % 10**12),
+            "username": username,
+            "acct": username,
+            "display_name": username.title(),
+            "note": ("<p>" + "bio " * (self.config.bio_bytes // 4) + "</p>"),
+            "followers_count": 120,
+            "following_count": 80,
+            "statuses_count": 3400,
+            "created_at": "2022-11-05T00:00:00.000Z",
+            "url": f"https://fake.local/@{username}",
+        }
+
+    async def instance(self, request: Request):
+        return await self._mastodon("instance", {"uri": "fake.local", "title": "Fake", "version": "4.2.0"})
+
+    async def account_search(self, request: Request):
+        return await self._mastodon("accounts/search", [self._account(request.query_params.get("q", "user"))])
+
+    async def account_lookup(self, request: Request):
+        return await self._mastodon("accounts/lookup", self._account(request.query_params.get("acct", "user")))
+
+    async def account_statuses(self, request: Request):
+        limit = min(int(request.query_params.get("limit", 20)), self.config.statuses)
+        now = datetime.now(timezone.utc)
+        body = "x" * self.config.status_bytes
+        statuses = [
+            {
+                "id": str(10**9 + i),
+                "created_at": (now - timedelta(hours=6 * i)).isoformat().replace("+00:00", "Z"),
+                "content": f"<p>{body}</p>",
+                "favourites_count": i % 7,
+                "reblogs_count": i % 3,
+                "replies_count": i % 2,
+                "mentions": [],
+                "tags": [],
+            }
+            for i in range(limit)
+        ]
+        return await self._mastodon("accounts/statuses", statuses)
+
+    def _admin_account(self, i: int, now: datetime) -> dict:
+        wave = i % 6 == 0
+        if wave:
+            created = now - timedelta(hours=3, seconds=i)
+            email, ip = f"user{i}@mailbot.example", f"203.0.113.{i % 250}"
+            note = f"<p>Crypto signals daily, join my channel now {i % 3}</p>"
+        else:
+            created = now - timedelta(seconds=i * 48 * 3600 / max(1, self.config.signups))
+            email, ip = f"user{i}@provider{i % 40}.example", f"198.51.{i % 200}.{i % 250}"
+            note = f"<p>Person {i} who likes topic {i % 17} and hobby {i % 29}</p>"
+        return {
+            "username": f"signup{i}",
+            "created_at": created.isoformat().replace("+00:00", "Z"),
+            "email": email,
+            "ip": ip,
+            "approved": i % 4 != 0,
+            "account": {"id": str(10**6 + i), "username": f"signup{i}", "acct": f"signup{i}", "note": note},
+        }
+
+    async def admin_accounts(self, request: Request):
+        limit = int(request.query_params.get("limit", 100))
+        max_id = int(request.query_params.get("max_id", 10**6 + self.config.signups))
+        now = datetime.now(timezone.utc)
+        accounts = sorted((self._admin_account(i, now) for i in range(self.config.signups)), key=lambda a: a["created_at"])
+        # Ids follow creation order so max_id paging walks back in time
+        for rank, account in enumerate(accounts):
+            account["id"] = str(10**6 + rank)
+        page = [a for a in reversed(accounts) if int(a["id"]) < max_id][:limit]
+        return await self._mastodon("admin/accounts", page)
+
+    async def chat_completions(self, request: Request):
+        self.request_counts["chat/completions"] = self.request_counts.get("chat/completions", 0) + 1
+        body = await request.json()
+        system = next((m["content"] for m in body.get("messages", []) if m["role"] == "system"), "")
+        await self._delay(self.config.llm_latency_ms)
+        if "risk score" in system:
+            content = json.dumps({"risk_score": 0.2, "recommendation": "approve", "summary": "Benchmark account."})
+        elif "severity" in system:
+            content = json.dumps({"triage_level": "medium", "action": "review", "summary": "Benchmark report."})
+        else:
+            content = "engaged community member"
+        if content.startswith("{") and random.random() < self.config.llm_malformed_rate:
+            content = "Here is my assessment:\n```json\n" + content.replace('"review"', '"Review"') + "\n```"
+        return JSONResponse({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 200, "completion_tokens": 40, "total_tokens": 240},
+        })
+
+
+class UpstreamServer:
+    """
+    Runs FakeUpstreams with uvicorn in a background thread.
+    """
+
+    def __init__(self, config: UpstreamConfig, host: str = "127.0.0.1", port: int = 8900):
+        self.upstreams = FakeUpstreams(config)
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.upstreams.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Fake upstream server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def add_upstream_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--mastodon-latency-ms", type=float, default=UpstreamConfig.mastodon_latency_ms)
+    parser.add_argument("--llm-latency-ms", type=float, default=UpstreamConfig.llm_latency_ms)
+    parser.add_argument("--jitter", type=float, default=UpstreamConfig.jitter, help="Latency jitter as a fraction")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Mastodon requests per window (0: unlimited)")
+    parser.add_argument("--rate-limit-window", type=float, default=UpstreamConfig.rate_limit_window)
+    parser.add_argument("--statuses", type=int, default=UpstreamConfig.statuses, help="Max statuses per page")
+    parser.add_argument("--status-bytes", type=int, default=UpstreamConfig.status_bytes)
+    parser.add_argument("--bio-bytes", type=int, default=UpstreamConfig.bio_bytes)
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0, help="Fraction of JSON completions to malform")
+
+
+def config_from_arguments(args) -> UpstreamConfig:
+    return UpstreamConfig(
+        mastodon_latency_ms=args.mastodon_latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        statuses=args.statuses,
+        status_bytes=args.status_bytes,
+        bio_bytes=args.bio_bytes,
+        llm_malformed_rate=args.llm_malformed_rate,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake Mastodon and OpenAI APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+    upstreams = FakeUpstreams(config_from_arguments(args))
+    uvicorn.run(upstreams.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Nagatha Mastodon MCP server.
+
+Starts the fake Mastodon/OpenAI upstreams, launches the MCP server over stdio
+and/or Streamable HTTP pointed at them, drives it with N concurrent clients
+and writes throughput, per-tool latency percentiles and server memory as
+JSON, so runs from different commits can be compared with compare.py.
+
+Usage:
+    python benchmarks/run_benchmark.py --transport both --clients 8 --requests 50 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_upstreams import UpstreamServer, add_upstream_arguments, config_from_arguments
+
+TOOL_ARGUMENTS = {
+    "get_user_profile": lambda i: {"username": f"bench{i}"},
+    "get_user_posts": lambda i: {"username": f"bench{i}", "limit": 20},
+    "evaluate_user_auto": lambda i: {"username": f"bench{i}"},
+    "analyze_user_activity_auto": lambda i: {"username": f"bench{i}", "limit": 40},
+    "triage_user_report": lambda i: {
+        "reporter": "benchmark",
+        "username": f"bench{i}",
+        "reason": "spam",
+        "comment": "Benchmark report",
+    },
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, errors, elapsed):
+    tools = {}
+    for tool, latencies in samples.items():
+        latencies = sorted(latencies)
+        tools[tool] = {
+            "calls": len(latencies),
+            "errors": errors.get(tool, 0),
+            "throughput_per_s": len(latencies) / elapsed if elapsed else None,
+            "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else None,
+            "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+            "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+            "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+            "max_ms": latencies[-1] * 1000 if latencies else None,
+        }
+    total = sum(len(v) for v in samples.values())
+    return {
+        "elapsed_s": elapsed,
+        "calls": total,
+        "errors": sum(errors.values()),
+        "throughput_per_s": total / elapsed if elapsed else None,
+        "tools": tools,
+    }
+
+
+def process_memory(pid):
+    """
+    Current and peak resident set size of `pid` in KiB (Linux only).
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "rss_kib": int(fields["VmRSS"].split()[0]),
+            "peak_rss_kib": int(fields["VmHWM"].split()[0]),
+        }
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def child_pids():
+    """
+    PIDs of this process's direct children (Linux only).
+    """
+    pids = []
+    if not os.path.isdir("/proc"):
+        return pids
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            # Fields after the parenthesised command name; the second one is the parent PID.
+            if int(stat.rsplit(")", 1)[1].split()[1]) == os.getpid():
+                pids.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return pids
+
+
+async def drive_session(session, tools, requests, client_index, samples, errors):
+    for i in range(requests):
+        tool = tools[i % len(tools)]
+        arguments = TOOL_ARGUMENTS[tool](client_index * requests + i)
+        started = time.perf_counter()
+        try:
+            result = await session.call_tool(tool, arguments)
+            failed = result.isError or any(
+                getattr(c, "text", "").startswith("Error") for c in result.content
+            )
+        except Exception:
+            failed = True
+        samples.setdefault(tool, []).append(time.perf_counter() - started)
+        if failed:
+            errors[tool] = errors.get(tool, 0) + 1
+
+
+async def bench_stdio(env, args):
+    params = StdioServerParameters(command=sys.executable, args=["mcp_run.py"], env=env, cwd=REPO_ROOT)
+    samples, errors = {}, {}
+    startup = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.list_tools()
+            startup = time.perf_counter() - startup
+            server_pids = child_pids()
+            # Stdio is one session per process, so clients share it with concurrent requests.
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                drive_session(session, args.tools, args.requests, c, samples, errors)
+                for c in range(args.clients)
+            ))
+            elapsed = time.perf_counter() - started
+            memory = process_memory(server_pids[0]) if server_pids else None
+    result = summarize(samples, errors, elapsed)
+    result["startup_s"] = startup
+    result["server_memory"] = memory
+    return result
+
+
+async def bench_http(env, args):
+    url = f"http://127.0.0.1:{args.http_port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "mcp_run:app", "--port", str(args.http_port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+    samples, errors = {}, {}
+    try:
+        startup = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            while True:
+                try:
+                    if (await client.get(url + "/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.perf_counter() - startup > 30:
+                    raise RuntimeError("MCP HTTP server did not start")
+                await asyncio.sleep(0.05)
+        startup = time.perf_counter() - startup
+
+        async def client_task(index):
+            async with streamablehttp_client(url + "/mcp/") as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    await drive_session(session, args.tools, args.requests, index, samples, errors)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_task(c) for c in range(args.clients)))
+        elapsed = time.perf_counter() - started
+        memory = process_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    result = summarize(samples, errors, elapsed)
+    result["startup_s"] = startup
+    result["server_memory"] = memory
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    config = config_from_arguments(args)
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            "clients": args.clients,
+            "requests_per_client": args.requests,
+            "tools": args.tools,
+            "upstream": vars(config),
+            "mastodon_cassette": args.mastodon_cassette,
+            "replay_latency": args.replay_latency if args.mastodon_cassette else None,
+        },
+        "transports": {},
+    }
+    with UpstreamServer(config, port=args.upstream_port) as upstream:
+        env = dict(
+            os.environ,
+            PYTHONPATH=REPO_ROOT,
+            MASTODON_API_BASE=upstream.url,
+            MASTODON_ACCESS_TOKEN="benchmark",
+            OPENAI_API_KEY="benchmark",
+            OPENAI_BASE_URL=upstream.url + "/v1",
+            USE_LLM_ACTIVITY="true",
+            USE_LLM_TRIAGE="true",
+        )
+        if args.mastodon_cassette:
+            # Mastodon traffic comes from the recording; the fake upstream still serves the LLM.
+            env.update(
+                MASTODON_CASSETTE_MODE="replay",
+                MASTODON_CASSETTE_PATH=os.path.abspath(args.mastodon_cassette),
+                MASTODON_CASSETTE_REPLAY_LATENCY=str(args.replay_latency),
+            )
+        if args.transport in ("stdio", "both"):
+            results["transports"]["stdio"] = await bench_stdio(env, args)
+        if args.transport in ("http", "both"):
+            results["transports"]["http"] = await bench_http(env, args)
+        results["upstream_requests"] = dict(upstream.upstreams.request_counts)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP server against fake upstreams")
+    parser.add_argument("--transport", choices=["stdio", "http", "both"], default="both")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=25, help="Tool calls per client")
+    parser.add_argument("--tools", nargs="+", choices=sorted(TOOL_ARGUMENTS), default=sorted(TOOL_ARGUMENTS))
+    parser.add_argument("--upstream-port", type=int, default=8900)
+    parser.add_argument("--http-port", type=int, default=8901)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--mastodon-cassette", help="Replay Mastodon responses from this recorded cassette")
+    parser.add_argument("--replay-latency", type=float, default=1.0,
+                        help="Scale recorded Mastodon latencies during replay; 0 serves instantly (default: 1.0)")
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        for transport, result in results["transports"].items():
+            print(f"{transport}: {result['throughput_per_s']:.1f} calls/s, {result['errors']} errors")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the MCP server.
+
+Measures, over several fresh interpreter launches:
+- import time of mcp_run (what the container healthcheck and every stdio launch pay)
+- time from spawning `python mcp_run.py` to answered initialize + list_tools
+- idle resident memory of the stdio server after list_tools
+
+Results are printed as JSON so they can be tracked across commits.
+
+Usage:
+    python benchmarks/startup.py --runs 5 --output startup.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from run_benchmark import child_pids, git_commit, process_memory
+
+IMPORT_PROBE = (
+    "import time, resource; started = time.perf_counter(); import mcp_run; "
+    "print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), int(output[1])
+
+
+async def measure_stdio_ready():
+    params = StdioServerParameters(command=sys.executable, args=["mcp_run.py"], cwd=REPO_ROOT)
+    started = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.list_tools()
+            ready = time.perf_counter() - started
+            pids = child_pids()
+            memory = process_memory(pids[0]) if pids else None
+    return ready, memory
+
+
+def describe(values):
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MCP server cold-start time and idle memory")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    import_times, import_rss, ready_times, idle_rss = [], [], [], []
+    for _ in range(args.runs):
+        seconds, max_rss = measure_import()
+        import_times.append(seconds)
+        import_rss.append(max_rss)
+        ready, memory = asyncio.run(measure_stdio_ready())
+        ready_times.append(ready)
+        if memory:
+            idle_rss.append(memory["rss_kib"])
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "import_s": describe(import_times),
+        "import_max_rss_kib": describe(import_rss),
+        "stdio_initialize_list_tools_s": describe(ready_times),
+        "stdio_idle_rss_kib": describe(idle_rss) if idle_rss else None,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,11 @@ This script runs the Nagatha Mastodon moderation system as an MCP server.
 It can be used with MCP clients like Claude Desktop or other MCP-compatible applications.
 
 Usage:
-    python mcp_run.py
+    python mcp_run.py                                  # stdio transport
+    uvicorn mcp_run:app --host 0.0.0.0 --port 8080     # Streamable HTTP transport
 
-The server communicates via stdio (standard input/output) following the MCP protocol.
+When run as a script the server communicates via stdio (standard input/output)
+following the MCP protocol.
 """
 
 import sys
@@ -17,7 +19,7 @@ import asyncio
 from starlette.applications import Starlette
 from starlette.routing import Mount, Route
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import Response, JSONResponse, PlainTextResponse
 from starlette.types import Scope, Receive, Send
 import logging
 import anyio
@@ -26,28 +28,98 @@ import contextlib
 # Add the app directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.mcp_server import server
+from app.mcp_server import server, run_server
+from app.core.background import background_services
+from app.core.config import settings
+from app.core.diagnostics import register_session_source
+from app.core.metrics import render_metrics
+from app.core.session_store import get_session_store, worker_id
 from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 
-# Create the session manager (stateless=False for session support)
-session_manager = StreamableHTTPSessionManager(server, stateless=False)
+MCP_SESSION_ID_HEADER = b"mcp-session-id"
+
+
+def _header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
 
 class MCPASGIApp:
-    def __init__(self, session_manager):
+    """
+    ASGI adapter around the Streamable HTTP session manager.
+
+    With a shared session store, sessions this worker created are served by
+    `session_manager` as usual. A request for a session created by another
+    worker is served by `adoption_manager`, a stateless manager: the session was
+    already initialized on its owning worker, so each request stands on its own.
+    """
+
+    def __init__(self, session_manager, adoption_manager=None, session_store=None):
         self.session_manager = session_manager
+        self.adoption_manager = adoption_manager
+        self.session_store = session_store
+        self.worker_id = worker_id()
+        self._local_sessions = set()
         self._cm = None
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
         if scope["type"] == "lifespan":
             await self.lifespan(scope, receive, send)
+        elif self.adoption_manager is None:
+            await self.session_manager.handle_request(scope, receive, send)
         else:
+            await self.handle_shared_request(scope, receive, send)
+
+    async def handle_shared_request(self, scope: Scope, receive: Receive, send: Send):
+        session_id = _header(scope["headers"], MCP_SESSION_ID_HEADER)
+        if session_id is None or session_id in self._local_sessions:
+            await self.session_manager.handle_request(scope, receive, self._tracking_send(scope, session_id, send))
+        elif self.session_store.get(session_id) is None:
+            # Unknown to every worker: the session manager answers 404.
             await self.session_manager.handle_request(scope, receive, send)
+        elif scope["method"] == "DELETE":
+            self.session_store.delete(session_id)
+            await Response(status_code=200)(scope, receive, send)
+        else:
+            self.session_store.touch(session_id)
+            await self.adoption_manager.handle_request(scope, receive, send)
+
+    def _tracking_send(self, scope: Scope, session_id, send: Send):
+        async def tracking_send(message):
+            if message["type"] == "http.response.start":
+                self._track_session(scope["method"], session_id, message)
+            await send(message)
+        return tracking_send
+
+    def _track_session(self, method: str, session_id, message):
+        status = message["status"]
+        if session_id is None:
+            created = _header(message.get("headers", []), MCP_SESSION_ID_HEADER)
+            if created and status < 400:
+                self._local_sessions.add(created)
+                self.session_store.put(created, self.worker_id)
+        elif status == 404 or (method == "DELETE" and status < 400):
+            self._local_sessions.discard(session_id)
+            self.session_store.delete(session_id)
+        else:
+            self.session_store.touch(session_id)
+
+    @contextlib.asynccontextmanager
+    async def run(self):
+        async with contextlib.AsyncExitStack() as stack:
+            await stack.enter_async_context(self.session_manager.run())
+            if self.adoption_manager is not None:
+                await stack.enter_async_context(self.adoption_manager.run())
+            await stack.enter_async_context(background_services())
+            yield
 
     async def lifespan(self, scope, receive, send):
         while True:
             message = await receive()
             if message["type"] == "lifespan.startup":
-                self._cm = self.session_manager.run()
+                self._cm = self.run()
                 await self._cm.__aenter__()
                 await send({"type": "lifespan.startup.complete"})
             elif message["type"] == "lifespan.shutdown":
@@ -56,13 +128,43 @@ class MCPASGIApp:
                 await send({"type": "lifespan.shutdown.complete"})
                 break
 
-mcp_asgi_app = MCPASGIApp(session_manager)
+
+def create_mcp_asgi_app() -> MCPASGIApp:
+    if settings.MCP_HTTP_STATELESS:
+        return MCPASGIApp(StreamableHTTPSessionManager(server, stateless=True))
+    # stateless=False for session support
+    session_manager = StreamableHTTPSessionManager(server, stateless=False)
+    register_session_source("http", lambda: len(session_manager._server_instances))
+    if settings.MCP_SESSION_BACKEND == "memory":
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            logging.warning(
+                "Running several workers with the in-memory session store; "
+                "set MCP_SESSION_BACKEND=sqlite or MCP_HTTP_STATELESS=true"
+            )
+        return MCPASGIApp(session_manager)
+    # Counts the sessions of every worker sharing the store
+    register_session_source("shared_store", get_session_store().count)
+    return MCPASGIApp(
+        session_manager,
+        adoption_manager=StreamableHTTPSessionManager(server, stateless=True),
+        session_store=get_session_store(),
+    )
+
+
+async def metrics(request: Request) -> Response:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+mcp_asgi_app = create_mcp_asgi_app()
 
 app = Starlette(
     routes=[
         Route("/", lambda request: JSONResponse({"status": "ok"})),
+        Route("/metrics", metrics),
         Mount("/mcp", app=mcp_asgi_app),
-    ]
+    ],
+    # Mounted apps do not receive lifespan events, so run the managers here.
+    lifespan=lambda app: mcp_asgi_app.run(),
 )
 
 if __name__ == "__main__":
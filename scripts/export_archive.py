@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Export the local archive (fetched accounts and statuses, evaluation, activity
+and triage results) to Parquet or Arrow files.
+
+    python scripts/export_archive.py --start 2025-01-01 --end 2025-02-01 --output exports/
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import archive  # noqa: E402
+from app.services.export import export_archive, export_dir  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--start", required=True, type=datetime.fromisoformat, help="ISO date or time (UTC unless an offset is given)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="ISO date or time, exclusive (default: now)")
+    parser.add_argument("--tables", nargs="+", choices=list(archive.TABLES), help="Tables to export (default: all)")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--output", help=f"Output directory (default: {export_dir()})")
+    args = parser.parse_args()
+
+    result = export_archive(args.start, args.end, args.tables, args.format, args.output)
+    for exported in result.files:
+        print(f"{exported.table}: {exported.rows} rows in {exported.row_groups} batches -> {exported.path} ({exported.bytes} bytes)")
+
+
+if __name__ == "__main__":
+    main()
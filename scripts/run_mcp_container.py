@@ -4,18 +4,64 @@ Docker MCP Server Runner for Nagatha Assistant
 
 This script provides an interface for the Nagatha Assistant to run and communicate
 with the dockerized MCP server via stdio.
+
+MCPServerPool, for clients that open many sessions, keeps several server
+processes (containers, or plain local processes with LocalLauncher) started
+ahead of time and hands one to each session, so a session does not pay for
+container start, interpreter start and imports. Processes are health-checked
+between sessions and replaced after `max_sessions` sessions or when their
+memory grew by more than `max_memory_growth` since warm-up.
 """
 
+import itertools
+import queue
 import subprocess
 import sys
 import os
 import json
 import logging
-from typing import Optional, Dict, Any
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Dict, Any
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The image's default command serves HTTP; stdio sessions run the script instead
+STDIO_COMMAND = ["python", "mcp_run.py"]
+
+
+def docker_run_command(container_name: str, image_name: str, env_vars: Dict[str, str]) -> List[str]:
+    cmd = [
+        "docker", "run",
+        "--rm",  # Remove container when it stops
+        "--interactive",  # Keep STDIN open
+        "--name", container_name
+    ]
+    # Add environment variables
+    for key, value in env_vars.items():
+        if value:  # Only add non-empty values
+            cmd.extend(["-e", f"{key}={value}"])
+    return cmd + [image_name] + STDIO_COMMAND
+
+
+def _parse_size(text: str) -> Optional[int]:
+    """
+    Bytes from a docker stats size such as "45.3MiB".
+    """
+    units = {"kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "b": 1}
+    text = text.strip().lower()
+    for unit, factor in units.items():
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)]) * factor)
+            except ValueError:
+                return None
+    return None
+
 class DockerMCPServer:
     """
     Manages a dockerized MCP server instance for the Nagatha Assistant.
@@ -55,22 +101,7 @@ class DockerMCPServer:
         Returns the subprocess for communication.
         """
         try:
-            # Build docker run command
-            cmd = [
-                "docker", "run",
-                "--rm",  # Remove container when it stops
-                "--interactive",  # Keep STDIN open
-                "--name", self.container_name
-            ]
-            
-            # Add environment variables
-            for key, value in self.env_vars.items():
-                if value:  # Only add non-empty values
-                    cmd.extend(["-e", f"{key}={value}"])
-            
-            # Add the image name
-            cmd.append(self.image_name)
-            
+            cmd = docker_run_command(self.container_name, self.image_name, self.env_vars)
             logger.info(f"Starting container: {' '.join(cmd)}")
             
             # Start the container with stdio pipes
@@ -170,6 +201,379 @@ class DockerMCPServer:
             return False
 
 
+class MCPServerProcess:
+    """
+    A stdio MCP server child process. Reader threads collect its stdout
+    messages (so requests can time out) and drain its stderr into the log.
+    """
+
+    def __init__(self, command: List[str], name: str, env: Optional[Dict[str, str]] = None,
+                 cwd: Optional[str] = None, on_stop: Optional[Callable[[], None]] = None,
+                 memory_probe: Optional[Callable[["MCPServerProcess"], Optional[int]]] = None):
+        self.command = command
+        self.name = name
+        self.env = env
+        self.cwd = cwd
+        self.on_stop = on_stop
+        self.memory_probe = memory_probe
+        self.process: Optional[subprocess.Popen] = None
+        self.sessions = 0
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.baseline_memory: Optional[int] = None
+        self._messages: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            env=self.env,
+            cwd=self.cwd,
+        )
+        threading.Thread(target=self._read_stdout, name=f"{self.name}-stdout", daemon=True).start()
+        threading.Thread(target=self._read_stderr, name=f"{self.name}-stderr", daemon=True).start()
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            try:
+                self._messages.put(json.loads(line))
+            except json.JSONDecodeError:
+                logger.debug(f"{self.name}: {line.rstrip()}")
+        self._messages.put(None)
+
+    def _read_stderr(self):
+        # An undrained stderr pipe fills up and blocks the server.
+        for line in self.process.stderr:
+            logger.debug(f"{self.name}: {line.rstrip()}")
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def send_message(self, message: Dict[str, Any], timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """
+        Send a JSON-RPC message. Returns the response to a request (None on
+        timeout or exit); notifications return None at once.
+        """
+        with self._lock:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+            if "id" not in message:
+                return None
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    response = self._messages.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    return None
+                if response is None:
+                    self._messages.put(None)
+                    return None
+                # Skip server notifications and stale responses to timed-out requests
+                if response.get("id") == message["id"] and ("result" in response or "error" in response):
+                    return response
+
+    def request(self, method: str, params: Optional[dict] = None, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        message = {"jsonrpc": "2.0", "id": f"pool-{next(self._ids)}", "method": method}
+        if params is not None:
+            message["params"] = params
+        return self.send_message(message, timeout)
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """
+        Ping is answered before initialization too, so it shows the server is up and idle.
+        """
+        if not self.alive():
+            return False
+        try:
+            response = self.request("ping", timeout=timeout)
+        except OSError:
+            return False
+        return response is not None and "result" in response
+
+    def memory_bytes(self) -> Optional[int]:
+        if self.memory_probe is not None:
+            return self.memory_probe(self)
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def stop(self, timeout: float = 10.0):
+        if self.process is not None:
+            if self.process.poll() is None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            for pipe in (self.process.stdout, self.process.stderr):
+                try:
+                    pipe.close()
+                except (OSError, ValueError):
+                    pass
+        if self.on_stop is not None:
+            self.on_stop()
+
+
+class LocalLauncher:
+    """
+    Starts the server as a plain local process (no Docker).
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None, cwd: str = REPO_ROOT):
+        self.command = command or [sys.executable, "mcp_run.py"]
+        self.env = {**os.environ, **(env or {})}
+        self.cwd = cwd
+
+    def launch(self, index: int) -> MCPServerProcess:
+        return MCPServerProcess(self.command, f"mcp-local-{index}", env=self.env, cwd=self.cwd)
+
+
+class DockerLauncher:
+    """
+    Starts the server in a container per process, named `<prefix>-<index>`.
+    """
+
+    def __init__(self, image_name: str = "nagatha-mastodon-mcp", container_prefix: str = "nagatha-mastodon-mcp",
+                 env_vars: Optional[Dict[str, str]] = None):
+        self.image_name = image_name
+        self.container_prefix = container_prefix
+        self.env_vars = env_vars or {}
+
+    @staticmethod
+    def _container_memory(name: str) -> Optional[int]:
+        result = subprocess.run(
+            ["docker", "stats", "--no-stream", "--format", "{{.MemUsage}}", name],
+            capture_output=True, text=True, check=False,
+        )
+        return _parse_size(result.stdout.split("/")[0]) if result.returncode == 0 else None
+
+    def launch(self, index: int) -> MCPServerProcess:
+        name = f"{self.container_prefix}-{index}"
+        # A container left over from an earlier run would block the name
+        subprocess.run(["docker", "rm", "-f", name], capture_output=True, check=False)
+        return MCPServerProcess(
+            docker_run_command(name, self.image_name, self.env_vars),
+            name,
+            on_stop=lambda: subprocess.run(["docker", "rm", "-f", name], capture_output=True, check=False),
+            memory_probe=lambda _: self._container_memory(name),
+        )
+
+
+class MCPServerPool:
+    """
+    Keeps `size` server processes warm and hands them to sessions.
+
+    A process is warm once it answers a ping: the interpreter is up and the
+    server imported. Sessions send their own initialize; the server accepts a
+    new one from each session. Processes are pinged when a session returns
+    them and periodically while idle, and replaced when they fail, after
+    `max_sessions` sessions, or when their memory grew by more than
+    `max_memory_growth` (a fraction) since warm-up.
+    """
+
+    def __init__(self, launcher, size: int = 2, max_sessions: int = 100, max_memory_growth: float = 0.5,
+                 start_timeout: float = 60.0, health_timeout: float = 5.0, health_interval: float = 30.0):
+        self.launcher = launcher
+        self.size = size
+        self.max_sessions = max_sessions
+        self.max_memory_growth = max_memory_growth
+        self.start_timeout = start_timeout
+        self.health_timeout = health_timeout
+        self.health_interval = health_interval
+        self._idle: "queue.Queue[MCPServerProcess]" = queue.Queue()
+        self._busy: set = set()
+        self._starting = 0
+        # Processes starting, idle or busy; the maintenance loop tops this up to `size`
+        self._live = 0
+        self._indexes = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._acquire_latencies: deque = deque(maxlen=1000)
+        self._warmup_seconds: deque = deque(maxlen=100)
+        self._recycled: Dict[str, int] = {}
+        self._failed_starts = 0
+        self._maintenance: Optional[threading.Thread] = None
+
+    def start(self, wait: bool = True):
+        """
+        Start the processes; with `wait`, block until all of them are warm.
+        """
+        for _ in range(self.size):
+            self._spawn()
+        self._maintenance = threading.Thread(target=self._maintain, name="mcp-pool-maintenance", daemon=True)
+        self._maintenance.start()
+        if wait:
+            deadline = time.monotonic() + self.start_timeout
+            while self._idle.qsize() < self.size and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+    def _spawn(self):
+        with self._lock:
+            self._starting += 1
+            self._live += 1
+        threading.Thread(target=self._warm, name="mcp-pool-warm", daemon=True).start()
+
+    def _warm(self):
+        server = self.launcher.launch(next(self._indexes))
+        try:
+            server.start()
+            ready = server.ping(self.start_timeout)
+        except OSError as e:
+            logger.error(f"Failed to start {server.name}: {e}")
+            ready = False
+        with self._lock:
+            self._starting -= 1
+            if not ready:
+                self._live -= 1
+        if not ready:
+            self._failed_starts += 1
+            server.stop()
+            if not self._closed.is_set():
+                # Retried from the maintenance loop, so a broken image does not spin
+                logger.error(f"{server.name} did not become ready within {self.start_timeout}s")
+            return
+        server.ready_at = time.perf_counter()
+        self._warmup_seconds.append(server.ready_at - server.started_at)
+        server.baseline_memory = server.memory_bytes()
+        if self._closed.is_set():
+            server.stop()
+            return
+        self._idle.put(server)
+        logger.info(f"{server.name} warm in {server.ready_at - server.started_at:.2f}s")
+
+    def acquire(self, timeout: Optional[float] = None) -> MCPServerProcess:
+        """
+        A warm process for one session; waits for one if all are busy.
+        """
+        started = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed.is_set():
+                raise RuntimeError("Pool is closed")
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                server = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(f"No MCP server available within {timeout}s")
+            if not server.alive():
+                self._retire(server, "exited")
+                continue
+            break
+        with self._lock:
+            self._busy.add(server)
+        self._acquire_latencies.append(time.perf_counter() - started)
+        return server
+
+    def release(self, server: MCPServerProcess):
+        """
+        Return a process after its session; it is checked and kept or replaced.
+        """
+        with self._lock:
+            self._busy.discard(server)
+        server.sessions += 1
+        reason = self._recycle_reason(server)
+        if reason is not None:
+            self._retire(server, reason)
+        elif self._closed.is_set():
+            server.stop()
+        else:
+            self._idle.put(server)
+
+    def _recycle_reason(self, server: MCPServerProcess) -> Optional[str]:
+        if not server.ping(self.health_timeout):
+            return "unhealthy"
+        if server.sessions >= self.max_sessions:
+            return "max_sessions"
+        memory = server.memory_bytes()
+        if memory and server.baseline_memory and memory > server.baseline_memory * (1 + self.max_memory_growth):
+            return "memory"
+        return None
+
+    def _retire(self, server: MCPServerProcess, reason: str):
+        logger.info(f"Recycling {server.name} after {server.sessions} sessions: {reason}")
+        self._recycled[reason] = self._recycled.get(reason, 0) + 1
+        with self._lock:
+            self._live -= 1
+        server.stop()
+        if not self._closed.is_set():
+            self._spawn()
+
+    def _maintain(self):
+        while not self._closed.wait(self.health_interval):
+            # Check each idle process once; a failed one is replaced
+            for _ in range(self._idle.qsize()):
+                try:
+                    server = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if server.ping(self.health_timeout):
+                    self._idle.put(server)
+                else:
+                    self._retire(server, "unhealthy")
+            # Replace processes that failed to start
+            with self._lock:
+                missing = self.size - self._live
+            for _ in range(missing):
+                self._spawn()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        server = self.acquire(timeout)
+        try:
+            yield server
+        finally:
+            self.release(server)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._acquire_latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3) if latencies else None
+
+        with self._lock:
+            busy, starting = len(self._busy), self._starting
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "busy": busy,
+            "starting": starting,
+            "acquires": len(latencies),
+            "acquire_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "warmup_seconds_avg": round(sum(self._warmup_seconds) / len(self._warmup_seconds), 3) if self._warmup_seconds else None,
+            "recycled": dict(self._recycled),
+            "failed_starts": self._failed_starts,
+        }
+
+    def close(self):
+        self._closed.set()
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+        with self._lock:
+            busy = list(self._busy)
+        for server in busy:
+            server.stop()
+
+
 def main():
     """Example usage of the DockerMCPServer."""
     
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the activity analysis CPU stage
+
+Checks the pure statistics functions, the posting-periodicity check, paged
+fetching of long histories, and that the process-pool backend returns the
+same results as inline execution.
+"""
+
+import asyncio
+import sys
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core import process_pool
+from app.schemas.user_activity import RecentPost, UserActivityIn
+from app.services import mastodon as mastodon_service
+from app.services.activity import analyze_user_activity
+from app.utils.analysis import PostBatch, compute_activity_stats, timing_stats
+
+
+def make_posts(count, gap):
+    start = datetime(2024, 1, 1)
+    return [
+        RecentPost(content=f"post {i}", created_at=start + gap * i, favorites=i, reblogs=1)
+        for i in range(count)
+    ]
+
+
+def test_compute_activity_stats():
+    stats = compute_activity_stats(PostBatch.from_posts(make_posts(4, timedelta(hours=12))))
+    assert stats["posting_frequency"] == "daily"
+    assert stats["avg_favorites"] == 1.5
+    assert stats["avg_reblogs"] == 1.0
+
+    stats = compute_activity_stats(PostBatch.from_posts(make_posts(3, timedelta(days=3))))
+    assert stats["posting_frequency"] == "weekly"
+
+    stats = compute_activity_stats(PostBatch.from_posts(make_posts(1, timedelta(days=3))))
+    assert stats["posting_frequency"] == "sporadic"
+
+
+def test_timing_stats_separates_schedules_from_people():
+    rng = random.Random(7)
+    start = 1_700_000_000.0
+    every_15_minutes = [start + i * 900 for i in range(500)]
+    # Jittered, and with a third of the slots skipped: the gaps vary, the period does not
+    scheduled = [start + i * 900 + rng.uniform(-30, 30) for i in range(1500) if rng.random() > 0.33]
+    person, t = [], start
+    while len(person) < 500:
+        # Bursts of a few posts minutes apart, hours between bursts
+        t += rng.expovariate(1 / 14400) if rng.random() < 0.3 else rng.expovariate(1 / 180)
+        person.append(t)
+
+    clockwork = timing_stats(every_15_minutes)
+    assert clockwork["gap_cv"] == 0 and clockwork["period_seconds"] == 900
+    assert clockwork["bot_likelihood"] > 0.95
+    skipped = timing_stats(scheduled)
+    assert skipped["gap_cv"] > 0.4 and skipped["period_seconds"] == 900 and skipped["periodicity"] > 0.4
+    human = timing_stats(person)
+    assert human["gap_cv"] > 1 and human["period_seconds"] is None and human["bot_likelihood"] < 0.2
+    assert timing_stats(every_15_minutes[:9]) is None
+
+
+def test_activity_flags_regular_posting():
+    posts = make_posts(200, timedelta(minutes=15))
+    result = asyncio.run(analyze_user_activity(UserActivityIn(username="cron", recent_posts=posts)))
+    assert result.bot_likelihood > 0.95 and result.timing.period_seconds == 900
+    assert "machine-regular every 15 minutes" in result.summary
+
+    result = asyncio.run(analyze_user_activity(UserActivityIn(username="few", recent_posts=posts[:5])))
+    assert result.bot_likelihood is None and result.timing is None
+
+
+def test_recent_posts_are_paged(monkeypatch):
+    history = [
+        {"id": str(1000 - i), "content": "", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc) - timedelta(hours=i)}
+        for i in range(100)
+    ]
+    calls = []
+
+    async def fake_resolve(username, server):
+        return {"id": "1"}
+
+    async def fake_api(instance, operation, endpoint, params=None):
+        calls.append(params)
+        older = [s for s in history if "max_id" not in params or int(s["id"]) < int(params["max_id"])]
+        return older[:params["limit"]]
+
+    monkeypatch.setattr(mastodon_service, "resolve_account", fake_resolve)
+    monkeypatch.setattr(mastodon_service, "_api", fake_api)
+    posts = asyncio.run(mastodon_service.get_recent_posts("someone", 90))
+    assert len(posts) == 90 and posts[-1].created_at == history[89]["created_at"]
+    assert calls == [{"limit": 40}, {"limit": 40, "max_id": "961"}, {"limit": 10, "max_id": "921"}]
+
+    # The history ends before the limit
+    calls.clear()
+    assert len(asyncio.run(mastodon_service.get_recent_posts("someone", 500))) == 100 and len(calls) == 3
+
+
+def test_process_backend_matches_inline():
+    data = UserActivityIn(username="tester", recent_posts=make_posts(50, timedelta(days=10)))
+    inline = asyncio.run(analyze_user_activity(data))
+
+    settings.ANALYSIS_EXECUTOR = "process"
+    settings.ANALYSIS_PROCESS_WORKERS = 1
+    settings.ANALYSIS_PROCESS_MIN_ITEMS = 10
+    try:
+        pooled = asyncio.run(analyze_user_activity(data))
+        stats = process_pool.get_pool_stats()
+    finally:
+        process_pool.shutdown_process_pool()
+        settings.ANALYSIS_EXECUTOR = "inline"
+        settings.ANALYSIS_PROCESS_WORKERS = 0
+        settings.ANALYSIS_PROCESS_MIN_ITEMS = 500
+
+    assert pooled == inline
+    assert pooled.posting_frequency == "sporadic"
+    assert stats["submitted"] >= 1
+    assert stats["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    test_compute_activity_stats()
+    test_timing_stats_separates_schedules_from_people()
+    test_activity_flags_regular_posting()
+    test_process_backend_matches_inline()
+    print("✅ Activity analysis tests passed")
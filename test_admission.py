@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for tool call admission control
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.admission import AdmissionController, Overloaded, llm_allowed, tool_class
+from app.core.config import settings
+
+
+def controller(**overrides):
+    options = dict(
+        limits={"interactive": 4, "llm": 1, "bulk": 1},
+        max_concurrent=8,
+        queue_size=4,
+        queue_timeout=1.0,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+async def hold(admission, tool, release, log, name=None):
+    async with admission.admit(tool) as degraded:
+        log.append((name or tool, degraded, llm_allowed()))
+        await release.wait()
+
+
+def test_classes_are_isolated_and_degrade(monkeypatch):
+    monkeypatch.setattr(settings.current(), "USE_LLM_TRIAGE", True)
+
+    async def scenario():
+        admission, release, log = controller(), asyncio.Event(), []
+        evaluating = asyncio.create_task(hold(admission, "evaluate_user_auto", release, log))
+        await asyncio.sleep(0)
+        # The LLM class is full: lookups still run, triage falls back to heuristics
+        lookup = asyncio.create_task(hold(admission, "get_user_profile", release, log))
+        triage = asyncio.create_task(hold(admission, "triage_user_report", release, log))
+        await asyncio.sleep(0)
+        assert ("get_user_profile", False, True) in log
+        assert ("triage_user_report", True, False) in log
+        release.set()
+        await asyncio.gather(evaluating, lookup, triage)
+        assert admission.total_in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_heuristic_tools_are_interactive_without_llm(monkeypatch):
+    monkeypatch.setattr(settings.current(), "USE_LLM_TRIAGE", False)
+    monkeypatch.setattr(settings.current(), "USE_LLM_ACTIVITY", True)
+    assert tool_class("triage_user_report") == "interactive"
+    assert tool_class("analyze_user_activity_auto") == "llm" and tool_class("evaluate_user_auto") == "llm"
+
+    async def scenario():
+        admission, release, log = controller(), asyncio.Event(), []
+        evaluating = asyncio.create_task(hold(admission, "evaluate_user_auto", release, log))
+        await asyncio.sleep(0)
+        # Heuristic triage neither waits for nor degrades on the full LLM class
+        triage = asyncio.create_task(hold(admission, "triage_user_report", release, log))
+        await asyncio.sleep(0)
+        assert ("triage_user_report", False, True) in log
+        assert admission.in_flight.get("llm") == 1 and admission.in_flight.get("interactive") == 1
+        release.set()
+        await asyncio.gather(evaluating, triage)
+
+    asyncio.run(scenario())
+
+
+def test_queue_serves_priority_order():
+    async def scenario():
+        admission = controller(max_concurrent=1)
+        release, log = asyncio.Event(), []
+        first = asyncio.create_task(hold(admission, "get_user_posts", release, log))
+        await asyncio.sleep(0)
+        later = [
+            asyncio.create_task(hold(admission, "analyze_signup_cohort", release, log)),
+            asyncio.create_task(hold(admission, "evaluate_user_auto", release, log)),
+            asyncio.create_task(hold(admission, "get_user_profile", release, log)),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *later)
+        assert [entry[0] for entry in log] == [
+            "get_user_posts", "get_user_profile", "evaluate_user_auto", "analyze_signup_cohort"
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_or_sheds():
+    async def scenario():
+        admission = controller(max_concurrent=1, queue_size=1)
+        release, log = asyncio.Event(), []
+        running = asyncio.create_task(hold(admission, "get_user_posts", release, log))
+        await asyncio.sleep(0)
+        bulk = asyncio.create_task(hold(admission, "analyze_signup_cohort", release, log))
+        await asyncio.sleep(0)
+        # A higher-priority call displaces the queued bulk call...
+        lookup = asyncio.create_task(hold(admission, "get_user_profile", release, log))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await bulk
+        assert shed.value.retry_after >= 1
+        # ...and an equal-priority call finds the queue full
+        with pytest.raises(Overloaded):
+            await hold(admission, "get_user_profile", release, log)
+        release.set()
+        await asyncio.gather(running, lookup)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        admission = controller(max_concurrent=1, queue_timeout=0.05)
+        release, log = asyncio.Event(), []
+        running = asyncio.create_task(hold(admission, "get_user_posts", release, log))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await hold(admission, "get_user_profile", release, log)
+        assert admission.queued() == {}
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_classes_are_isolated_and_degrade()
+    test_queue_serves_priority_order()
+    test_full_queue_rejects_or_sheds()
+    test_queue_timeout()
+    print("✅ Admission control tests passed")
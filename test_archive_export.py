@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the local archive and its Parquet/Arrow export
+"""
+
+import asyncio
+import sqlite3
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.report import ReportTriageOut, UserReportIn
+from app.schemas.user_eval import UserEvaluationOut
+from app.services import archive
+from app.services.export import export_archive, export_table
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+NOW = datetime.now(timezone.utc)
+
+
+def status(i, created_at):
+    return {
+        "id": str(i), "account": {"acct": f"user{i % 3}"}, "created_at": created_at.isoformat(),
+        "content": f"<p>post {i}</p>", "visibility": "public", "reblogs_count": i, "favourites_count": 0,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    saved = settings.ARCHIVE_DB_PATH
+    settings.ARCHIVE_DB_PATH = str(tmp_path / "archive.sqlite3")
+    archive.get_archive.cache_clear()
+    archive._take_pending()
+    yield tmp_path
+    settings.ARCHIVE_DB_PATH = saved
+    archive.get_archive.cache_clear()
+
+
+def test_archive_and_export(store):
+    archive.record_statuses([status(i, NOW - timedelta(hours=i)) for i in range(25)])
+    # Fetching a status again refreshes its row instead of duplicating it
+    archive.record_statuses([status(0, NOW)], "other.example")
+    archive.record_statuses([status(0, NOW)])
+    archive.record_account({"id": 7, "acct": "bob", "followers_count": 3, "created_at": NOW.isoformat()}, "other.example")
+    archive.record_evaluation("bob@other.example", UserEvaluationOut(risk_score=0.2, recommendation="approve", summary="fine"))
+    report = UserReportIn(reporter="alice", username="bob", reason="spam", created_at=NOW, recent_posts=[])
+    archive.record_triage(report, ReportTriageOut(triage_level="medium", action="review", summary="spam"))
+    asyncio.run(archive.flush_pending())
+
+    out = export_archive(NOW - timedelta(hours=10, minutes=30), NOW + timedelta(minutes=1), directory=str(store / "out"))
+    files = {f.table: f for f in out.files}
+    assert files["statuses"].rows == 12  # 11 from the default instance, status 0 again from other.example
+    assert files["accounts"].rows == 1 and files["evaluations"].rows == 1 and files["triage"].rows == 1
+    assert files["activity"].rows == 0 and os.path.exists(files["activity"].path)
+
+    statuses = pq.read_table(files["statuses"].path)
+    assert statuses.schema.field("created_at").type == pa.timestamp("us", tz="UTC")
+    assert sorted(statuses.column("instance").to_pylist()).count("other.example") == 1
+    accounts = pq.read_table(files["accounts"].path).to_pylist()
+    assert accounts[0]["acct"] == "bob@other.example" and accounts[0]["followers_count"] == 3
+    assert not [name for name in os.listdir(store / "out") if name.endswith(".tmp")]
+
+
+def test_export_streams_in_batches(store):
+    archive.record_statuses([status(i, NOW - timedelta(seconds=i)) for i in range(1000)])
+    asyncio.run(archive.flush_pending())
+    start, end = NOW - timedelta(hours=1), NOW + timedelta(minutes=1)
+    parquet = export_table("statuses", start, end, str(store), "parquet", batch_rows=128)
+    assert parquet.rows == 1000 and parquet.row_groups == 8
+    assert pq.ParquetFile(parquet.path).metadata.num_row_groups == 8
+    arrow = export_table("statuses", start, end, str(store), "arrow", batch_rows=128)
+    with pa.ipc.open_file(arrow.path) as reader:
+        assert reader.num_record_batches == 8
+        assert reader.read_all().num_rows == 1000
+
+
+def test_failed_write_keeps_rows(store, monkeypatch):
+    archive.record_statuses([status(i, NOW) for i in range(3)])
+    archive.record_evaluation("bob", UserEvaluationOut(risk_score=0.2, recommendation="approve", summary="fine"))
+
+    def fail(batches):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(archive.get_archive(), "write", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(archive.flush_pending())
+    archive.record_statuses([status(3, NOW)])
+    assert [row[1] for row in archive._pending["statuses"]] == ["0", "1", "2", "3"]
+    assert archive._pending_rows == 5 and archive._in_flight == 0
+
+    # Requeued rows still count against the bound
+    monkeypatch.setattr(settings.current(), "ARCHIVE_MAX_PENDING", 5)
+    dropped = archive.ARCHIVED._values.get(("statuses", "dropped"), 0)
+    archive.record_statuses([status(4, NOW)])
+    assert archive.ARCHIVED._values[("statuses", "dropped")] == dropped + 1
+
+    monkeypatch.undo()
+    asyncio.run(archive.flush_pending())
+    out = export_archive(NOW - timedelta(minutes=1), NOW + timedelta(minutes=1), directory=str(store / "out"))
+    files = {f.table: f for f in out.files}
+    assert files["statuses"].rows == 4 and files["evaluations"].rows == 1 and not archive._pending
+
+
+def test_export_validates_arguments(store):
+    with pytest.raises(ValueError):
+        export_archive(NOW, NOW - timedelta(days=1), directory=str(store))
+    with pytest.raises(ValueError):
+        export_archive(NOW - timedelta(days=1), tables=["passwords"], directory=str(store))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for the moderation decision audit log
+"""
+
+import asyncio
+import json
+import sys
+import os
+import time
+from datetime import datetime, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core import audit_log
+from app.core.audit_log import AuditLog
+from app.core.config import settings
+from app.schemas.report import UserReportIn
+from app.services.moderation import triage_user_report
+
+
+@pytest.fixture
+def audit_dir(tmp_path):
+    saved = settings.AUDIT_DIR
+    settings.AUDIT_DIR = str(tmp_path)
+    audit_log.get_audit_log.cache_clear()
+    audit_log._pending.clear()
+    yield tmp_path
+    audit_log.get_audit_log().close()
+    settings.AUDIT_DIR = saved
+    audit_log.get_audit_log.cache_clear()
+
+
+def test_segments_rotate_and_index_finds_account(tmp_path):
+    log = AuditLog(str(tmp_path), segment_bytes=4096, fsync="always")
+    start = time.time()
+    for batch in range(20):
+        log.append([
+            {"recorded_at": start + batch * 10 + i, "kind": "evaluation", "account": f"user{i}", "data": {"batch": batch}}
+            for i in range(5)
+        ])
+    log.close()
+    assert len(log.segments()) > 1
+    # Segments are only ever appended to: every index entry points at its line
+    for index_path in log.segments():
+        with open(index_path[:-len(".idx")] + ".jsonl") as f:
+            assert all(json.loads(line)["kind"] == "evaluation" for line in f)
+
+    history = log.history("@User3", limit=100)
+    assert [entry["data"]["batch"] for entry in history] == list(range(19, -1, -1))
+    assert all(entry["account"] == "user3" for entry in history)
+    in_range = log.history("user3", since=start + 50, until=start + 100)
+    assert [entry["data"]["batch"] for entry in in_range] == [9, 8, 7, 6, 5]
+    assert log.history("user3", limit=3)[0]["id"] == history[0]["id"]
+    assert log.history("nobody") == []
+
+
+def test_segments_survive_a_partial_index_entry(tmp_path):
+    log = AuditLog(str(tmp_path), fsync="never")
+    log.append([{"recorded_at": time.time(), "kind": "triage", "account": "bob", "data": {}}])
+    with open(log.segments()[0], "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert len(log.history("bob")) == 1
+    log.close()
+
+
+def test_failed_write_leaves_no_partial_batch(tmp_path, monkeypatch):
+    log = AuditLog(str(tmp_path), fsync="never")
+    start = time.time()
+    log.append([{"recorded_at": start, "kind": "triage", "account": "bob", "data": {"batch": 1}}])
+    first_segment = log.segments()[0]
+    sizes = os.path.getsize(first_segment), os.path.getsize(first_segment[:-len(".idx")] + ".jsonl")
+
+    write_all = audit_log._write_all
+
+    def disk_full(f, data):
+        # The data lands, then half of the index entries do
+        if f.name.endswith(".idx"):
+            write_all(f, data[:len(data) // 2])
+            raise OSError(28, "No space left on device")
+        write_all(f, data)
+
+    monkeypatch.setattr(audit_log, "_write_all", disk_full)
+    batch = [{"recorded_at": start + i, "kind": "triage", "account": "bob", "data": {"batch": 2}} for i in range(1, 4)]
+    with pytest.raises(OSError):
+        log.append(batch)
+    # Cut back to the last complete batch
+    assert (os.path.getsize(first_segment), os.path.getsize(first_segment[:-len(".idx")] + ".jsonl")) == sizes
+
+    monkeypatch.setattr(audit_log, "_write_all", write_all)
+    log.append(batch)
+    log.close()
+    # The retry went to a new segment, and every index entry points at its own line
+    assert len(log.segments()) == 2
+    assert [(e["recorded_at"], e["data"]["batch"]) for e in log.history("bob")] == [
+        (start + 3, 2), (start + 2, 2), (start + 1, 2), (start, 1)
+    ]
+
+
+def test_failed_flush_keeps_decisions(audit_dir, monkeypatch):
+    audit_log.record_decision("triage", "bob", {"n": 1})
+    audit_log.record_decision("triage", "bob", {"n": 2})
+
+    def fail(records):
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(audit_log.get_audit_log(), "append", fail)
+    with pytest.raises(OSError):
+        asyncio.run(audit_log.flush_pending())
+    audit_log.record_decision("triage", "bob", {"n": 3})
+    assert [r["data"]["n"] for r in audit_log._pending] == [1, 2, 3]
+
+    monkeypatch.undo()
+    entries = asyncio.run(audit_log.history("bob"))
+    assert sorted(e["data"]["n"] for e in entries) == [1, 2, 3] and not audit_log._pending
+
+
+def test_queue_is_bounded(audit_dir, monkeypatch):
+    monkeypatch.setattr(settings.current(), "AUDIT_MAX_PENDING", 3)
+    dropped = audit_log.AUDIT_DROPPED._values.get(("activity",), 0)
+    for i in range(5):
+        audit_log.record_decision("activity", "bob", {"n": i})
+    assert [r["data"]["n"] for r in audit_log._pending] == [0, 1, 2]
+    assert audit_log.AUDIT_DROPPED._values[("activity",)] == dropped + 2
+
+
+def test_decisions_are_recorded_and_queried(audit_dir):
+    report = UserReportIn(reporter="alice", username="bob@other.example", reason="spam", created_at=datetime.now(timezone.utc), recent_posts=[])
+    result = asyncio.run(triage_user_report(report))
+    # Queued, not written, until the flusher runs or history is asked for
+    assert len(audit_log._pending) == 1 and not os.listdir(audit_dir)
+
+    entries = asyncio.run(audit_log.history("@Bob@other.example", kinds=["triage"]))
+    assert len(entries) == 1
+    assert entries[0]["data"]["action"] == result.action and entries[0]["data"]["source"] == "heuristic"
+    assert entries[0]["data"]["reporter"] == "alice"
+    assert asyncio.run(audit_log.history("bob@other.example", kinds=["evaluation"])) == []
+
+
+def test_flusher_writes_batches(audit_dir):
+    async def run():
+        await audit_log.start_flusher()
+        try:
+            for i in range(settings.AUDIT_BATCH_SIZE):
+                audit_log.record_decision("activity", f"user{i % 7}", {"i": i})
+            # A full batch wakes the flusher before AUDIT_FLUSH_SECONDS
+            for _ in range(100):
+                if not audit_log._pending:
+                    break
+                await asyncio.sleep(0.01)
+            assert not audit_log._pending
+            audit_log.record_decision("activity", "user0", {"i": "last"})
+        finally:
+            await audit_log.stop_flusher()
+        # Stopping writes what is still queued
+        assert not audit_log._pending
+
+    asyncio.run(run())
+    entries = audit_log.get_audit_log().history("user0", limit=1000)
+    assert len(entries) == len(range(0, settings.AUDIT_BATCH_SIZE, 7)) + 1
+    assert entries[0]["data"]["i"] == "last"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
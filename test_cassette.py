@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for Mastodon API record/replay cassettes
+"""
+
+import sys
+import os
+import tempfile
+
+import requests
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.cassette import CassetteMiss, CassetteSession, request_key
+
+
+def fake_response(body: str, status: int = 200) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    response.headers["X-RateLimit-Remaining"] = "299"
+    return response
+
+
+def test_record_then_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cassette.jsonl.gz")
+        recorder = CassetteSession("record", path)
+        search = request_key("GET", "https://prod.example/api/v1/accounts/search", {"q": "alice", "limit": 1})
+        recorder._record(search, fake_response('[{"id": "1"}]'), 0.2)
+        recorder._record(search, fake_response('[{"id": "2"}]'), 0.3)
+        statuses = request_key("GET", "https://prod.example/api/v1/accounts/1/statuses", {"limit": 20})
+        recorder._record(statuses, fake_response("[]"), 0.1)
+
+        replay = CassetteSession("replay", path)
+        # Host and parameter order do not matter; repeated requests are served in order and cycle
+        bodies = [
+            replay.request("GET", "http://localhost:3000/api/v1/accounts/search", params={"limit": 1, "q": "alice"}).json()
+            for _ in range(3)
+        ]
+        assert bodies == [[{"id": "1"}], [{"id": "2"}], [{"id": "1"}]]
+        response = replay.request("GET", "http://localhost:3000/api/v1/accounts/1/statuses", params={"limit": 20})
+        assert response.headers["x-ratelimit-remaining"] == "299"
+
+        # Unrecorded ids and parameters fall back to the same path template
+        assert replay.request("GET", "http://localhost/api/v1/accounts/99/statuses", params={"limit": 5}).json() == []
+        try:
+            replay.request("GET", "http://localhost/api/v1/instance")
+            assert False, "expected a cassette miss"
+        except CassetteMiss:
+            pass
+
+
+if __name__ == "__main__":
+    test_record_then_replay()
+    print("✅ Cassette tests passed")
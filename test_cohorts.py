@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for signup-cohort statistics
+"""
+
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.cohorts import CohortBatch, compute_cohort_stats, ip_range
+
+HOUR = 3600
+START = 1_700_000_000 - 1_700_000_000 % HOUR
+
+
+def make_accounts():
+    accounts = [
+        {"username": f"person{i}", "created_at": START + i * HOUR, "email_domain": f"mail{i}.example",
+         "ip": f"198.51.{i}.7", "bio": f"I write about topic {i} and garden number {i * 7}"}
+        for i in range(24)
+    ]
+    accounts += [
+        {"username": f"bot{i}", "created_at": START + 5 * HOUR + i, "email_domain": "mailbot.example",
+         "ip": f"203.0.113.{i}", "bio": "Crypto signals daily, join my channel now", "pending": True}
+        for i in range(30)
+    ]
+    return accounts
+
+
+def test_cohort_wave_is_visible():
+    stats = compute_cohort_stats(CohortBatch.from_accounts(make_accounts()))
+    assert stats["account_count"] == 54
+    assert stats["pending_count"] == 30
+    assert stats["burst_hours"] == [START + 5 * HOUR]
+    assert stats["email_domains"][0]["value"] == "mailbot.example" and stats["email_domains"][0]["count"] == 30
+    assert stats["ip_ranges"] == [{"value": "203.0.113.0/24", "count": 30, "usernames": stats["ip_ranges"][0]["usernames"]}]
+    assert [c["size"] for c in stats["bio_clusters"]] == [30]
+
+
+def test_empty_cohort_and_ip_ranges():
+    assert compute_cohort_stats(CohortBatch.from_accounts([]))["account_count"] == 0
+    assert ip_range("2001:db8:1:2::1") == "2001:db8:1::/48"
+    assert ip_range("not an ip") == ""
+
+
+if __name__ == "__main__":
+    test_cohort_wave_is_visible()
+    test_empty_cohort_and_ip_ranges()
+    print("✅ Cohort tests passed")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for reloading the configuration while the server runs
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core import config_reload, mastodon_client
+from app.core.admission import get_admission_controller
+from app.core.config import MastodonInstanceConfig, settings
+from app.services import resolver
+from app.services.llm import get_openai_client
+
+
+@pytest.fixture
+def restore_settings():
+    saved = settings.current()
+    yield
+    config_reload.reload_settings(saved)
+
+
+def test_reload_from_env_file(tmp_path, monkeypatch, restore_settings):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    config_reload.register_settings_listener(["OPENAI_MODEL"], lambda old, new: calls.append((old.OPENAI_MODEL, new.OPENAI_MODEL)))
+    instance_id = settings.INSTANCE_ID
+    before = settings.current()
+
+    (tmp_path / ".env").write_text(f"OPENAI_MODEL=model-a\nDATA_DIR={tmp_path}/elsewhere\n")
+    result = config_reload.reload_settings()
+    assert "OPENAI_MODEL" in result["changed"] and result["restart_required"] == ["DATA_DIR"]
+    assert settings.OPENAI_MODEL == "model-a" and calls[-1] == (before.OPENAI_MODEL, "model-a")
+    # Identity and restart-only settings keep their running values
+    assert settings.INSTANCE_ID == instance_id and settings.DATA_DIR == before.DATA_DIR
+    # The old object is replaced, not modified
+    assert before is not settings.current() and before.OPENAI_MODEL != "model-a"
+
+    (tmp_path / ".env").write_text("OPENAI_MODEL=model-a\nWATCHLIST_POLL_SECONDS=soon\n")
+    with pytest.raises(RuntimeError):
+        config_reload.reload_settings()
+    assert settings.OPENAI_MODEL == "model-a" and settings.WATCHLIST_POLL_SECONDS == before.WATCHLIST_POLL_SECONDS
+
+    calls.clear()
+    (tmp_path / ".env").write_text(f"OPENAI_MODEL=model-a\nOPENAI_REASK_ATTEMPTS={before.OPENAI_REASK_ATTEMPTS + 1}\n")
+    assert config_reload.reload_settings()["changed"] == ["OPENAI_REASK_ATTEMPTS"]
+    assert calls == []
+
+    (tmp_path / "extra.env").write_text("OPENAI_MODEL=model-b\n")
+    (tmp_path / ".env").write_text(f"CONFIG_FILE={tmp_path / 'extra.env'}\nOPENAI_MODEL=model-a\n")
+    config_reload.reload_settings()
+    assert settings.OPENAI_MODEL == "model-b"
+
+
+def test_only_affected_clients_are_rebuilt(restore_settings):
+    base = settings.current()
+    config_reload.reload_settings(base.model_copy(update={
+        "MASTODON_API_BASE": "https://home.example", "MASTODON_ACCESS_TOKEN": "one", "OPENAI_API_KEY": "key-1",
+        "MASTODON_INSTANCES": {"art": MastodonInstanceConfig(api_base="https://art.example", access_token="a", workers=2)},
+    }))
+    home, art = mastodon_client.get_instance(), mastodon_client.get_instance("art")
+    home._client = object()
+    executor = home.executor
+    art_client = art._client = object()
+    openai_client, admission = get_openai_client(), get_admission_controller()
+    resolver._store(("default", "bob"), {"id": "1"})
+    resolver._store(("art", "carol"), {"id": "2"})
+
+    # A new token: new client for that instance only, same thread pool, cached accounts kept
+    current = settings.current()
+    config_reload.reload_settings(current.model_copy(update={"MASTODON_ACCESS_TOKEN": "two"}))
+    assert mastodon_client.get_instance() is home and home._client is None and home.access_token == "two"
+    assert home.executor is executor and art._client is art_client
+    assert resolver._cached(("default", "bob"))[0]
+    assert get_openai_client() is openai_client and get_admission_controller() is admission
+
+    # More workers: new pools; another server: cached accounts of that instance dropped
+    current = settings.current()
+    config_reload.reload_settings(current.model_copy(update={
+        "MASTODON_INSTANCES": {"art": MastodonInstanceConfig(api_base="https://art2.example", access_token="a", workers=3)},
+        "OPENAI_API_KEY": "key-2", "ADMISSION_QUEUE_SIZE": 7,
+    }))
+    assert art.executor._max_workers == 3 and art._client is None and art.domain == "art2.example"
+    assert not resolver._cached(("art", "carol"))[0] and resolver._cached(("default", "bob"))[0]
+    assert get_openai_client() is not openai_client and get_openai_client().api_key == "key-2"
+    assert get_admission_controller() is not admission and get_admission_controller().queue_size == 7
+
+    # A removed instance is dropped
+    config_reload.reload_settings(settings.current().model_copy(update={"MASTODON_INSTANCES": {}}))
+    assert "art" not in mastodon_client._instances
+    resolver._cache.clear()
+
+
+def test_watcher_applies_file_changes(tmp_path, monkeypatch, restore_settings):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings.current(), "CONFIG_RELOAD_SECONDS", 0.01)
+    (tmp_path / ".env").write_text("USE_LLM_TRIAGE=false\n")
+
+    async def run():
+        await config_reload.start_watcher()
+        try:
+            await asyncio.sleep(0.05)
+            (tmp_path / ".env").write_text("USE_LLM_TRIAGE=true\n")
+            for _ in range(100):
+                if settings.USE_LLM_TRIAGE:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await config_reload.stop_watcher()
+
+    asyncio.run(run())
+    assert settings.USE_LLM_TRIAGE is True
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
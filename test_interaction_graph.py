@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the interaction graph: pile-on and co-mention queries, and expiry
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.interactions import status_interactions
+from app.utils.interaction_graph import BOOST, MENTION, REPLY, InteractionGraph
+
+NOW = time.time()
+
+
+def status(status_id, author, mentions=(), reply_to=None, reblog_of=None, age_hours=1.0):
+    return {
+        "id": status_id,
+        "account": {"acct": author},
+        "created_at": datetime.fromtimestamp(NOW - age_hours * 3600, tz=timezone.utc),
+        "mentions": [{"id": str(hash(m)), "acct": m} for m in mentions],
+        "in_reply_to_account_id": str(hash(reply_to)) if reply_to else None,
+        "reblog": {"account": {"acct": reblog_of}} if reblog_of else None,
+    }
+
+
+def build(statuses, **kwargs):
+    graph = InteractionGraph(**kwargs)
+    for s in statuses:
+        parsed = status_interactions(s)
+        if parsed:
+            graph.add_interactions(*parsed, now=NOW)
+    return graph
+
+
+def test_status_interactions_kinds():
+    assert status_interactions(status(1, "a", mentions=["b", "c@remote.example"], reply_to="b"))[2] == [
+        ("b", REPLY), ("c@remote.example", MENTION)
+    ]
+    assert status_interactions(status(2, "a", reblog_of="Victim"))[2] == [("victim", BOOST)]
+    assert status_interactions(status(3, "a")) is None
+
+
+def test_pile_on_and_co_mentions():
+    statuses = [status(i, f"troll{i % 4}", mentions=["victim", "bystander"], reply_to="victim") for i in range(12)]
+    statuses += [status(100, "friend", mentions=["victim"]), status(101, "friend", mentions=["victim"], age_hours=30)]
+    graph = build(statuses)
+
+    pile_on = graph.pile_on("victim", NOW - 24 * 3600)
+    assert [r["account"] for r in pile_on][:4] == ["troll0", "troll1", "troll2", "troll3"]
+    assert pile_on[0]["replies"] == 3 and pile_on[-1] == dict(
+        account="friend", total=1, mentions=1, replies=0, boosts=0, active_buckets=1
+    )
+
+    groups = graph.co_mentioners(NOW - 24 * 3600, min_shared=2)
+    assert groups == [{"accounts": ["troll0", "troll1", "troll2", "troll3"], "shared_targets": ["bystander", "victim"]}]
+    # Duplicate statuses are ignored
+    assert not graph.add_interactions(*status_interactions(statuses[0]), now=NOW)
+
+
+def test_expiry_bounds_memory():
+    graph = build([status(i, f"user{i}", mentions=["target"], age_hours=i) for i in range(10)], retention_seconds=5 * 3600)
+    assert graph.stats()["statuses"] <= 6
+    assert not graph.add_interactions(*status_interactions(status(99, "late", mentions=["target"], age_hours=8)), now=NOW)
+
+    graph = build([status(i, f"user{i}", mentions=["target"], age_hours=i) for i in range(10)], max_edges=3)
+    assert graph.stats()["edges"] <= 3
+
+
+if __name__ == "__main__":
+    test_status_interactions_kinds()
+    test_pile_on_and_co_mentions()
+    test_expiry_bounds_memory()
+    print("✅ Interaction graph tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for link extraction, the blocklist index and link signals in triage
+"""
+
+import asyncio
+import gzip
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.report import UserReportIn
+from app.schemas.user_activity import RecentPost
+from app.services import links
+from app.services.moderation import triage_user_report
+from app.utils.link_reputation import DomainBlocklist, extract_link_domains, parse_blocklist
+
+STATUS_HTML = (
+    '<p>Deals at <a href="https://WWW.Cheap-Pills.example/buy?a=1&amp;b=2" rel="nofollow">cheap-pills.example/buy</a> '
+    '<a href="https://home.example/@bob" class="u-url mention">@<span>bob</span></a> '
+    '<a href="https://home.example/tags/deal" class="mention hashtag">#<span>deal</span></a> '
+    'and https://news.example/story.</p>'
+)
+
+
+@pytest.fixture
+def blocklist(tmp_path):
+    saved = (settings.LINK_BLOCKLIST_PATHS, settings.LINK_INDEX_PATH)
+    with gzip.open(tmp_path / "hosts.gz", "wt") as f:
+        f.write("# hosts\n0.0.0.0 cheap-pills.example\n127.0.0.1 localhost\n")
+    (tmp_path / "rules.txt").write_text("! adblock\n||tracker.example^\n/banner/\n")
+    settings.LINK_BLOCKLIST_PATHS = [str(tmp_path / "hosts.gz"), str(tmp_path / "rules.txt")]
+    settings.LINK_INDEX_PATH = str(tmp_path / "blocklist.idx")
+    links._seen.clear()
+    yield links.load_blocklist()
+    settings.LINK_BLOCKLIST_PATHS, settings.LINK_INDEX_PATH = saved
+    links.load_blocklist()
+    links._seen.clear()
+
+
+def test_extract_link_domains():
+    assert extract_link_domains(STATUS_HTML) == ["cheap-pills.example", "news.example"]
+    assert extract_link_domains("see http://bücher.example/x, or nothing") == ["xn--bcher-kva.example"]
+    assert list(parse_blocklist(["0.0.0.0 a.example", "||b.example^", "c.example # note", "127.0.0.1 localhost"])) == [
+        "a.example", "b.example", "c.example"
+    ]
+
+
+def test_blocklist_index(tmp_path):
+    domains = [f"spam{i}.example" for i in range(5000)]
+    index = DomainBlocklist.build(domains, str(tmp_path / "x.idx"), b"v1")
+    assert len(index) == 5000 and index.signature.rstrip(b"\0") == b"v1"
+    assert all(d in index for d in domains)
+    assert not any(f"clean{i}.example" in index for i in range(5000))
+    assert index.match("cdn.spam7.example") == "spam7.example"
+    assert index.match("spam7.example.org") is None
+    assert "anything.example" not in DomainBlocklist()
+
+
+def test_index_is_reused_until_sources_change(blocklist):
+    assert len(blocklist) == 2
+    assert links.load_blocklist().signature == blocklist.signature
+    with open(settings.LINK_BLOCKLIST_PATHS[1], "a") as f:
+        f.write("||more.example^\n")
+    os.utime(settings.LINK_BLOCKLIST_PATHS[1], ns=(0, 10**18))
+    assert len(links.load_blocklist()) == 3
+
+
+def test_link_signals_in_triage(blocklist):
+    statuses = [
+        {"account": {"acct": f"spammer{i}"}, "content": STATUS_HTML, "card": {"url": "https://news.example/story"}}
+        for i in range(settings.LINK_SPREAD_ACCOUNTS)
+    ]
+    links.observe_statuses(statuses)
+    # A boost counts for the boosted status's author
+    links.observe_statuses([{"account": {"acct": "carol"}, "reblog": statuses[0]}])
+    report = links.link_report([STATUS_HTML])
+    assert report.blocklisted == ["cheap-pills.example"]
+    assert {d.domain: (d.links_seen, d.accounts_seen) for d in report.domains}["news.example"] == (6, 5)
+
+    def report_for(reason, excerpt):
+        return UserReportIn(
+            reporter="alice", username="spammer0", reason=reason, post_excerpt=excerpt,
+            created_at=datetime.now(timezone.utc),
+            recent_posts=[RecentPost(content="hello", created_at=datetime.now(timezone.utc), favorites=0, reblogs=0)],
+        )
+
+    spam = asyncio.run(triage_user_report(report_for("spam", STATUS_HTML)))
+    assert (spam.triage_level, spam.action) == ("high", "flag_immediately")
+    assert "cheap-pills.example" in spam.summary and "news.example (5 accounts)" in spam.summary
+    other = asyncio.run(triage_user_report(report_for("other", "https://sub.tracker.example/x")))
+    assert (other.triage_level, other.action) == ("medium", "review")
+    clean = asyncio.run(triage_user_report(report_for("other", "nothing to see")))
+    assert (clean.triage_level, clean.summary) == ("low", "Report does not indicate urgent action.")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
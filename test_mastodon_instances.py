@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for selecting Mastodon instances by name or account domain
+"""
+
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core import mastodon_client
+from app.core.config import MastodonInstanceConfig, settings
+from app.utils.mastodon import canonical_acct, extract_local_username, server_domain
+
+
+@pytest.fixture
+def instances():
+    saved = (settings.MASTODON_API_BASE, settings.MASTODON_INSTANCES)
+    settings.MASTODON_API_BASE = "https://home.example/"
+    settings.MASTODON_INSTANCES = {"art": MastodonInstanceConfig(api_base="https://Art.Example", workers=2)}
+    yield
+    settings.MASTODON_API_BASE, settings.MASTODON_INSTANCES = saved
+
+
+def test_server_domain():
+    assert server_domain("https://stranger.social/") == "stranger.social"
+    assert server_domain("http://127.0.0.1:8900") == "127.0.0.1:8900"
+    assert server_domain("Mastodon.Example") == "mastodon.example"
+
+
+def test_instance_selection(instances):
+    assert mastodon_client.find_instance_name("art") == "art"
+    assert mastodon_client.find_instance_name("art.example") == "art"
+    assert mastodon_client.find_instance_name("elsewhere.example") is None
+    assert mastodon_client.instance_for_account("@bob@art.example").name == "art"
+    assert mastodon_client.instance_for_account("bob@elsewhere.example").name == "default"
+    assert mastodon_client.instance_for_account("bob").name == "default"
+    assert mastodon_client.instance_for_account("bob", "art.example").name == "art"
+    with pytest.raises(ValueError):
+        mastodon_client.get_instance("missing")
+
+
+def test_instances_have_separate_pools(instances):
+    art = mastodon_client.get_instance("art")
+    assert art is mastodon_client.get_instance("art.example")
+    assert art.executor.name == "mastodon:art" and art.executor._max_workers == 2
+    assert art.domain == "art.example"
+
+
+def test_accounts_are_qualified_by_instance(instances):
+    assert extract_local_username("bob@art.example", "art.example") == "bob"
+    assert canonical_acct("Bob", "art.example") == "bob@art.example"
+    assert canonical_acct("bob@home.example") == "bob"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
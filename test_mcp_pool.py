@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the warm MCP server pool in scripts/run_mcp_container.py, using
+local processes instead of containers
+"""
+
+import sys
+import os
+import time
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+import pytest
+
+from run_mcp_container import LocalLauncher, MCPServerPool
+
+# Answers every request; "grow" allocates memory and "crash" exits
+FAKE_SERVER = r"""
+import json, sys
+hog = []
+for line in sys.stdin:
+    message = json.loads(line)
+    if message.get("method") == "grow":
+        hog.append(b"x" * (64 * 1024 * 1024))
+    if message.get("method") == "crash":
+        sys.exit(1)
+    if "id" in message:
+        print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": {}}), flush=True)
+"""
+
+
+@pytest.fixture
+def fake_launcher(tmp_path):
+    script = tmp_path / "fake_server.py"
+    script.write_text(FAKE_SERVER)
+    return LocalLauncher(command=[sys.executable, str(script)])
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_sessions_reuse_warm_processes(fake_launcher):
+    pool = MCPServerPool(fake_launcher, size=2, max_sessions=3)
+    pool.start()
+    try:
+        assert pool.stats()["idle"] == 2
+        pids = set()
+        for _ in range(3):
+            with pool.session(timeout=5) as server:
+                pids.add(server.process.pid)
+                assert server.request("tools/list")["result"] == {}
+        assert len(pids) <= 2
+        stats = pool.stats()
+        assert stats["acquires"] == 3 and stats["acquire_ms"]["max"] < 1000
+        assert stats["recycled"] == {}
+    finally:
+        pool.close()
+
+
+def test_recycling(fake_launcher):
+    pool = MCPServerPool(fake_launcher, size=1, max_sessions=2, max_memory_growth=0.5)
+    pool.start()
+    try:
+        # Recycled after max_sessions
+        for _ in range(2):
+            with pool.session(timeout=5) as server:
+                first = server.process.pid
+        wait_for(lambda: pool.stats()["idle"] == 1)
+        # Recycled when memory grew
+        with pool.session(timeout=5) as server:
+            assert server.process.pid != first
+            server.request("grow")
+        wait_for(lambda: pool.stats()["idle"] == 1)
+        # Replaced when it stops answering
+        with pool.session(timeout=5) as server:
+            server.send_message({"jsonrpc": "2.0", "method": "crash"})
+            server.process.wait(timeout=5)
+        server = pool.acquire(timeout=10)
+        assert server.alive()
+        pool.release(server)
+        assert pool.stats()["recycled"] == {"max_sessions": 1, "memory": 1, "unhealthy": 1}
+    finally:
+        pool.close()
+    assert not server.alive()
+
+
+def test_real_server_accepts_a_new_session_per_acquire():
+    pool = MCPServerPool(LocalLauncher(), size=1)
+    pool.start()
+    try:
+        for session in range(2):
+            with pool.session(timeout=30) as server:
+                init = server.request("initialize", {
+                    "protocolVersion": "2025-06-18", "capabilities": {},
+                    "clientInfo": {"name": f"pool-test-{session}", "version": "1.0.0"},
+                })
+                assert init["result"]["serverInfo"]["name"] == "nagatha-mastodon"
+                server.send_message({"jsonrpc": "2.0", "method": "notifications/initialized"})
+                tools = server.request("tools/list")["result"]["tools"]
+                assert any(tool["name"] == "get_user_profile" for tool in tools)
+        assert pool.stats()["recycled"] == {}
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for cached account resolution and remote-server backoff
+"""
+
+import asyncio
+import sys
+import os
+import threading
+import time
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from mastodon import MastodonNotFoundError
+
+from app.core.config import MastodonInstanceConfig
+from app.core.mastodon_client import MastodonInstance
+from app.services import resolver
+
+KNOWN = {"alice": {"id": "1", "acct": "alice"}, "carol@up.example": {"id": "3", "acct": "carol@up.example"}}
+
+
+class FakeServer:
+    """
+    Answers lookups from KNOWN and resolving searches for any remote handle.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def api(self, method, endpoint, params=None):
+        with self.lock:
+            self.calls.append(endpoint)
+        time.sleep(0.01)
+        if endpoint.endswith("/lookup"):
+            if params["acct"] not in KNOWN:
+                raise MastodonNotFoundError("Record not found")
+            return KNOWN[params["acct"]]
+        handle = params["q"].lstrip("@")
+        return [{"id": "9", "acct": handle}]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    instance = MastodonInstance("resolver-test", MastodonInstanceConfig(api_base="https://home.example"))
+    fake = FakeServer()
+    instance.api = fake.api
+    resolver._cache.clear()
+    resolver._domains.clear()
+    resolver._domain_limits.clear()
+    webfinger_calls = []
+
+    def webfinger(handle, domain):
+        webfinger_calls.append(domain)
+        if domain == "dead.example":
+            raise ConnectionError("connection refused")
+        return handle != "ghost@up.example"
+
+    monkeypatch.setattr(resolver, "_webfinger", webfinger)
+    fake.webfinger_calls = webfinger_calls
+    return instance, fake
+
+
+def test_local_lookups_are_cached_and_shared(server):
+    instance, fake = server
+
+    async def scenario():
+        accounts = await asyncio.gather(*(resolver.resolve_account("@alice@home.example", instance) for _ in range(5)))
+        assert {a["id"] for a in accounts} == {"1"}
+        await resolver.resolve_account("alice", instance)
+        with pytest.raises(resolver.AccountNotFound):
+            await resolver.resolve_account("nobody", instance)
+        with pytest.raises(resolver.AccountNotFound):
+            await resolver.resolve_account("nobody", instance)
+
+    asyncio.run(scenario())
+    assert fake.calls == ["/api/v1/accounts/lookup", "/api/v1/accounts/lookup"]
+
+
+def test_remote_resolution(server):
+    instance, fake = server
+
+    async def scenario():
+        assert (await resolver.resolve_account("carol@up.example", instance))["id"] == "3"
+        assert (await resolver.resolve_account("dave@Up.Example", instance))["acct"] == "dave@up.example"
+        with pytest.raises(resolver.AccountNotFound):
+            await resolver.resolve_account("ghost@up.example", instance)
+
+    asyncio.run(scenario())
+    # Known remote accounts need no WebFinger request; unknown ones are only searched when they exist
+    assert fake.webfinger_calls == ["up.example", "up.example"]
+    assert fake.calls.count("/api/v1/accounts/search") == 1
+
+
+def test_dead_domains_back_off(server, monkeypatch):
+    instance, fake = server
+    monkeypatch.setattr(resolver, "get_instance", lambda name=None: instance)
+
+    async def scenario():
+        with pytest.raises(resolver.DomainUnreachable):
+            await resolver.resolve_account("a@dead.example", instance)
+        with pytest.raises(resolver.DomainUnreachable):
+            await resolver.resolve_account("b@dead.example", instance)
+        return await resolver.resolve_accounts(["alice", "c@dead.example"], "default")
+
+    out = asyncio.run(scenario())
+    assert fake.webfinger_calls == ["dead.example"]
+    assert "/api/v1/accounts/search" not in fake.calls
+    assert [a.found for a in out.accounts] == [True, False]
+    assert out.backed_off[0].domain == "dead.example" and out.backed_off[0].failures == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
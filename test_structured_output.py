@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for structured LLM output: local JSON repair and targeted re-asks
+"""
+
+import asyncio
+import json
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.report import UserReportIn, ReportTriageOut
+from app.services import llm
+from app.utils.json_extract import extract_json_object, normalize_literals
+
+
+class RejectedFormat(Exception):
+    status_code = 400
+
+
+class SequenceClient:
+    """
+    Stands in for the OpenAI endpoint: returns the scripted answers in order
+    and records each request's messages and response_format.
+    """
+
+    def __init__(self, answers, reject_schema=False):
+        self.answers = list(answers)
+        self.reject_schema = reject_schema
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        self.requests.append({"messages": messages, **kwargs})
+        if self.reject_schema and kwargs.get("response_format", {}).get("type") == "json_schema":
+            raise RejectedFormat("Invalid parameter: 'response_format' of type 'json_schema' is not supported with this model.")
+        message = SimpleNamespace(content=self.answers.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+REPORT = UserReportIn(reporter="a", username="b", reason="spam", created_at=datetime(2024, 1, 1), recent_posts=[])
+
+
+def triage_with(answers, reject_schema=False):
+    client = SequenceClient(answers, reject_schema)
+    original = llm.get_openai_client
+    llm.get_openai_client = lambda: client
+    try:
+        return asyncio.run(llm.triage_report(REPORT)), client.requests
+    finally:
+        llm.get_openai_client = original
+
+
+def test_extract_repairs_common_deviations():
+    assert extract_json_object('{"a": 1}') == ({"a": 1}, False)
+    assert extract_json_object('Sure!\n```json\n{"a": 1,}\n```') == ({"a": 1}, True)
+    assert extract_json_object("{'a': True, 'b': None, 'c': 'it\"s'}")[0] == {"a": True, "b": None, "c": 'it"s'}
+    assert extract_json_object('Result: {"a": {"b": "}"}} trailing')[0] == {"a": {"b": "}"}}
+    assert extract_json_object('{“a”: “x”}')[0] == {"a": "x"}
+    with pytest.raises(ValueError):
+        extract_json_object("no object here")
+
+
+def test_normalize_literals():
+    data = normalize_literals(ReportTriageOut, {"triage_level": "High ", "action": "Flag Immediately", "summary": "s"})
+    assert data["triage_level"] == "high" and data["action"] == "flag_immediately"
+
+
+@pytest.fixture
+def json_schema(monkeypatch):
+    monkeypatch.setattr(settings.current(), "OPENAI_RESPONSE_FORMAT", "json_schema")
+    llm._schema_unsupported.clear()
+    yield
+    llm._schema_unsupported.clear()
+
+
+def test_default_asks_for_json_object():
+    answer = json.dumps({"triage_level": "low", "action": "ignore", "summary": "s"})
+    result, requests = triage_with([answer])
+    assert result.action == "ignore" and requests[0]["response_format"] == {"type": "json_object"}
+
+
+def test_schema_rejected_falls_back_to_json_object(json_schema):
+    answer = json.dumps({"triage_level": "low", "action": "ignore", "summary": "s"})
+    result, requests = triage_with([answer], reject_schema=True)
+    assert result.action == "ignore"
+    assert [r["response_format"]["type"] for r in requests] == ["json_schema", "json_object"]
+    # The model is remembered: the next call asks for json_object at once
+    _, requests = triage_with([answer], reject_schema=True)
+    assert [r["response_format"]["type"] for r in requests] == ["json_object"]
+
+
+def test_schema_requested_and_fences_repaired(json_schema):
+    answer = "```json\n" + json.dumps({"triage_level": "Medium", "action": "review", "summary": "s"}) + "\n```"
+    result, requests = triage_with([answer])
+    assert result.triage_level == "medium" and len(requests) == 1
+    response_format = requests[0]["response_format"]
+    assert response_format["type"] == "json_schema"
+    assert "action" in response_format["json_schema"]["schema"]["properties"]
+
+
+def test_reask_only_invalid_fields(json_schema):
+    first = json.dumps({"triage_level": "medium", "action": "escalate", "summary": "keep me"})
+    result, requests = triage_with([first, '{"action": "review", "summary": "ignored"}'])
+    assert result.action == "review" and result.summary == "keep me"
+    assert len(requests) == 2
+    assert list(requests[1]["response_format"]["json_schema"]["schema"]["properties"]) == ["action"]
+    assert "action" in requests[1]["messages"][-1]["content"]
+
+
+def test_gives_up_after_reask_attempts():
+    bad = json.dumps({"triage_level": "medium", "action": "escalate", "summary": "s"})
+    with pytest.raises(RuntimeError):
+        triage_with([bad] * (settings.OPENAI_REASK_ATTEMPTS + 1))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for structured tool results
+
+Checks that tool calls return structured content next to the text output,
+and that field projection and the compact JSON format work end to end.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mcp.types as types
+
+from app.mcp_server import TOOLS, server
+from app.utils.serialization import project
+
+
+async def call_tool(name, arguments):
+    handler = server.request_handlers[types.CallToolRequest]
+    request = types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+    return (await handler(request)).root
+
+
+REPORT = {"reporter": "alice", "username": "spammer", "reason": "spam"}
+
+
+def test_structured_content_alongside_text():
+    result = asyncio.run(call_tool("triage_user_report", REPORT))
+    assert result.structuredContent == {
+        "triage_level": "medium",
+        "action": "review",
+        "summary": "Report suggests spam; review recommended.",
+    }
+    assert result.content[0].text.startswith("Report Triage Results:")
+
+
+def test_field_projection_and_json_format():
+    arguments = dict(REPORT, fields=["triage_level", "action"], format="json")
+    result = asyncio.run(call_tool("triage_user_report", arguments))
+    assert result.structuredContent == {"triage_level": "medium", "action": "review"}
+    assert json.loads(result.content[0].text) == result.structuredContent
+
+
+def test_tracing_path_is_not_client_controlled(tmp_path):
+    target = str(tmp_path / "elsewhere.jsonl")
+    result = asyncio.run(call_tool("configure_tracing", {"enabled": False, "exporter": "console", "path": target}))
+    assert not result.isError and result.structuredContent["path"] != target
+    schema = next(t for t in TOOLS if t.name == "configure_tracing").inputSchema
+    assert "path" not in schema["properties"]
+
+
+def test_project_nested_and_lists():
+    data = {"username": "a", "avg_engagement": {"favorites": 1.0, "reblogs": 2.0}, "posts": [{"content": "x", "replies": 1}]}
+    assert project(data, ["avg_engagement.favorites", "posts.replies", "missing"]) == {
+        "avg_engagement": {"favorites": 1.0},
+        "posts": [{"replies": 1}],
+    }
+    assert project(data, None) is data
+
+
+if __name__ == "__main__":
+    test_structured_content_alongside_text()
+    test_field_projection_and_json_format()
+    test_project_nested_and_lists()
+    print("✅ Structured result tests passed")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for hashtag and keyword trend detection
+"""
+
+import asyncio
+import random
+import sys
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.config import settings
+from app.mcp_server import handle_call_tool
+from app.services import trends
+from app.utils.trends import SeenIds, SpaceSaving, TrendSketch, status_terms
+
+NOW = time.time()
+
+
+@pytest.fixture
+def fresh_detector():
+    trends.get_trend_sketch.cache_clear()
+    trends._seen_statuses.cache_clear()
+    yield
+    trends.get_trend_sketch.cache_clear()
+    trends._seen_statuses.cache_clear()
+
+
+def status(status_id, content, tags=(), age_minutes=1.0):
+    return {
+        "id": str(status_id),
+        "uri": f"https://social.example/statuses/{status_id}",
+        "content": content,
+        "tags": [{"name": tag} for tag in tags],
+        "created_at": datetime.fromtimestamp(NOW - age_minutes * 60, tz=timezone.utc).isoformat(),
+    }
+
+
+def test_status_terms():
+    content = (
+        '<p>Huge <a href="https://x.example/tags/CryptoDrop" class="mention hashtag">#<span>CryptoDrop</span></a> '
+        'giveaway, claim yours at https://scam.example/claim now '
+        '<span class="h-card"><a href="https://x.example/@bob" class="u-url mention">@<span>bob</span></a></span> '
+        "#FreeCoins about this</p>"
+    )
+    assert status_terms(content, ["Airdrop"]) == {"#airdrop", "#cryptodrop", "#freecoins", "huge", "giveaway", "claim"}
+    assert status_terms(None, ["Tag"]) == {"#tag"}
+
+
+def test_sketch_finds_surge_against_baseline():
+    sketch = TrendSketch(bucket_seconds=60, buckets=60, width=512, depth=4, top_k=20)
+    # Steady background: "weather" twice a minute for the whole hour, "#news" now and then
+    for minute in range(60):
+        for _ in range(2):
+            sketch.add({"weather": 1}, NOW - minute * 60, NOW)
+        if minute % 10 == 0:
+            sketch.add({"#news": 1}, NOW - minute * 60, NOW)
+    # Burst: "#cryptodrop" only in the last five minutes, "weather" at its usual rate
+    for minute in range(5):
+        for _ in range(4):
+            sketch.add({"#cryptodrop": 1, "giveaway": 1}, NOW - minute * 60, NOW)
+
+    result = sketch.surging(NOW, recent_buckets=5, min_count=5, min_ratio=3.0)
+    assert result["recent_buckets"] == 5 and result["baseline_buckets"] == 55
+    assert result["recent_documents"] == 5 * 2 + 1 + 5 * 4
+    surging = {term["term"]: term for term in result["terms"]}
+    assert set(surging) == {"#cryptodrop", "giveaway"}
+    assert surging["#cryptodrop"]["recent_count"] == 20 and surging["#cryptodrop"]["baseline_count"] == 0
+    assert sketch.surging(NOW, 5, prefix="#")["terms"][0]["term"] == "#cryptodrop"
+    assert [t["term"] for t in sketch.surging(NOW, 5, exclude_prefix="#")["terms"]] == ["giveaway"]
+
+    # Counts older than the window are dropped, and the slot is reused
+    sketch.add({"stale": 1}, NOW - 2 * 3600, NOW)
+    assert sketch.estimate(["stale"], sketch._window_slots(0, int(NOW // 60)))[0] == 0
+    assert sketch.memory_bytes() == 60 * 4 * 512 * 4 + 60 * 8 * 2
+
+
+def test_space_saving_keeps_heavy_hitters():
+    rng = random.Random(5)
+    # Zipf-like stream: a few frequent terms in a long tail of rare ones
+    stream = [f"t{int(rng.paretovariate(1.0))}" for _ in range(20000)]
+    summary = SpaceSaving(50)
+    for start in range(0, len(stream), 100):
+        summary.update(Counter(stream[start:start + 100]))
+    exact = Counter(stream)
+    assert len(summary) == 50 and sum(summary.counts.values()) == len(stream)
+    # Every term above N / capacity is kept, never with a lower count
+    for term, count in exact.items():
+        if count > len(stream) / 50:
+            assert summary.counts[term] >= count
+    assert summary.counts["t1"] == exact["t1"]
+
+
+def test_observing_a_page_is_cheap(fresh_detector):
+    rng = random.Random(9)
+    vocabulary = [f"word{i}x" for i in range(20000)]
+
+    def page(first):
+        return [
+            status(first + i, "<p>" + " ".join(rng.choice(vocabulary) for _ in range(30)) + "</p>",
+                   tags=[f"tag{rng.randrange(3000)}"], age_minutes=rng.uniform(0, 24 * 60))
+            for i in range(40)
+        ]
+
+    # Fill the summaries first so every page pays for evictions
+    for n in range(50):
+        trends.observe_statuses(page(n * 40), None)
+    timings = []
+    for n in range(50, 60):
+        statuses = page(n * 40)
+        started = time.perf_counter()
+        trends.observe_statuses(statuses, None)
+        timings.append(time.perf_counter() - started)
+    # A page of 40 statuses runs on the event loop; it must stay in the low milliseconds
+    assert sorted(timings)[len(timings) // 2] < 0.05
+
+
+def test_seen_ids_are_bounded():
+    seen = SeenIds(capacity=3)
+    assert seen.add("a") and not seen.add("a")
+    for key in "bcdefg":
+        seen.add(key)
+    # Two generations of at most three: "a" has been forgotten, "f" not yet
+    assert len(seen) <= 6 and not seen.add("f")
+    assert seen.add("a")
+
+
+def test_surging_terms_tool(fresh_detector, monkeypatch):
+    monkeypatch.setattr(settings.current(), "TREND_BUCKET_SECONDS", 60)
+    monkeypatch.setattr(settings.current(), "TREND_WINDOW_HOURS", 2)
+    monkeypatch.setattr(settings.current(), "TREND_RECENT_MINUTES", 10)
+    baseline = [status(i, "<p>lovely weather today</p>", age_minutes=15 + i) for i in range(60)]
+    burst = [status(100 + i, f"<p>Free coins for everyone {i}</p>", tags=["FreeCoins"], age_minutes=i % 8) for i in range(12)]
+    trends.observe_statuses(baseline + burst, None)
+    # Fetched again (e.g. by a watchlist check) and boosted: neither counted again
+    trends.observe_statuses(burst[:6] + [{"id": "999", "reblog": burst[0]}], None)
+
+    out = trends.surging_terms("hashtag")
+    assert [t.term for t in out.terms] == ["#freecoins"]
+    assert out.terms[0].recent_count == 12 and out.terms[0].kind == "hashtag" and out.window_minutes == 10
+
+    content, payload = asyncio.run(handle_call_tool("surging_terms", {"kind": "keyword", "min_count": 10}))
+    assert "coins: 12 statuses" in content[0].text
+    terms = [t["term"] for t in payload["terms"]]
+    assert "coins" in terms and "free" in terms and "everyone" in terms and "weather" not in terms
+    assert "#freecoins" not in terms and payload["statuses_in_window"] == 12
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the watchlist change detector and its SQLite store
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+import time
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.user_activity import UserActivityOut
+from app.schemas.user_eval import UserEvaluationOut, UserProfileIn
+from app.services import watchlist
+from app.services.watchlist import WatchlistStore, _check_spacing, detect_changes
+
+BASELINE = {
+    "bio_hash": "a",
+    "follower_count": 100,
+    "following_count": 50,
+    "statuses_count": 300,
+    "posting_frequency": "daily",
+    "posts_per_day": 2.0,
+    "avg_engagement": 4.0,
+}
+
+
+def test_detect_changes_thresholds():
+    assert detect_changes(None, BASELINE)["profile"]
+    assert detect_changes(BASELINE, dict(BASELINE, follower_count=110)) == {"profile": {}, "activity": {}}
+
+    changes = detect_changes(BASELINE, dict(BASELINE, bio_hash="b", follower_count=200, posts_per_day=10.0))
+    assert changes["profile"] == {"bio": "changed", "follower_count": [100, 200]}
+    assert changes["activity"] == {"posts_per_day": [2.0, 10.0]}
+
+
+def test_due_entries_are_claimed_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "watchlist.sqlite3")
+        first, second = WatchlistStore(path), WatchlistStore(path)
+        first.add("alice@example.social", 3600, "spam reports")
+
+        now = time.time() + 1
+        assert [c[0] for c in first.claim_due(now, 10)] == ["alice@example.social"]
+        assert second.claim_due(now, 10) == []
+
+        first.record_change("alice@example.social", "profile", {"fields": {"bio": "changed"}})
+        changes = second.changes_since(now - 60)
+        assert [(c.username, c.kind) for c in changes] == [("alice@example.social", "profile")]
+
+
+def test_checks_are_spread_over_the_poll_period():
+    # The jitter is a fraction of the poll period, not seconds
+    spacing = [_check_spacing() for _ in range(200)]
+    limit = settings.WATCHLIST_POLL_SECONDS * settings.WATCHLIST_JITTER
+    assert all(0 <= s <= limit for s in spacing)
+    assert max(spacing) > limit / 2 > settings.WATCHLIST_JITTER
+
+
+def test_failed_evaluation_is_retried(tmp_path, monkeypatch):
+    store = WatchlistStore(str(tmp_path / "watchlist.sqlite3"))
+    store.add("alice@example.social", 3600, None)
+    monkeypatch.setattr(watchlist, "get_watchlist_store", lambda: store)
+    profile = UserProfileIn(username="alice", bio="hello", follower_count=100, following_count=50, statuses_count=300)
+    evaluations = [RuntimeError("LLM unavailable"), UserEvaluationOut(risk_score=0.1, recommendation="approve", summary="ok")]
+
+    async def fetch_profile(username):
+        return profile
+
+    async def fetch_posts(username, limit):
+        return []
+
+    async def evaluate(profile):
+        result = evaluations.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def analyze(activity_in):
+        return UserActivityOut(post_count=0, avg_engagement={}, posting_frequency="none", summary="quiet")
+
+    monkeypatch.setattr(watchlist.mastodon_service, "get_user_profile", fetch_profile)
+    monkeypatch.setattr(watchlist.mastodon_service, "get_recent_posts", fetch_posts)
+    monkeypatch.setattr(watchlist, "evaluate_user_profile", evaluate)
+    monkeypatch.setattr(watchlist, "analyze_user_activity", analyze)
+
+    def check():
+        (username, interval, previous), = store.claim_due(time.time() + 7200, 10)
+        return asyncio.run(watchlist.refresh_account(username, interval, previous))
+
+    # Baseline whose evaluation fails: taken again on the next check
+    assert check()["profile"] == {"baseline": True}
+    assert store.get("alice@example.social").last_evaluation is None
+    assert check()["profile"] == {"baseline": True}
+    assert store.get("alice@example.social").last_evaluation["recommendation"] == "approve"
+    assert check() == {"profile": {}, "activity": {}}
+
+    # A bio change whose evaluation fails is seen again by the next check
+    profile.bio = "buy coins"
+    evaluations[:] = [RuntimeError("LLM unavailable"), UserEvaluationOut(risk_score=0.9, recommendation="suspend", summary="spam")]
+    assert check()["profile"] == {"bio": "changed"}
+    assert check()["profile"] == {"bio": "changed"}
+    assert store.get("alice@example.social").last_evaluation["recommendation"] == "suspend"
+    assert check()["profile"] == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])